@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+SpotiSplit - Збагачення треків жанрами виконавців
+Унікальні ID виконавців бібліотеки запитуються батчами по 50 через sp.artists і кешуються на диску;
+жанри перетворюються на розріджені хешовані вектори та додаються до простору кластеризації
+"""
+
+import os
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction import FeatureHasher
+
+from progress import progress
+
+# Значення за замовчуванням для config.py (можна перевизначити там)
+GENRE_DEFAULTS = {
+    "GENRE_FEATURES": False,  # True -> додати хешовані жанри виконавців до характеристик кластеризації
+    "GENRE_HASH_DIM": 32,     # розмірність хешованого вектора жанрів
+    "GENRE_WEIGHT": 2.0,      # вага всього блоку жанрів відносно однієї звичайної характеристики
+}
+
+ARTIST_CACHE_PATH = ".spotisplit_artists.json"
+ARTISTS_BATCH_SIZE = 50  # максимум ID в одному запиті GET /artists
+GENRE_COLUMN_PREFIX = "genre_"
+
+
+def track_artist_ids(item) -> List[str]:
+    return [a["id"] for a in item["track"].get("artists", []) if a.get("id")]
+
+
+def unique_artist_ids(items) -> List[str]:
+    """Унікальні ID виконавців бібліотеки в порядку першої появи"""
+    return list(dict.fromkeys(a_id for it in items for a_id in track_artist_ids(it)))
+
+
+def load_artist_cache(path: str = ARTIST_CACHE_PATH) -> Dict[str, Dict[str, Any]]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_artist_cache(cache: Dict[str, Dict[str, Any]], path: str = ARTIST_CACHE_PATH):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(cache, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def fetch_artists(sp, artist_ids: List[str], max_workers: int = 1,
+                  cache_path: str = ARTIST_CACHE_PATH) -> Dict[str, Dict[str, Any]]:
+    """{artist_id: {"name", "genres", "popularity"}}; запитуються лише відсутні в дисковому кеші"""
+    cache = load_artist_cache(cache_path)
+    missing = [a_id for a_id in artist_ids if a_id not in cache]
+    if missing:
+        chunks = [missing[i:i + ARTISTS_BATCH_SIZE] for i in range(0, len(missing), ARTISTS_BATCH_SIZE)]
+        started = time.perf_counter()
+        with progress("artists", total=len(missing), unit="виконавців") as p, \
+                ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+            for chunk, response in zip(chunks, pool.map(sp.artists, chunks)):
+                for a_id, artist in zip(chunk, (response or {}).get("artists") or []):
+                    if artist:
+                        cache[a_id] = {"name": artist.get("name"), "genres": artist.get("genres") or [],
+                                       "popularity": artist.get("popularity")}
+                p.update(len(chunk), calls=1)
+        save_artist_cache(cache, cache_path)
+        print(f"🎤 Виконавці: {len(missing)} нових за {len(chunks)} запитів ({time.perf_counter() - started:.1f} с), "
+              f"{len(artist_ids) - len(missing)} з кешу")
+    else:
+        print(f"🎤 Виконавці: всі {len(artist_ids)} з кешу")
+    return {a_id: cache[a_id] for a_id in artist_ids if a_id in cache}
+
+
+def genre_tokens(genres: List[str]) -> List[str]:
+    """Жанр цілком і його слова ("indie rock" -> "indie rock", "indie", "rock"), щоб схожі жанри перетинались"""
+    tokens = []
+    for genre in genres:
+        tokens.append(genre)
+        words = genre.split()
+        if len(words) > 1:
+            tokens.extend(f"w:{w}" for w in words)
+    return tokens
+
+
+def genre_matrix(items, artists: Dict[str, Dict[str, Any]], n_features: int = 32):
+    """Розріджена (scipy CSR) матриця хешованих жанрів, рядок на трек, L2-нормована"""
+    hasher = FeatureHasher(n_features=n_features, input_type="string", alternate_sign=False)
+    tokens = [genre_tokens([g for a_id in track_artist_ids(it) for g in artists.get(a_id, {}).get("genres", [])])
+              for it in items]
+    X = hasher.transform(tokens).tocsr().astype(np.float32)
+    norms = np.sqrt(np.asarray(X.multiply(X).sum(axis=1))).ravel()
+    norms[norms == 0] = 1.0
+    return X.multiply(1.0 / norms[:, None]).tocsr()
+
+
+def add_genre_features(df: pd.DataFrame, items, artists: Dict[str, Dict[str, Any]], feature_cols: List[str],
+                       config) -> Tuple[pd.DataFrame, List[str]]:
+    """Додає колонки genre_XX (хешовані жанри) та genres (для звітів), розширює feature_cols"""
+    n_features = int(config.get("GENRE_HASH_DIM", GENRE_DEFAULTS["GENRE_HASH_DIM"]))
+    X = genre_matrix(items, artists, n_features)
+    columns = [f"{GENRE_COLUMN_PREFIX}{i:02d}" for i in range(n_features)]
+    # У df - щільно: конвеєр центрує кожну колонку (StandardScaler), після чого нулів однаково не лишається;
+    # n × GENRE_HASH_DIM float32 - кілька МБ навіть для 100k треків
+    df[columns] = X.toarray()
+    df["genres"] = [", ".join(dict.fromkeys(g for a_id in track_artist_ids(it)
+                                            for g in artists.get(a_id, {}).get("genres", [])))
+                    for it in items]
+    covered = int((X.getnnz(axis=1) > 0).sum())
+    print(f"🏷️ Жанри: {covered}/{len(df)} треків мають жанр, {X.nnz} ненульових з {X.shape[0] * X.shape[1]}")
+    return df, list(feature_cols) + columns
+
+
+def feature_weights(feature_cols: List[str], config) -> np.ndarray:
+    """
+    Ваги колонок після масштабування: блок жанрів разом важить GENRE_WEIGHT звичайних характеристик.
+    Кожна колонка після StandardScaler має одиничну дисперсію, тож блок з d колонок з вагою w дає
+    d·w² у квадраті відстані; w = sqrt(GENRE_WEIGHT / d) робить цей внесок рівним GENRE_WEIGHT.
+    """
+    is_genre = np.array([c.startswith(GENRE_COLUMN_PREFIX) for c in feature_cols])
+    weights = np.ones(len(feature_cols), dtype=np.float32)
+    if is_genre.any():
+        genre_weight = float(config.get("GENRE_WEIGHT", GENRE_DEFAULTS["GENRE_WEIGHT"]))
+        weights[is_genre] = np.sqrt(genre_weight / is_genre.sum())
+    return weights
+
+
+def enrich_with_genres(sp, df: pd.DataFrame, items, feature_cols: List[str], config,
+                       checkpoint=None) -> Tuple[pd.DataFrame, List[str]]:
+    """Етап збагачення: виконавці (чекпоінт "artists" + дисковий кеш) -> хешовані жанри в df"""
+    from run_checkpoints import run_stage
+
+    ids = unique_artist_ids(items)
+    artists = run_stage(checkpoint, "artists", lambda: fetch_artists(sp, ids, config.get("MAX_WORKERS", 1)))
+    return add_genre_features(df, items, artists, feature_cols, config)
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+SpotiSplit - Статистики кластерів
+Всі агрегати по кластерах (розміри, середні, std, топ треки, найчастіші значення, важливість характеристик)
+рахуються за один groupby і кешуються із запуском; звіт, теплова карта та ранжування характеристик читають їх
+"""
+
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+STATS_STAGE = "cluster_stats"
+
+
+class ClusterStats:
+    """Попередньо агреговані статистики кластерів"""
+
+    def __init__(self, counts, means, stds, importance, top_tracks, modes):
+        self.counts: pd.Series = counts            # кластер -> кількість треків
+        self.means: pd.DataFrame = means           # кластер × характеристика
+        self.stds: pd.DataFrame = stds             # кластер × характеристика
+        self.importance: pd.Series = importance    # характеристика -> між/всередині кластерна дисперсія, за спаданням
+        self.top_tracks: pd.DataFrame = top_tracks # топ-N треків кожного кластера (індекс - кластер)
+        self.modes: Dict[str, pd.DataFrame] = modes  # колонка -> [value, count] найчастішого значення в кластері
+
+    @property
+    def clusters(self) -> List[int]:
+        return list(self.counts.index)
+
+    def top_features(self, n: int) -> List[str]:
+        """n характеристик, що найкраще розділяють кластери"""
+        return list(self.importance.index[:n])
+
+    def subset(self, features: Iterable[str]) -> "ClusterStats":
+        """Ті ж статистики лише для вказаних характеристик"""
+        features = [f for f in features if f in self.means.columns]
+        importance = self.importance[self.importance.index.isin(features)]
+        return ClusterStats(self.counts, self.means[features], self.stds[features], importance,
+                            self.top_tracks, self.modes)
+
+
+def compute_cluster_stats(df: pd.DataFrame, features: Optional[List[str]] = None, top_n: int = 3,
+                          rank_by: str = "popularity", top_columns=("track_name", "artist"),
+                          mode_columns=("album_type",)) -> ClusterStats:
+    """Рахує статистики всіх кластерів (cluster == -1, тобто некластеризовані треки, пропускаються)"""
+    df = df[df["cluster"] != -1]
+    if features is None:
+        features = [c for c in df.select_dtypes(include=[np.number]).columns if c != "cluster"]
+
+    grouped = df.groupby("cluster", sort=True)
+    agg = grouped[features].agg(["count", "sum", "mean", "std", "var"])
+    counts = grouped.size()
+    means = agg.xs("mean", axis=1, level=1)
+    stds = agg.xs("std", axis=1, level=1)
+
+    # Відношення міжкластерної дисперсії до внутрішньокластерної (з тих самих агрегатів)
+    n_valid = agg.xs("count", axis=1, level=1)
+    total_mean = agg.xs("sum", axis=1, level=1).sum() / n_valid.sum()
+    between = (n_valid * (means - total_mean) ** 2).sum() / n_valid.sum()
+    within = (agg.xs("var", axis=1, level=1).fillna(0) * (n_valid - 1).clip(lower=0)).sum() / n_valid.sum()
+    importance = (between / within.replace(0, np.nan)).dropna().sort_values(ascending=False)
+
+    top_tracks = pd.DataFrame()
+    columns = [c for c in (*top_columns, rank_by) if c in df.columns]
+    if rank_by in df.columns:
+        top_tracks = (df.sort_values(rank_by, ascending=False, kind="stable")
+                        .groupby("cluster", sort=True).head(top_n)
+                        .sort_values("cluster", kind="stable")
+                        .set_index("cluster")[columns])
+
+    modes = {}
+    for col in mode_columns:
+        if col in df.columns:
+            vc = df.groupby("cluster", sort=True)[col].value_counts()
+            first = vc.groupby(level=0).head(1)
+            modes[col] = pd.DataFrame({"value": first.index.get_level_values(1), "count": first.to_numpy()},
+                                      index=first.index.get_level_values(0))
+
+    return ClusterStats(counts, means, stds, importance, top_tracks, modes)
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+SpotiSplit - Кластеризація треків
+KMeans та збалансований режим з обмеженням розміру плейлістів (MIN/MAX_PLAYLIST_SIZE)
+Рестарти KMeans мають детерміновані seed-и, можуть виконуватись у кількох процесах з
+обмеженою кількістю BLAS/OpenMP потоків (threadpoolctl) і зупиняються, коли збігаються
+"""
+
+import os
+import math
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Tuple
+
+import numpy as np
+from sklearn.cluster import KMeans
+from threadpoolctl import threadpool_limits
+
+from track_cleaning import assign_excluded
+
+# Значення за замовчуванням для config.py (можна перевизначити там)
+CLUSTERING_DEFAULTS = {
+    "CLUSTERING_MODE": "kmeans",  # "kmeans", "balanced" або "hierarchical"
+    "MIN_PLAYLIST_SIZE": None,    # None -> половина середнього розміру кластера
+    "MAX_PLAYLIST_SIZE": None,    # None -> півтора середнього розміру кластера
+    "KMEANS_N_INIT": 10,          # кількість рестартів KMeans
+    "KMEANS_JOBS": 1,             # процеси для рестартів (None -> кількість ядер)
+    "KMEANS_THREADS": None,       # BLAS/OpenMP потоки на процес (None -> ядра / KMEANS_JOBS)
+    "KMEANS_EARLY_STOP": 3,       # зупинитись, коли стільки рестартів дали найкращу інерцію (0 -> без зупинки)
+    "KMEANS_VERIFY_SERIAL": False,  # повторити рестарти послідовно та порівняти мітки (для перевірки)
+}
+
+DISTANCE_CHUNK_SIZE = 16384
+EARLY_STOP_RTOL = 1e-6  # інерції в межах цієї відносної похибки вважаються однаковими
+
+
+def squared_distances(X, centers, chunk_size: int = DISTANCE_CHUNK_SIZE) -> np.ndarray:
+    """Квадрати евклідових відстаней точок до центрів, блоками по chunk_size рядків (float32)"""
+    X = np.asarray(X, dtype=np.float32)
+    centers = np.asarray(centers, dtype=np.float32)
+    c_sq = np.einsum("ij,ij->i", centers, centers)
+    out = np.empty((len(X), len(centers)), dtype=np.float32)
+    for start in range(0, len(X), chunk_size):
+        xb = X[start:start + chunk_size]
+        d = np.einsum("ij,ij->i", xb, xb)[:, None] - 2.0 * (xb @ centers.T) + c_sq[None, :]
+        np.maximum(d, 0.0, out=d)
+        out[start:start + chunk_size] = d
+    return out
+
+
+def resolve_size_limits(n: int, k: int, config) -> Tuple[int, int]:
+    """Межі розміру кластера з config, скориговані до досяжних для n треків і k кластерів"""
+    avg = n / k
+    min_size = config.get("MIN_PLAYLIST_SIZE")
+    max_size = config.get("MAX_PLAYLIST_SIZE")
+    min_size = int(avg // 2) if min_size is None else int(min_size)
+    max_size = int(math.ceil(avg * 1.5)) if max_size is None else int(max_size)
+
+    if min_size * k > n:
+        print(f"⚠️ MIN_PLAYLIST_SIZE={min_size} недосяжний для {n} треків у {k} кластерах")
+        min_size = n // k
+    if max_size * k < n:
+        print(f"⚠️ MAX_PLAYLIST_SIZE={max_size} недосяжний для {n} треків у {k} кластерах")
+        max_size = int(math.ceil(avg))
+    return min_size, max(max_size, min_size)
+
+
+def balanced_assign(D: np.ndarray, min_size, max_size) -> np.ndarray:
+    """
+    Призначає точки кластерам з урахуванням місткості (межі - числа або масиви по кластерах).
+    Раундами: кожна вільна точка пропонує себе найближчому незаповненому кластеру,
+    кластер приймає найближчі пропозиції в межах вільного місця. Далі недобрані
+    кластери забирають точки з найменшим приростом відстані у кластерів з надлишком.
+    """
+    n, k = D.shape
+    min_size = np.broadcast_to(np.asarray(min_size, dtype=np.int64), (k,))
+    labels = np.full(n, -1, dtype=np.int64)
+    counts = np.zeros(k, dtype=np.int64)
+    cost = D.astype(np.float32, copy=True)
+    unassigned = np.arange(n)
+
+    while len(unassigned):
+        sub = cost[unassigned]
+        best = sub.argmin(axis=1)
+        best_d = sub[np.arange(len(unassigned)), best]
+        order = np.lexsort((best_d, best))
+        prop_c, prop_pts = best[order], unassigned[order]
+        rank = np.arange(len(order)) - np.searchsorted(prop_c, np.arange(k))[prop_c]
+        accept = rank < (max_size - counts)[prop_c]
+        labels[prop_pts[accept]] = prop_c[accept]
+        counts += np.bincount(prop_c[accept], minlength=k)
+        cost[:, counts >= max_size] = np.inf
+        unassigned = prop_pts[~accept]
+
+    for c in np.argsort(counts):
+        need = min_size[c] - counts[c]
+        if need <= 0:
+            continue
+        candidates = np.flatnonzero((labels != c) & (counts[labels] > min_size[labels]))
+        delta = D[candidates, c] - D[candidates, labels[candidates]]
+        for i in candidates[np.argsort(delta, kind="stable")]:
+            if need <= 0:
+                break
+            if counts[labels[i]] <= min_size[labels[i]]:
+                continue
+            counts[labels[i]] -= 1
+            labels[i] = c
+            counts[c] += 1
+            need -= 1
+    return labels
+
+
+def balanced_kmeans(X, init_centers, min_size: int, max_size: int, max_iter: int = 30):
+    """Збалансований k-means: чергує призначення з обмеженням місткості та оновлення центроїдів"""
+    X = np.asarray(X, dtype=np.float32)
+    centers = np.asarray(init_centers, dtype=np.float32)
+    k = len(centers)
+    labels = None
+    for _ in range(max_iter):
+        D = squared_distances(X, centers)
+        new_labels = balanced_assign(D, min_size, max_size)
+        if labels is not None and np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        counts = np.bincount(labels, minlength=k)
+        sums = np.zeros_like(centers)
+        np.add.at(sums, labels, X)
+        nonempty = counts > 0
+        centers[nonempty] = sums[nonempty] / counts[nonempty, None]
+
+    D = squared_distances(X, centers)
+    inertia = float(D[np.arange(len(X)), labels].sum())
+    return labels, centers, inertia
+
+
+def restart_seeds(random_state: int, n_init: int) -> np.ndarray:
+    """Seed кожного рестарту, однакові для послідовного та паралельного виконання"""
+    return np.random.RandomState(random_state).randint(np.iinfo(np.int32).max, size=n_init)
+
+
+def compute_budget(config) -> Tuple[int, int]:
+    """(процеси, потоки на процес) з KMEANS_JOBS / KMEANS_THREADS"""
+    cpus = os.cpu_count() or 1
+    jobs = config.get("KMEANS_JOBS", 1) or cpus
+    threads = config.get("KMEANS_THREADS") or max(1, cpus // jobs)
+    return max(1, int(jobs)), max(1, int(threads))
+
+
+def _run_restart(X, k: int, seed: int, threads: int):
+    with threadpool_limits(limits=threads):
+        kmeans = KMeans(n_clusters=k, n_init=1, random_state=int(seed)).fit(X)
+    return kmeans.labels_, kmeans.cluster_centers_, float(kmeans.inertia_)
+
+
+_WORKER_X = None
+_WORKER_THREADS = 1
+
+
+def _init_restart_worker(X, threads: int):
+    """Матриця передається у процес один раз, а не з кожним рестартом"""
+    global _WORKER_X, _WORKER_THREADS
+    _WORKER_X, _WORKER_THREADS = X, threads
+
+
+def _worker_restart(k: int, seed: int):
+    return _run_restart(_WORKER_X, k, seed, _WORKER_THREADS)
+
+
+def kmeans_restarts(X, k: int, random_state: int, n_init: int = 10, jobs: int = 1, threads: int = 1,
+                    early_stop: int = 0) -> Tuple[np.ndarray, np.ndarray, float, Dict]:
+    """
+    Рестарти KMeans з детермінованими seed-ами; найкращий - з найменшою інерцією (при рівності - перший).
+    Результати розглядаються в порядку seed-ів, тож рішення про ранню зупинку та вибір
+    найкращого не залежать від кількості процесів.
+    """
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    seeds = restart_seeds(random_state, n_init)
+    best, matches, used = None, 0, 0
+
+    def consider(result) -> bool:
+        nonlocal best, matches, used
+        used += 1
+        if best is None or result[2] < best[2] * (1 - EARLY_STOP_RTOL):
+            best, matches = result, 1
+        elif result[2] <= best[2] * (1 + EARLY_STOP_RTOL):
+            matches += 1
+        return early_stop > 0 and matches >= early_stop
+
+    started = time.perf_counter()
+    submitted = 0
+    if jobs <= 1:
+        for seed in seeds:
+            submitted += 1
+            if consider(_run_restart(X, k, seed, threads)):
+                break
+    else:
+        # у черзі не більше jobs рестартів: при ранній зупинці не чекаємо на ті, що ще рахуються
+        pool = ProcessPoolExecutor(max_workers=jobs, initializer=_init_restart_worker, initargs=(X, threads))
+        window = deque()
+        try:
+            for seed in seeds:
+                window.append(pool.submit(_worker_restart, k, int(seed)))
+                submitted += 1
+                if len(window) == jobs and consider(window.popleft().result()):
+                    break
+            else:
+                while window:
+                    if consider(window.popleft().result()):
+                        break
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+    wall = time.perf_counter() - started
+    report = {"restarts": used, "submitted": submitted, "n_init": n_init, "jobs": jobs, "threads": threads,
+              "wall": wall}
+    return best[0], best[1], best[2], report
+
+
+def fit_kmeans(X_scaled, config) -> Tuple[np.ndarray, np.ndarray, float]:
+    """KMeans з бюджетом обчислень з config та звітом про рестарти"""
+    k = int(config["N_CLUSTERS"])
+    jobs, threads = compute_budget(config)
+    n_init = int(config.get("KMEANS_N_INIT", 10))
+    early_stop = int(config.get("KMEANS_EARLY_STOP") or 0)
+    labels, centers, inertia, report = kmeans_restarts(X_scaled, k, config["RANDOM_STATE"], n_init,
+                                                       jobs, threads, early_stop)
+    stopped = f" - рання зупинка після {report['restarts']}/{n_init}" if report["restarts"] < n_init else ""
+    print(f"🧮 KMeans: {report['restarts']} рестартів (процеси: {jobs}, потоки: {threads}) "
+          f"за {report['wall']:.2f} с{stopped}")
+
+    if config.get("KMEANS_VERIFY_SERIAL") and jobs > 1:
+        serial_labels, _, _, serial = kmeans_restarts(X_scaled, k, config["RANDOM_STATE"], n_init,
+                                                      1, threads * jobs, early_stop)
+        same = np.array_equal(serial_labels, labels)
+        print(f"🔁 Послідовний запуск: {serial['wall']:.2f} с → прискорення ×{serial['wall'] / report['wall']:.1f}; "
+              f"мітки {'ідентичні ✅' if same else 'відрізняються ❌'}")
+    return labels, centers, inertia
+
+
+def fit_clusters(X_scaled, config, track_ids=None, checkpoint=None, cleaning=None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Кластеризує X_scaled згідно з CLUSTERING_MODE, повертає (labels, centers) для всіх рядків.
+    cleaning (track_cleaning.TrackCleaning): центроїди навчаються лише на cleaning.fit_mask, решта
+    рядків отримує мітки через assign_excluded (у збалансованому режимі - в межах вільного місця).
+    """
+    k = int(config["N_CLUSTERS"])
+    mode = config.get("CLUSTERING_MODE", "kmeans")
+    if cleaning is not None and cleaning.fit_mask.all():
+        cleaning = None
+    X_fit = X_scaled if cleaning is None else X_scaled[cleaning.fit_mask]
+    if mode == "hierarchical":
+        from hierarchical_clustering import ClusterTree, cluster_centers
+
+        # Дерево містить усі рядки (виключені приєднані до мікрокластерів), тож розріз на інше K
+        # у hierarchical_clustering.py --cut не губить викиди та дублікати
+        started = time.perf_counter()
+        with threadpool_limits(limits=compute_budget(config)[1]):
+            tree = ClusterTree.build(X_scaled, track_ids if track_ids is not None else np.arange(len(X_scaled)),
+                                     config["RANDOM_STATE"], cleaning=cleaning)
+        if checkpoint is not None:
+            tree.save(checkpoint)
+        labels = tree.cut(k)
+        print(f"🌳 Дерево Ward над {tree.n_leaves} мікрокластерами ({time.perf_counter() - started:.2f} с); "
+              f"інші K: python hierarchical_clustering.py --cut K")
+        fit_labels = labels if cleaning is None else labels[cleaning.fit_mask]
+        return labels, cluster_centers(X_fit, fit_labels)
+
+    labels, centers, kmeans_inertia = fit_kmeans(X_fit, config)
+    size_limits = None
+
+    if mode == "balanced" and k > 1:
+        # Межі рахуються для всіх треків: виключені рядки потім займають лише вільне місце
+        min_size, max_size = size_limits = resolve_size_limits(len(X_scaled), k, config)
+        sizes_before = np.bincount(labels, minlength=k)
+        started = time.perf_counter()
+        labels, centers, inertia = balanced_kmeans(X_fit, centers, min(min_size, len(X_fit) // k), max_size)
+        if cleaning is not None:
+            labels = assign_excluded(X_scaled, cleaning, labels, centers, size_limits)
+        elapsed = time.perf_counter() - started
+        sizes_after = np.bincount(labels, minlength=k)
+        added = (inertia - kmeans_inertia) / kmeans_inertia if kmeans_inertia > 0 else 0.0
+        print(f"⚖️ Збалансовані кластери [{min_size}..{max_size}]: розміри {sizes_before.min()}-{sizes_before.max()} "
+              f"→ {sizes_after.min()}-{sizes_after.max()} | інерція {added:+.1%} відносно KMeans ({elapsed:.2f} с)")
+    elif mode != "kmeans":
+        print(f"⚠️ Невідомий CLUSTERING_MODE='{mode}', використовую kmeans")
+    if cleaning is not None and size_limits is None:
+        labels = assign_excluded(X_scaled, cleaning, labels, centers)
+    return labels, centers
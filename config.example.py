@@ -11,6 +11,9 @@ USERNAME = "your_spotify_username"  # можна лишити порожнім
 
 # Налаштування плейлістів
 SOURCE_PLAYLIST_URL = "https://open.spotify.com/playlist/37i9dQZF1DXcBWIGoYBM5M"
+# Джерело треків: "liked" - Liked Songs, "playlist" - SOURCE_PLAYLIST_URL
+# (повторно завантажується лише якщо змінився snapshot_id, кеш у .spotisplit_sources/)
+TRACK_SOURCE = "liked"
 N_CLUSTERS = 5  # скільки плейлістів створювати
 MAKE_PUBLIC = False  # True -> публічні плейлісти
 
@@ -18,6 +21,86 @@ MAKE_PUBLIC = False  # True -> публічні плейлісти
 PLAYLIST_NAME_PREFIX = "SpotiSplit"
 RANDOM_STATE = 42
 
+# Режим кластеризації: "kmeans", "balanced" (плейлісти з обмеженим розміром)
+# або "hierarchical" (дерево, яке можна розрізати на будь-яке K без перерахунку)
+CLUSTERING_MODE = "kmeans"
+MIN_PLAYLIST_SIZE = None  # None -> половина середнього розміру кластера
+MAX_PLAYLIST_SIZE = None  # None -> півтора середнього розміру кластера
+
+# Дублікати (та сама пісня на синглі, альбомі, збірці) та викиди (40-хвилинні треки, spoken word)
+# не впливають на центроїди: дублікати отримують кластер оригіналу, викиди - найближчого кластера
+DEDUP_TRACKS = True
+SKIP_DUPLICATES = True          # у плейліст пишеться лише оригінал пісні (False -> і дублікати)
+DEDUP_DURATION_TOLERANCE = 3.0  # секунди
+OUTLIER_METHOD = "zscore"       # "zscore" (медіана/MAD), "isolation" (IsolationForest) або None
+OUTLIER_THRESHOLD = 3.5
+
+# Ланцюжок джерел audio features: наступне джерело отримує лише треки, яких не покрили попередні;
+# "metadata" (останнім) імпутує решту з метаданих треку
+FEATURE_PROVIDERS = ("spotify", "metadata")
+# Локальний аналіз аудіо без Spotify endpoint: FEATURE_PROVIDERS = ("spotify", "local", "metadata")
+LOCAL_AUDIO_DIR = None       # директорія з файлами <track_id>.wav (mp3/ogg/flac/m4a - з librosa)
+LOCAL_AUDIO_WORKERS = None   # процеси для аналізу (None -> кількість ядер)
+
+# Жанри виконавців як додаткові характеристики (батчі по 50 виконавців, кеш .spotisplit_artists.json)
+GENRE_FEATURES = False
+GENRE_HASH_DIM = 32   # розмірність хешованого вектора жанрів
+GENRE_WEIGHT = 2.0    # вага всього блоку жанрів відносно однієї характеристики
+
+# Порядок треків у плейлісті: "smooth" - плавні переходи за темпом/енергією/тональністю, "added" - порядок додавання
+PLAYLIST_ORDER = "smooth"
+
+# Бюджет обчислень KMeans: рестарти з детермінованими seed-ами, мітки не залежать від кількості процесів
+KMEANS_N_INIT = 10
+KMEANS_JOBS = 1           # процеси для рестартів (None -> кількість ядер)
+KMEANS_THREADS = None     # BLAS/OpenMP потоки на процес (None -> ядра / KMEANS_JOBS)
+KMEANS_EARLY_STOP = 3     # зупинитись, коли стільки рестартів дали найкращу інерцію (0 -> всі рестарти)
+KMEANS_VERIFY_SERIAL = False  # повторити послідовно: показати прискорення та перевірити ідентичність міток
+
+# PCA-проєкція для графіків та дашборду (фітиться один раз на запуск):
+# "auto" (randomized SVD від 10000 треків), "full", "randomized" або "incremental" (читання блоками)
+PROJECTION_SOLVER = "auto"
+
+# Конвеєр характеристик: колонки, ваги, перетворення ("log", "cyclic" з period) та скейлер
+# ("standard", "robust", "minmax", "none"). None -> FEATURE_COLUMNS зі StandardScaler.
+# Навчений конвеєр кешується в .spotisplit_pipelines/ за хешем конфігурації (--refit-features - навчити заново)
+FEATURE_PIPELINE = None
+# FEATURE_PIPELINE = {
+#     "scaler": "robust",
+#     "features": {
+#         "danceability": {"weight": 2.0},
+#         "energy": {"weight": 1.5},
+#         "valence": {},
+#         "tempo": {"transform": "log"},
+#         "key": {"transform": "cyclic", "period": 12},
+#         "acousticness": {},
+#     },
+# }
+FEATURE_PIPELINE_REFIT = False
+
+# Прогрес довгих етапів (швидкість, ETA, оцінка запитів, що лишились) та JSON-lines журнал подій
+PROGRESS = "auto"          # "auto" - рядок у терміналі / рядок раз на 10 с при перенаправленні виводу, "off"
+PROGRESS_INTERVAL = 0.5    # секунди між оновленнями
+LOG_JSONL = None           # наприклад "spotisplit_events.jsonl": етапи, прогрес, записані плейлісти
+
+# Режим сервісу (python spotisplit_daemon.py): локальний API та планові інкрементальні оновлення
+DAEMON_HOST = "127.0.0.1"
+DAEMON_PORT = 8766
+DAEMON_REFRESH_MINUTES = 60  # 0/None -> оновлення лише за запитом API
+
+# Авторизація: спільне сховище токенів .spotisplit_tokens/ з фоновим оновленням
+AUTH_FLOW = "auto"          # "auto" (браузер у терміналі, без терміналу - лише збережений токен), "browser", "headless", "cached"
+SPOTIFY_USER = None         # ім'я токена для кількох облікових записів (None -> "default")
+TOKEN_REFRESH_MARGIN = 300  # секунди до закінчення дії токена, коли він оновлюється у фоні
+
+# HTTP транспорт (пул з'єднань та таймаути)
+MAX_WORKERS = 8              # паралельні воркери для завантаження/запису
+HTTP_POOL_SIZE = None        # None -> дорівнює MAX_WORKERS
+HTTP_CONNECT_TIMEOUT = 3.05  # секунди
+HTTP_READ_TIMEOUT = 15       # секунди
+HTTP_RETRIES = 3
+MAX_REQUESTS_PER_SECOND = 10  # спільний ліміт запитів для паралельних воркерів
+
 # Приклади налаштувань:
 # 
 # Для розбиття на 3 плейлісти:
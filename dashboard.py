@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+SpotiSplit - Локальний дашборд для перегляду кластерів
+Сервер без зовнішніх сервісів: віддає закешовані статистики кластерів та зменшену 2D-проєкцію
+у вигляді бінарних масивів (Float32/Uint16), повна таблиця треків у браузер не передається
+Використання: python3 dashboard.py [--run RUN_ID] [--port 8765] [--max-points 20000]
+"""
+
+import sys
+import json
+import argparse
+import webbrowser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+try:
+    import numpy as np
+    from run_checkpoints import RunCheckpoint, latest_run_id
+    from feature_store import load_feature_matrix, feature_frame
+    from similarity_index import CLUSTERS_FILE
+    from cluster_stats import STATS_STAGE, compute_cluster_stats
+    from projection import load_or_fit_projection, axis_labels
+except ImportError as e:
+    print(f"❌ Помилка імпорту: {e}")
+    print("📦 Встановіть залежності: pip install -r requirements.txt")
+    sys.exit(1)
+
+DASHBOARD_PORT = 8765
+DASHBOARD_MAX_POINTS = 20000
+DASHBOARD_MIN_CLUSTER_POINTS = 20  # малі кластери завжди видно на проєкції
+HEATMAP_FEATURES = 12
+
+
+def stratified_sample(labels, limit: int, seed: int = 0) -> np.ndarray:
+    """Відтворювана вибірка рядків пропорційно розміру кластерів (не менше DASHBOARD_MIN_CLUSTER_POINTS з кожного)"""
+    n = len(labels)
+    if n <= limit:
+        return np.arange(n)
+    rng = np.random.default_rng(seed)
+    clusters, inverse, counts = np.unique(labels, return_inverse=True, return_counts=True)
+    quota = np.maximum(np.floor(counts * limit / n).astype(np.int64), np.minimum(counts, DASHBOARD_MIN_CLUSTER_POINTS))
+    order = np.argsort(inverse, kind="stable")
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    rows = [rng.choice(order[s:s + c], q, replace=False) for s, c, q in zip(starts, counts, quota)]
+    return np.sort(np.concatenate(rows))
+
+
+def to_clip_space(xy) -> np.ndarray:
+    """Координати у [-1, 1] (готові для WebGL/canvas без перерахунку в браузері)"""
+    lo, hi = xy.min(axis=0), xy.max(axis=0)
+    span = np.where(hi > lo, hi - lo, 1.0)
+    return ((xy - lo) / span * 2.0 - 1.0).astype(np.float32)
+
+
+class DashboardData:
+    """Все, що віддає сервер, підготовлене один раз при старті"""
+
+    def __init__(self, checkpoint, max_points: int = DASHBOARD_MAX_POINTS):
+        self.run_id = checkpoint.run_id
+        matrix = load_feature_matrix(checkpoint)
+        labels = np.load(checkpoint.path(CLUSTERS_FILE))["labels"]
+
+        frame = checkpoint.load_frame("labels") if checkpoint.has("labels") else None
+        if checkpoint.has(STATS_STAGE):
+            stats = checkpoint.load_frame(STATS_STAGE)
+        elif frame is not None:
+            stats = compute_cluster_stats(frame)
+        else:
+            df = feature_frame(matrix).reset_index(drop=True)
+            df["cluster"] = labels
+            stats = compute_cluster_stats(df)
+        self.stats = stats
+        self.info = frame.drop_duplicates("track_id").set_index("track_id") if frame is not None else None
+
+        self.X = matrix.X
+        self.columns = matrix.columns
+        self.track_ids = matrix.track_ids
+        self.clusters = [int(c) for c in stats.clusters]
+        self.rows = stratified_sample(labels, max_points)
+        codes = np.searchsorted(np.asarray(self.clusters), labels[self.rows])
+        projection = load_or_fit_projection(checkpoint)
+        self.axes = axis_labels(projection)[:2]
+        self.points = to_clip_space(projection.coords[self.rows, :2]).tobytes()
+        self.codes = codes.astype(np.uint16).tobytes()
+        self.summary = json.dumps(self._summary(len(labels)), ensure_ascii=False).encode("utf-8")
+
+    def _summary(self, n_tracks: int):
+        stats = self.stats
+        features = stats.top_features(HEATMAP_FEATURES) or list(stats.means.columns[:HEATMAP_FEATURES])
+        means = stats.means[features]
+        z = ((means - means.mean()) / means.std().replace(0, 1)).fillna(0.0)
+        top_tracks = {}
+        if len(stats.top_tracks):
+            for cluster, row in stats.top_tracks.iterrows():
+                top_tracks.setdefault(str(int(cluster)), []).append(
+                    " - ".join(str(row[c]) for c in ("track_name", "artist") if c in row.index))
+        return {
+            "run_id": self.run_id,
+            "n_tracks": int(n_tracks),
+            "n_points": int(len(self.rows)),
+            "axes": self.axes,
+            "clusters": self.clusters,
+            "counts": [int(stats.counts[c]) for c in self.clusters],
+            "features": features,
+            "zscores": np.round(z.loc[self.clusters].to_numpy(), 3).tolist(),
+            "importance": {f: round(float(v), 3) for f, v in stats.importance.items()},
+            "top_tracks": top_tracks,
+        }
+
+    def point(self, i: int):
+        """Деталі одного треку з вибірки (запитується при наведенні)"""
+        row = int(self.rows[i])
+        t_id = str(self.track_ids[row])
+        result = {"track_id": t_id,
+                  "features": {c: round(float(v), 3) for c, v in zip(self.columns, self.X[row])}}
+        if self.info is not None and t_id in self.info.index:
+            meta = self.info.loc[t_id]
+            result.update({"track_name": str(meta.get("track_name", "")), "artist": str(meta.get("artist", ""))})
+        return result
+
+
+class DashboardHandler(BaseHTTPRequestHandler):
+    """HTTP-обробник: HTML-сторінка, JSON-зведення та бінарні масиви проєкції"""
+
+    data: DashboardData = None
+
+    def _send(self, body: bytes, content_type: str, status: int = 200):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-cache" if content_type.startswith("text/html") else "max-age=3600")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        data = self.data
+        if url.path == "/":
+            self._send(DASHBOARD_HTML.encode("utf-8"), "text/html; charset=utf-8")
+        elif url.path == "/api/summary":
+            self._send(data.summary, "application/json")
+        elif url.path == "/api/points.bin":
+            self._send(data.points, "application/octet-stream")
+        elif url.path == "/api/clusters.bin":
+            self._send(data.codes, "application/octet-stream")
+        elif url.path == "/api/point":
+            try:
+                i = int(parse_qs(url.query)["i"][0])
+                body = data.point(i)
+            except (KeyError, ValueError, IndexError):
+                self._send(b'{"error": "bad index"}', "application/json", 400)
+                return
+            self._send(json.dumps(body, ensure_ascii=False).encode("utf-8"), "application/json")
+        else:
+            self._send(b"not found", "text/plain", 404)
+
+    def log_message(self, format, *args):
+        pass
+
+
+DASHBOARD_HTML = """<!DOCTYPE html>
+<html lang="uk"><head><meta charset="utf-8"><title>SpotiSplit Dashboard</title>
+<style>
+body{font-family:sans-serif;margin:0;display:flex;height:100vh;background:#111;color:#ddd}
+#left{flex:1;position:relative}canvas{width:100%;height:100%;display:block}
+#side{width:420px;overflow:auto;padding:12px;background:#1b1b1b;font-size:13px}
+#tip{position:absolute;pointer-events:none;background:#000c;padding:6px;border-radius:4px;display:none;font-size:12px}
+.chip{display:inline-block;margin:2px;padding:2px 6px;border-radius:3px;cursor:pointer;color:#000}
+.chip.off{opacity:.25}table{border-collapse:collapse}td{padding:1px 3px;text-align:center;font-size:11px}
+</style></head><body>
+<div id="left"><canvas id="c"></canvas><div id="tip"></div></div>
+<div id="side"><h3 id="title">SpotiSplit</h3><div id="legend"></div><h4>Z-score середніх (топ характеристик)</h4>
+<div id="heat"></div><h4>Топ треки</h4><div id="tracks">Клікніть кластер у легенді</div></div>
+<script>
+const canvas=document.getElementById('c'),ctx=canvas.getContext('2d'),tip=document.getElementById('tip');
+let S,P,C,hidden=new Set(),colors=[];
+function color(i,n){return `hsl(${Math.round(360*i/n)},70%,55%)`}
+const ESC={'&':'&amp;','<':'&lt;','>':'&gt;','"':'&quot;',"'":'&#39;'};
+function esc(v){return String(v??'').replace(/[&<>"']/g,ch=>ESC[ch])}  // дані зі Spotify - лише екрановані
+async function load(){
+  [S,P,C]=await Promise.all([fetch('/api/summary').then(r=>r.json()),
+    fetch('/api/points.bin').then(r=>r.arrayBuffer()).then(b=>new Float32Array(b)),
+    fetch('/api/clusters.bin').then(r=>r.arrayBuffer()).then(b=>new Uint16Array(b))]);
+  colors=S.clusters.map((_,i)=>color(i,S.clusters.length));
+  document.getElementById('title').textContent=`Запуск ${S.run_id}: ${S.n_tracks} треків, показано ${S.n_points} (${S.axes.join(' × ')})`;
+  const legend=document.getElementById('legend');
+  S.clusters.forEach((c,i)=>{const el=document.createElement('span');el.className='chip';el.style.background=colors[i];
+    el.textContent=`${c} (${S.counts[i]})`;el.onclick=()=>{hidden.has(i)?hidden.delete(i):hidden.add(i);
+    el.classList.toggle('off');showTracks(c);draw()};legend.appendChild(el)});
+  let h='<table><tr><td></td>'+S.features.map(f=>`<td title="${esc(f)}">${esc(f.slice(0,6))}</td>`).join('')+'</tr>';
+  S.zscores.forEach((row,i)=>{h+=`<tr><td>${esc(S.clusters[i])}</td>`+row.map(z=>{const a=Math.min(Math.abs(z)/2,1);
+    return `<td style="background:${z>0?`rgba(220,60,60,${a})`:`rgba(60,90,220,${a})`}">${z.toFixed(1)}</td>`}).join('')+'</tr>'});
+  document.getElementById('heat').innerHTML=h+'</table>';
+  resize();
+}
+function showTracks(c){const t=S.top_tracks[String(c)]||[];
+  document.getElementById('tracks').innerHTML=`<b>Cluster ${esc(c)}</b><br>`+t.map(x=>'• '+esc(x)).join('<br>')}
+function resize(){canvas.width=canvas.clientWidth*devicePixelRatio;canvas.height=canvas.clientHeight*devicePixelRatio;draw()}
+function sx(x){return (x*0.95+1)/2*canvas.width}function sy(y){return (1-(y*0.95+1)/2)*canvas.height}
+function draw(){if(!P)return;ctx.fillStyle='#111';ctx.fillRect(0,0,canvas.width,canvas.height);
+  const r=2*devicePixelRatio;
+  for(let k=0;k<colors.length;k++){if(hidden.has(k))continue;ctx.fillStyle=colors[k];
+    for(let i=0;i<C.length;i++){if(C[i]===k)ctx.fillRect(sx(P[2*i])-r/2,sy(P[2*i+1])-r/2,r,r)}}}
+let pending=null;
+canvas.onmousemove=e=>{if(!P)return;const mx=e.offsetX*devicePixelRatio,my=e.offsetY*devicePixelRatio;
+  let best=-1,bd=64*devicePixelRatio*devicePixelRatio;
+  for(let i=0;i<C.length;i++){if(hidden.has(C[i]))continue;const dx=sx(P[2*i])-mx,dy=sy(P[2*i+1])-my,d=dx*dx+dy*dy;
+    if(d<bd){bd=d;best=i}}
+  if(best<0){tip.style.display='none';return}
+  tip.style.left=(e.offsetX+12)+'px';tip.style.top=(e.offsetY+12)+'px';
+  clearTimeout(pending);pending=setTimeout(()=>fetch('/api/point?i='+best).then(r=>r.json()).then(p=>{
+    tip.style.display='block';tip.innerHTML=`<b>${esc(p.track_name||p.track_id)}</b> ${esc(p.artist)}<br>Cluster ${esc(S.clusters[C[best]])}`}),60)};
+window.onresize=resize;load();
+</script></body></html>
+"""
+
+
+def main():
+    """Основна функція"""
+    parser = argparse.ArgumentParser(description="SpotiSplit - Локальний дашборд кластерів")
+    parser.add_argument("--run", type=str, metavar="RUN_ID", help="Запуск (за замовчуванням: останній)")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Адреса сервера (за замовчуванням: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=DASHBOARD_PORT, help=f"Порт (за замовчуванням: {DASHBOARD_PORT})")
+    parser.add_argument("--max-points", type=int, default=DASHBOARD_MAX_POINTS,
+                        help=f"Максимум точок на проєкції (за замовчуванням: {DASHBOARD_MAX_POINTS})")
+    parser.add_argument("--no-browser", action="store_true", help="Не відкривати браузер автоматично")
+    args = parser.parse_args()
+
+    run_id = args.run or latest_run_id()
+    if run_id is None:
+        print("❌ Збережених запусків не знайдено. Спочатку запустіть run_spotisplit.py")
+        return
+    try:
+        checkpoint = RunCheckpoint.resume(run_id)
+        data = DashboardData(checkpoint, args.max_points)
+    except FileNotFoundError as e:
+        print(f"❌ Запуск {run_id} не містить результатів кластеризації ({e})")
+        return
+
+    handler = type("RunDashboardHandler", (DashboardHandler,), {"data": data})
+    server = ThreadingHTTPServer((args.host, args.port), handler)
+    url = f"http://{args.host}:{args.port}/"
+    print(f"📊 Дашборд запуску {run_id}: {len(data.rows)} з {len(data.track_ids)} треків на проєкції")
+    print(f"🌐 {url} (Ctrl+C для зупинки)")
+    if not args.no_browser:
+        webbrowser.open(url)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Дашборд зупинено")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+SpotiSplit - Декларативний конвеєр характеристик
+FEATURE_PIPELINE у config.py описує колонки, їх ваги, перетворення (log, циклічне кодування key)
+та тип скейлера. Навчений конвеєр зберігається під хешем своєї конфігурації, тож повторні запуски,
+інкрементальне призначення та пошук схожих треків використовують рівно те саме перетворення
+"""
+
+import os
+import json
+import pickle
+import hashlib
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import MinMaxScaler, RobustScaler, StandardScaler
+
+# Значення за замовчуванням для config.py (можна перевизначити там)
+PIPELINE_DEFAULTS = {
+    "FEATURE_PIPELINE": None,        # None -> FEATURE_COLUMNS без ваг та перетворень, StandardScaler
+    "FEATURE_PIPELINE_REFIT": False,  # True -> навчати заново навіть за наявності збереженого (--refit-features)
+}
+
+PIPELINES_DIR = ".spotisplit_pipelines"
+PIPELINE_STAGE = "pipeline"
+SCALERS = {"standard": StandardScaler, "robust": RobustScaler, "minmax": MinMaxScaler, "none": None}
+TRANSFORMS = ("none", "log", "cyclic")
+
+
+def pipeline_columns(config, default: List[str]) -> List[str]:
+    """Вхідні колонки з FEATURE_PIPELINE (або default, якщо конвеєр не задано)"""
+    spec = config.get("FEATURE_PIPELINE")
+    if not spec or not spec.get("features"):
+        return list(default)
+    return list(spec["features"])
+
+
+class FeaturePipeline:
+    """Перетворення колонок -> масштабування -> ваги; fit один раз, transform скільки завгодно"""
+
+    def __init__(self, features: Dict[str, Dict[str, Any]], scaler: str = "standard"):
+        if scaler not in SCALERS:
+            raise ValueError(f"Невідомий скейлер '{scaler}' (доступні: {', '.join(SCALERS)})")
+        for name, opts in features.items():
+            if opts.get("transform", "none") not in TRANSFORMS:
+                raise ValueError(f"Невідоме перетворення '{opts['transform']}' для '{name}' (доступні: {', '.join(TRANSFORMS)})")
+        self.features = {name: dict(opts) for name, opts in features.items()}
+        self.scaler_name = scaler
+        self.scaler = None
+
+    @classmethod
+    def for_columns(cls, columns: List[str], config, default_weights: Optional[np.ndarray] = None) -> "FeaturePipeline":
+        """Конвеєр для колонок columns: налаштування з FEATURE_PIPELINE, решта - вага з default_weights, без перетворень"""
+        spec = config.get("FEATURE_PIPELINE") or {}
+        declared = spec.get("features") or {}
+        features = {}
+        for i, col in enumerate(columns):
+            opts = dict(declared.get(col) or {})
+            if "weight" not in opts and default_weights is not None:
+                opts["weight"] = float(default_weights[i])
+            features[col] = opts
+        return cls(features, spec.get("scaler", "standard"))
+
+    @property
+    def input_columns(self) -> List[str]:
+        return list(self.features)
+
+    @property
+    def output_columns(self) -> List[str]:
+        columns = []
+        for name, opts in self.features.items():
+            if opts.get("transform") == "cyclic":
+                columns += [f"{name}_sin", f"{name}_cos"]
+            else:
+                columns.append(name)
+        return columns
+
+    def config_hash(self) -> str:
+        """Хеш конфігурації (колонки, перетворення, ваги, скейлер) - ключ збереженого конвеєра"""
+        payload = json.dumps({"features": self.features, "scaler": self.scaler_name}, sort_keys=True)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:12]
+
+    def _expand(self, df: pd.DataFrame) -> np.ndarray:
+        blocks = []
+        for name, opts in self.features.items():
+            x = df[name].to_numpy(dtype=np.float64)
+            transform = opts.get("transform", "none")
+            if transform == "log":
+                blocks.append(np.log1p(np.maximum(x, 0))[:, None])
+            elif transform == "cyclic":
+                angle = 2 * np.pi * x / float(opts.get("period", 12))
+                blocks.append(np.column_stack([np.sin(angle), np.cos(angle)]))
+            else:
+                blocks.append(x[:, None])
+        return np.hstack(blocks).astype(np.float32)
+
+    def _weights(self) -> np.ndarray:
+        weights = []
+        for opts in self.features.values():
+            weights += [float(opts.get("weight", 1.0))] * (2 if opts.get("transform") == "cyclic" else 1)
+        return np.asarray(weights, dtype=np.float32)
+
+    def fit(self, df: pd.DataFrame) -> "FeaturePipeline":
+        scaler_cls = SCALERS[self.scaler_name]
+        self.scaler = scaler_cls().fit(self._expand(df)) if scaler_cls is not None else None
+        return self
+
+    def transform(self, df: pd.DataFrame) -> np.ndarray:
+        X = self._expand(df)
+        if self.scaler is not None:
+            X = self.scaler.transform(X).astype(np.float32)
+        weights = self._weights()
+        if not np.all(weights == 1.0):
+            X *= weights
+        return X
+
+    def transform_row(self, features: Dict[str, Any]) -> np.ndarray:
+        """Вектор для одного треку з сирих характеристик (напр. трек поза бібліотекою)"""
+        return self.transform(pd.DataFrame([{name: features.get(name) for name in self.features}]))[0]
+
+    # --- збереження ---
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def load(path: str) -> "FeaturePipeline":
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+
+def fit_or_load_pipeline(pipeline: FeaturePipeline, df: pd.DataFrame, checkpoint=None, refit: bool = False,
+                         root: str = PIPELINES_DIR) -> FeaturePipeline:
+    """
+    Бере навчений конвеєр з тим самим хешем конфігурації (з запуску або з PIPELINES_DIR) або навчає його на df.
+    Навчений конвеєр зберігається і в запуск (етап pipeline), і в PIPELINES_DIR для наступних запусків.
+    """
+    key = pipeline.config_hash()
+    shared_path = os.path.join(root, f"{key}.pkl")
+    candidates = []
+    if not refit:
+        if checkpoint is not None:
+            candidates.append(checkpoint.path(f"{PIPELINE_STAGE}.pkl"))
+        candidates.append(shared_path)
+    for path in candidates:
+        try:
+            fitted = FeaturePipeline.load(path)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            continue
+        if fitted.config_hash() == key:
+            print(f"♻️ Конвеєр характеристик {key} взято з {os.path.dirname(path)}/")
+            break
+    else:
+        fitted = pipeline.fit(df)
+        fitted.save(shared_path)
+        print(f"🧪 Конвеєр характеристик {key}: {len(fitted.output_columns)} колонок, скейлер {fitted.scaler_name}")
+    if checkpoint is not None:
+        fitted.save(checkpoint.path(f"{PIPELINE_STAGE}.pkl"))
+    return fitted
+
+
+def load_run_pipeline(checkpoint) -> Optional[FeaturePipeline]:
+    """Конвеєр, яким було побудовано матрицю характеристик запуску (None для старих запусків)"""
+    try:
+        return FeaturePipeline.load(checkpoint.path(f"{PIPELINE_STAGE}.pkl"))
+    except FileNotFoundError:
+        return None
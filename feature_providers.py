@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+SpotiSplit - Постачальники характеристик треків
+Ланцюжок FEATURE_PROVIDERS: кожен постачальник заповнює audio features для треків, яких не покрили
+попередні; "metadata" в кінці імпутує решту в той самий простір з характеристик метаданих (KNN),
+тож кожен трек отримує кластер за один прохід
+"""
+
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import KNeighborsRegressor
+from sklearn.preprocessing import StandardScaler
+
+from progress import progress
+from spotify_transport import batched
+from release_dates import MISSING_YEAR, parse_release_dates, release_ages
+
+# Значення за замовчуванням для config.py (можна перевизначити там)
+FEATURE_PROVIDER_DEFAULTS = {
+    "FEATURE_PROVIDERS": ("spotify", "metadata"),  # порядок ланцюжка; "metadata" - лише останнім
+}
+
+METADATA_SOURCE = "metadata"
+IMPUTE_NEIGHBORS = 10
+
+METADATA_FEATURE_COLUMNS = [
+    "duration_minutes", "popularity_normalized", "explicit", "is_local",
+    "track_position_ratio", "market_coverage", "age_normalized",
+    "album_type_numeric", "track_number", "disc_number", "available_markets",
+    "duration_ms", "popularity", "release_year", "age_years",
+    "popularity_duration", "age_popularity", "explicit_popularity",
+    "market_popularity", "duration_age"
+]
+
+
+def fetch_audio_features(sp, track_ids: List[str], max_workers: int = 1) -> Dict[str, Dict[str, Any]]:
+    """Отримує audio features для треків (батчі по 100, паралельно через пул з'єднань)"""
+    feats = {}
+    chunks = list(batched(track_ids, 100))
+    with progress("audio_features", total=len(track_ids)) as p, \
+            ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        for chunk, af in zip(chunks, pool.map(sp.audio_features, chunks)):
+            for t_id, f in zip(chunk, af or []):
+                if f:
+                    feats[t_id] = f
+            p.update(len(chunk), calls=1)
+    return feats
+
+
+def metadata_row(item) -> Dict[str, Any]:
+    """Рядок метаданих треку (без audio features)"""
+    t = item["track"]
+    return {
+        "track_id": t["id"],
+        "track_name": t["name"],
+        "artist": ", ".join([a["name"] for a in t["artists"]]),
+        "artist_ids": ",".join(a["id"] for a in t["artists"] if a.get("id")),
+        "album": t["album"]["name"] if t.get("album") else None,
+        "added_at": item.get("added_at"),
+        "duration_ms": t.get("duration_ms", 0),
+        "popularity": t.get("popularity", 0),
+        "explicit": t.get("explicit", False),
+        "uri": t.get("uri"),
+        "external_url": t.get("external_urls", {}).get("spotify"),
+        "release_date": t.get("album", {}).get("release_date") if t.get("album") else None,
+        "album_type": t.get("album", {}).get("album_type") if t.get("album") else None,
+        "is_local": t.get("is_local", False),
+        "track_number": t.get("track_number"),
+        "disc_number": t.get("disc_number"),
+        "available_markets": len(t.get("available_markets", [])),
+    }
+
+
+def build_metadata_features(df: pd.DataFrame, reference: Optional[datetime] = None) -> pd.DataFrame:
+    """Додає до df 20 числових характеристик з метаданих (METADATA_FEATURE_COLUMNS); вік - на момент reference"""
+    # Базові числові характеристики
+    df["explicit"] = df["explicit"].astype(int)
+    df["is_local"] = df["is_local"].astype(int)
+
+    # Заповнюємо відсутні значення
+    df = df.fillna(0)
+
+    # Створюємо додаткові характеристики
+    df["duration_minutes"] = df["duration_ms"] / 60000
+    df["popularity_normalized"] = df["popularity"] / 100.0
+    df["track_position_ratio"] = df["track_number"] / df["disc_number"].replace(0, 1)
+    df["market_coverage"] = df["available_markets"] / 100.0  # Нормалізуємо кількість ринків
+
+    # Створюємо часові характеристики з release_date (відсутня дата -> рік запуску, вік 0)
+    years, ordinals = parse_release_dates(df["release_date"])
+    reference = reference or datetime.now()
+    df["release_year"] = np.where(years == MISSING_YEAR, reference.year, years).astype(np.int16)
+    df["age_years"] = release_ages(ordinals, reference)
+    df["age_normalized"] = df["age_years"] / 50.0  # Нормалізуємо вік треку
+
+    # Створюємо розмірні характеристики
+    df["album_type_numeric"] = df["album_type"].map({
+        'album': 3, 'single': 1, 'compilation': 2, 'ep': 1.5
+    }).fillna(1)
+
+    # Додаємо взаємодії між характеристиками для розширення простору
+    df["popularity_duration"] = df["popularity_normalized"] * df["duration_minutes"]
+    df["age_popularity"] = df["age_normalized"] * df["popularity_normalized"]
+    df["explicit_popularity"] = df["explicit"] * df["popularity_normalized"]
+    df["market_popularity"] = df["market_coverage"] * df["popularity_normalized"]
+    df["duration_age"] = df["duration_minutes"] * df["age_normalized"]
+    return df
+
+
+def metadata_matrix(items, reference: Optional[datetime] = None) -> np.ndarray:
+    """Матриця METADATA_FEATURE_COLUMNS для items (рядки в тому ж порядку)"""
+    meta = build_metadata_features(pd.DataFrame([metadata_row(it) for it in items]), reference)
+    return meta[METADATA_FEATURE_COLUMNS].to_numpy(dtype=np.float32)
+
+
+# --- ланцюжок постачальників ---
+
+# name -> provider(sp, items, config) -> {track_id: {feature: value}}; items - лише ще не покриті треки
+FEATURE_PROVIDERS: Dict[str, Callable] = {}
+
+
+def register_provider(name: str):
+    """Реєструє постачальника audio features під іменем для FEATURE_PROVIDERS"""
+    def decorator(func):
+        FEATURE_PROVIDERS[name] = func
+        return func
+    return decorator
+
+
+@register_provider("spotify")
+def spotify_provider(sp, items, config):
+    """Spotify audio_features endpoint"""
+    if sp is None:
+        return {}
+    track_ids = [it["track"]["id"] for it in items]
+    return fetch_audio_features(sp, track_ids, max_workers=config.get("MAX_WORKERS", 1))
+
+
+@register_provider("local")
+def local_provider(sp, items, config):
+    """Характеристики, пораховані з аудіофайлів у LOCAL_AUDIO_DIR (local_audio_features.py)"""
+    from local_audio_features import extract_local_features
+
+    return extract_local_features([it["track"]["id"] for it in items], config)
+
+
+def metadata_only(config) -> bool:
+    """Ланцюжок лише з "metadata": кластеризація без audio features (run_spotisplit_no_audio.py)"""
+    chain = config.get("FEATURE_PROVIDERS", FEATURE_PROVIDER_DEFAULTS["FEATURE_PROVIDERS"])
+    return tuple(chain) == (METADATA_SOURCE,)
+
+
+def provider_stage(name: str) -> str:
+    """Етап чекпоінту постачальника ("features" - історична назва для Spotify)"""
+    return "features" if name == "spotify" else f"features_{name}"
+
+
+def collect_features(sp, items, config, checkpoint=None) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, str]]:
+    """Проходить ланцюжок постачальників; повертає (features_map, track_id -> джерело)"""
+    from run_checkpoints import run_stage
+
+    features_map: Dict[str, Dict[str, Any]] = {}
+    sources: Dict[str, str] = {}
+    for name in config.get("FEATURE_PROVIDERS", FEATURE_PROVIDER_DEFAULTS["FEATURE_PROVIDERS"]):
+        if name == METADATA_SOURCE:
+            continue
+        if name not in FEATURE_PROVIDERS:
+            print(f"⚠️ Невідомий постачальник характеристик '{name}', пропускаю")
+            continue
+        remaining = [it for it in items if it["track"]["id"] not in features_map]
+        if not remaining:
+            break
+        found = run_stage(checkpoint, provider_stage(name), lambda: FEATURE_PROVIDERS[name](sp, remaining, config))
+        for t_id, f in found.items():
+            if t_id not in features_map and f:
+                features_map[t_id] = f
+                sources[t_id] = name
+    return features_map, sources
+
+
+def impute_from_metadata(df: pd.DataFrame, items, feature_cols: List[str], n_neighbors: int = IMPUTE_NEIGHBORS,
+                         reference: Optional[datetime] = None) -> np.ndarray:
+    """
+    Заповнює відсутні feature_cols прогнозом KNN за метаданими (сусіди - треки з відомими характеристиками).
+    Повертає маску імпутованих рядків; df змінюється на місці.
+    """
+    missing = df[feature_cols].isna().any(axis=1).to_numpy()
+    known = ~missing
+    if not missing.any() or not known.any():
+        return np.zeros(len(df), dtype=bool)
+    meta = StandardScaler().fit_transform(metadata_matrix(items, reference))
+    model = KNeighborsRegressor(n_neighbors=min(n_neighbors, int(known.sum())), weights="distance")
+    model.fit(meta[known], df.loc[known, feature_cols].to_numpy(dtype=np.float64))
+    df.loc[missing, feature_cols] = model.predict(meta[missing])
+    return missing
+
+
+def resolve_feature_space(df: pd.DataFrame, items, feature_cols: List[str], sources: Dict[str, str],
+                          config, reference: Optional[datetime] = None) -> Tuple[pd.DataFrame, List[str]]:
+    """
+    Доводить df до простору кластеризації: імпутує відсутні audio features з метаданих, а якщо
+    жоден постачальник нічого не дав - кластеризує весь df за характеристиками метаданих.
+    Додає колонку feature_source та друкує кількість треків з кожного джерела; reference - момент
+    запуску для віку релізів.
+    """
+    chain = list(config.get("FEATURE_PROVIDERS", FEATURE_PROVIDER_DEFAULTS["FEATURE_PROVIDERS"]))
+    df["feature_source"] = df["track_id"].map(sources)
+
+    if METADATA_SOURCE in chain:
+        if not sources:
+            if len(chain) > 1:
+                print("⚠️ Жоден постачальник не повернув audio features - кластеризую за метаданими")
+            meta = build_metadata_features(pd.DataFrame([metadata_row(it) for it in items]), reference)
+            df = df.drop(columns=[c for c in df.columns if c in feature_cols or df[c].isna().all()])
+            columns = [c for c in meta.columns if c in METADATA_FEATURE_COLUMNS or c not in df.columns]
+            df = df.assign(**{c: meta[c].to_numpy() for c in columns})
+            df["feature_source"] = METADATA_SOURCE
+            feature_cols = METADATA_FEATURE_COLUMNS
+        else:
+            imputed = impute_from_metadata(df, items, feature_cols, reference=reference)
+            df.loc[imputed, "feature_source"] = METADATA_SOURCE
+
+    counts = df["feature_source"].fillna("—").value_counts()
+    print("📊 Джерела характеристик: " + ", ".join(f"{name} {n}" for name, n in counts.items()))
+    return df, feature_cols
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+SpotiSplit - Спільна матриця характеристик запуску
+Масштабована float32 матриця зберігається як .npy і відкривається через memory-map:
+кластеризація, метрики, візуалізація та пошук схожих треків читають її без копіювання
+"""
+
+import json
+from typing import List, NamedTuple
+
+import numpy as np
+
+MATRIX_FILE = "feature_matrix.npy"
+TRACK_IDS_FILE = "track_ids.npy"
+META_FILE = "feature_matrix.json"
+
+
+class FeatureMatrix(NamedTuple):
+    X: np.ndarray          # (n_tracks, n_features) float32, memory-mapped при читанні
+    track_ids: np.ndarray  # рядок матриці -> track_id
+    columns: List[str]     # назви характеристик
+
+
+def save_feature_matrix(checkpoint, X_scaled, track_ids, columns):
+    """Записує матрицю, індекс рядків та назви колонок у директорію запуску"""
+    np.save(checkpoint.path(MATRIX_FILE), np.ascontiguousarray(X_scaled, dtype=np.float32))
+    np.save(checkpoint.path(TRACK_IDS_FILE), np.asarray(track_ids, dtype=str))
+    with open(checkpoint.path(META_FILE), "w", encoding="utf-8") as f:
+        json.dump({"columns": list(columns), "shape": list(np.shape(X_scaled))}, f)
+
+
+def load_feature_matrix(checkpoint, mmap: bool = True) -> FeatureMatrix:
+    """Відкриває матрицю запуску (за замовчуванням read-only memory-map, без читання в пам'ять)"""
+    X = np.load(checkpoint.path(MATRIX_FILE), mmap_mode="r" if mmap else None)
+    track_ids = np.load(checkpoint.path(TRACK_IDS_FILE))
+    with open(checkpoint.path(META_FILE), encoding="utf-8") as f:
+        meta = json.load(f)
+    return FeatureMatrix(X, track_ids, meta["columns"])
+
+
+def feature_frame(matrix: FeatureMatrix):
+    """pandas DataFrame поверх матриці без копіювання даних (індекс - track_id)"""
+    import pandas as pd
+
+    return pd.DataFrame(matrix.X, index=pd.Index(matrix.track_ids, name="track_id"),
+                        columns=matrix.columns, copy=False)
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+SpotiSplit - Ієрархічна кластеризація з повторно використовуваним деревом
+Одне дерево Ward над мікрокластерами KMeans; будь-яке K або вкладені плейлісти ("2 → 2a, 2b") без перерахунку
+Використання: python3 hierarchical_clustering.py --cut K [--nested] [--run RUN_ID] [--create-playlists]
+"""
+
+import sys
+import string
+import argparse
+from typing import Dict, List, Tuple
+
+try:
+    import numpy as np
+    from scipy.cluster.hierarchy import linkage, to_tree
+    from sklearn.cluster import MiniBatchKMeans
+    from sklearn.metrics import pairwise_distances_argmin
+    from run_checkpoints import RunCheckpoint, latest_run_id
+except ImportError as e:
+    print(f"❌ Помилка імпорту: {e}")
+    print("📦 Встановіть залежності: pip install -r requirements.txt")
+    sys.exit(1)
+
+TREE_FILE = "tree.npz"
+HIERARCHY_MICRO_CLUSTERS = 512
+
+
+class ClusterTree:
+    """Дерево Ward над мікрокластерами: micro_labels (трек → мікрокластер) та linkage-матриця"""
+
+    def __init__(self, track_ids, micro_labels, Z):
+        self.track_ids = np.asarray(track_ids)
+        self.micro_labels = np.asarray(micro_labels, dtype=np.int64)
+        self.Z = np.asarray(Z, dtype=np.float64)
+
+    @property
+    def n_leaves(self) -> int:
+        return len(self.Z) + 1
+
+    @classmethod
+    def build(cls, X_scaled, track_ids, random_state: int = 42, n_micro: int = HIERARCHY_MICRO_CLUSTERS,
+              cleaning=None) -> "ClusterTree":
+        """
+        Стискає X_scaled до n_micro мікрокластерів і будує над ними дерево Ward.
+        cleaning (track_cleaning.TrackCleaning): мікрокластери навчаються лише на fit_mask; викиди
+        приєднуються до найближчого мікрокластера, дублікати - до мікрокластера оригіналу, тож
+        будь-який розріз дерева містить усі треки.
+        """
+        X = np.asarray(X_scaled, dtype=np.float32)
+        fit = np.ones(len(X), dtype=bool) if cleaning is None else cleaning.fit_mask
+        X_fit = X[fit]
+        if len(X_fit) <= n_micro:
+            fit_micro = np.arange(len(X_fit))
+            centers = X_fit
+        else:
+            mbk = MiniBatchKMeans(n_clusters=n_micro, random_state=random_state, n_init=3, batch_size=4096)
+            fit_micro = mbk.fit_predict(X_fit)
+            centers = mbk.cluster_centers_
+        micro_labels = np.empty(len(X), dtype=np.int64)
+        micro_labels[fit] = fit_micro
+        if not fit.all():
+            rest = np.flatnonzero(~fit)
+            micro_labels[rest] = pairwise_distances_argmin(X[rest], centers)
+            dup = np.flatnonzero(cleaning.duplicates)
+            micro_labels[dup] = micro_labels[cleaning.canonical[dup]]
+        Z = linkage(np.asarray(centers, dtype=np.float64), method="ward")
+        return cls(track_ids, micro_labels, Z)
+
+    def save(self, checkpoint):
+        np.savez(checkpoint.path(TREE_FILE), track_ids=self.track_ids.astype(str),
+                 micro_labels=self.micro_labels, Z=self.Z)
+
+    @classmethod
+    def load(cls, checkpoint) -> "ClusterTree":
+        data = np.load(checkpoint.path(TREE_FILE))
+        return cls(data["track_ids"], data["micro_labels"], data["Z"])
+
+    def _level_roots(self, k: int) -> List[int]:
+        """Вузли дерева, що утворюють k кластерів: ще не злиті після перших n_leaves-k об'єднань"""
+        m = self.n_leaves
+        merged = set(self.Z[:m - k, :2].astype(int).ravel())
+        return sorted(i for i in range(m + (m - k)) if i not in merged)
+
+    def cut(self, k: int) -> np.ndarray:
+        """Мітки 0..k-1 для кожного треку при розрізі дерева на k кластерів"""
+        labels, _ = self.cut_nested(k, split=False)
+        return labels
+
+    def cut_nested(self, k: int, split: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+        """Розріз на k кластерів, кожен з яких ділиться на двох нащадків у дереві: (мітки, підмітки 0/1)"""
+        k = max(1, min(int(k), self.n_leaves))
+        m = self.n_leaves
+        if m == 1:
+            zeros = np.zeros(len(self.micro_labels), dtype=np.int64)
+            return zeros, zeros
+        _, nodes = to_tree(self.Z, rd=True)
+
+        leaf_cluster = np.zeros(m, dtype=np.int64)
+        leaf_child = np.zeros(m, dtype=np.int64)
+        for c, root in enumerate(self._level_roots(k)):
+            node = nodes[root]
+            children = [node] if (node.is_leaf() or not split) else [node.get_left(), node.get_right()]
+            for sub, child in enumerate(children):
+                leaves = child.pre_order()
+                leaf_cluster[leaves] = c
+                leaf_child[leaves] = sub
+        return leaf_cluster[self.micro_labels], leaf_child[self.micro_labels]
+
+
+def cluster_centers(X_scaled, labels) -> np.ndarray:
+    """Центроїди кластерів як середні по мітках"""
+    k = int(labels.max()) + 1
+    X = np.asarray(X_scaled, dtype=np.float64)
+    sums = np.zeros((k, X.shape[1]))
+    np.add.at(sums, labels, X)
+    counts = np.maximum(np.bincount(labels, minlength=k), 1)
+    return sums / counts[:, None]
+
+
+def nested_names(labels, sub_labels) -> List[str]:
+    """Назви вкладених кластерів: "2a", "2b" ..."""
+    return [f"{c}{string.ascii_lowercase[s]}" for c, s in zip(labels, sub_labels)]
+
+
+def load_or_build_tree(checkpoint, random_state: int = 42) -> ClusterTree:
+    """Бере збережене дерево запуску або будує його з індексу характеристик"""
+    try:
+        return ClusterTree.load(checkpoint)
+    except FileNotFoundError:
+        from similarity_index import SimilarityIndex
+
+        index = SimilarityIndex.load(checkpoint)
+        print(f"🌳 Будую дерево для {len(index.track_ids)} треків...")
+        tree = ClusterTree.build(index.X, index.track_ids, random_state)
+        tree.save(checkpoint)
+        return tree
+
+
+def main():
+    """Основна функція"""
+    parser = argparse.ArgumentParser(description="SpotiSplit - Розріз збереженого дерева кластерів на будь-яке K")
+    parser.add_argument("--cut", type=int, required=True, metavar="K", help="Кількість кластерів")
+    parser.add_argument("--nested", action="store_true", help="Поділити кожен кластер на два вкладені (2 → 2a, 2b)")
+    parser.add_argument("--run", type=str, metavar="RUN_ID", help="Запуск (за замовчуванням: останній)")
+    parser.add_argument("--create-playlists", action="store_true", help="Створити плейлісти за розрізом")
+    args = parser.parse_args()
+
+    run_id = args.run or latest_run_id()
+    if run_id is None:
+        print("❌ Збережених запусків не знайдено. Спочатку запустіть run_spotisplit.py")
+        return
+    checkpoint = RunCheckpoint.resume(run_id)
+    try:
+        tree = load_or_build_tree(checkpoint)
+    except FileNotFoundError:
+        print(f"❌ Запуск {run_id} не містить індексу характеристик")
+        return
+
+    if args.nested:
+        labels, sub_labels = tree.cut_nested(args.cut)
+        names = np.asarray(nested_names(labels, sub_labels))
+    else:
+        names = tree.cut(args.cut).astype(str)
+
+    groups: Dict[str, np.ndarray] = {name: tree.track_ids[names == name] for name in sorted(set(names), key=lambda n: (len(n), n))}
+    print(f"✂️ Розріз дерева запуску {run_id} на {args.cut} кластерів{' (вкладені)' if args.nested else ''}:")
+    for name, ids in groups.items():
+        print(f"   • Cluster {name}: {len(ids)} треків")
+
+    if args.create_playlists:
+        from run_spotisplit import load_config, authenticate_spotify, create_playlist, add_tracks_to_playlist, playlist_naming
+        from playlist_manifest import record_playlist
+
+        config = load_config()
+        sp, user_id = authenticate_spotify(config)
+        if sp is None:
+            return
+        base_name, desc = playlist_naming(config, checkpoint.load_json("run") or {})
+        for name, ids in groups.items():
+            pl_name = f"{base_name} · Cluster {name} / {args.cut}"
+            pl_id = create_playlist(sp, user_id, name=pl_name, description=f"{desc} (дерево запуску {run_id})",
+                                    public=config["MAKE_PUBLIC"])
+            record_playlist(pl_id, pl_name, run_id, user_id)
+            add_tracks_to_playlist(sp, pl_id, [f"spotify:track:{t_id}" for t_id in ids])
+            print(f"📦 {pl_name}: додано {len(ids)} треків")
+
+
+if __name__ == "__main__":
+    main()
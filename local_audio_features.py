@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+SpotiSplit - Локальний розрахунок audio features з аудіофайлів
+Постачальник "local" для FEATURE_PROVIDERS: темп, енергія, гучність та спектральні характеристики
+рахуються з файлів/прев'ю на диску (ім'я файлу - Spotify track ID) у пулі процесів; результати
+кешуються за хешем вмісту файлу, тож повторний запуск не декодує аудіо знову, а незмінені
+(розмір, mtime) файли не хешуються знову
+Використання: python3 local_audio_features.py DIR [--workers N]
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from scipy.io import wavfile
+
+from progress import progress
+
+try:
+    import librosa  # необов'язково: mp3/ogg/flac/m4a; WAV читається без нього
+except ImportError:
+    librosa = None
+
+# Значення за замовчуванням для config.py (можна перевизначити там)
+LOCAL_AUDIO_DEFAULTS = {
+    "LOCAL_AUDIO_DIR": None,      # директорія з аудіофайлами <track_id>.wav/.mp3/...
+    "LOCAL_AUDIO_WORKERS": None,  # процеси для аналізу (None -> кількість ядер)
+}
+
+AUDIO_CACHE_PATH = ".spotisplit_audio_features.json"
+AUDIO_MAX_SECONDS = 60
+N_FFT = 2048
+HOP = 512
+TEMPO_RANGE = (60.0, 200.0)
+WAV_EXTENSIONS = (".wav",)
+LIBROSA_EXTENSIONS = (".mp3", ".ogg", ".flac", ".m4a")
+
+
+def supported_extensions():
+    return WAV_EXTENSIONS + (LIBROSA_EXTENSIONS if librosa is not None else ())
+
+
+def index_audio_files(root: str) -> Dict[str, str]:
+    """track_id -> шлях до файлу для всіх підтримуваних файлів у root (рекурсивно)"""
+    extensions = supported_extensions()
+    files = {}
+    for dirpath, _, names in os.walk(root):
+        for name in names:
+            stem, ext = os.path.splitext(name)
+            if ext.lower() in extensions:
+                files[stem] = os.path.join(dirpath, name)
+    return files
+
+
+def file_hash(path: str, chunk_size: int = 1 << 20) -> str:
+    """SHA-1 вмісту файлу (ключ кешу: перейменування файлу не скидає результат)"""
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def load_audio(path: str, max_seconds: float = AUDIO_MAX_SECONDS):
+    """Моно float32 сигнал у [-1, 1] та частота дискретизації"""
+    if path.lower().endswith(WAV_EXTENSIONS):
+        sr, data = wavfile.read(path, mmap=True)
+        data = data[:int(sr * max_seconds)]
+        if data.dtype == np.uint8:
+            y = (data.astype(np.float32) - 128) / 128  # 8-бітний WAV беззнаковий, тиша - 128
+        elif np.issubdtype(data.dtype, np.integer):
+            y = data.astype(np.float32) / np.iinfo(data.dtype).max
+        else:
+            y = data.astype(np.float32)
+        if y.ndim > 1:
+            y = y.mean(axis=1)
+        return y, sr
+    if librosa is None:
+        raise ValueError(f"Для {os.path.splitext(path)[1]} потрібен librosa (pip install librosa)")
+    y, sr = librosa.load(path, sr=None, mono=True, duration=max_seconds)
+    return y.astype(np.float32), sr
+
+
+def analyze_audio(y: np.ndarray, sr: int) -> Optional[Dict[str, float]]:
+    """
+    Характеристики сигналу: loudness (dBFS), energy, tempo (BPM), спектральні centroid/rolloff/flatness, ZCR.
+    danceability (чіткість пульсу) та acousticness (частка низькочастотної, тональної енергії) -
+    локальні наближення однойменних характеристик Spotify у тому ж діапазоні [0, 1].
+    """
+    if len(y) < N_FFT:
+        return None
+    frames = np.lib.stride_tricks.sliding_window_view(y, N_FFT)[::HOP]
+    rms = np.sqrt(np.mean(frames.astype(np.float64) ** 2, axis=1))
+    spectrum = np.abs(np.fft.rfft(frames * np.hanning(N_FFT).astype(np.float32), axis=1))
+    power = spectrum.astype(np.float64) ** 2 + 1e-12
+    freqs = np.fft.rfftfreq(N_FFT, 1.0 / sr)
+
+    total = power.sum(axis=1)
+    centroid = float(np.mean((power * freqs).sum(axis=1) / total))
+    rolloff_bins = np.argmax(np.cumsum(power, axis=1) >= 0.85 * total[:, None], axis=1)
+    rolloff = float(np.mean(freqs[rolloff_bins]))
+    flatness = float(np.mean(np.exp(np.mean(np.log(power), axis=1)) / np.mean(power, axis=1)))
+    zcr = float(np.mean(np.abs(np.diff(np.signbit(y).astype(np.int8)))))
+
+    loudness = float(20 * np.log10(np.sqrt(np.mean(y.astype(np.float64) ** 2)) + 1e-10))
+    energy = float(np.clip((20 * np.log10(rms.mean() + 1e-10) + 60) / 60, 0, 1))
+
+    # Темп: автокореляція обвідної онсетів (спектральний потік) у межах TEMPO_RANGE
+    onset = np.maximum(np.diff(np.log1p(spectrum), axis=0), 0).sum(axis=1)
+    onset = onset - onset.mean()
+    n = len(onset)
+    ac = np.fft.irfft(np.abs(np.fft.rfft(onset, 2 * n)) ** 2)[:n]
+    frame_rate = sr / HOP
+    lo = max(1, int(frame_rate * 60 / TEMPO_RANGE[1]))
+    hi = min(n - 1, int(frame_rate * 60 / TEMPO_RANGE[0]) + 1)
+    if ac[0] <= 0 or hi <= lo:
+        tempo, pulse = 0.0, 0.0
+    else:
+        lag = lo + int(np.argmax(ac[lo:hi]))
+        tempo = float(60 * frame_rate / lag)
+        pulse = float(np.clip(ac[lag] / ac[0], 0, 1))
+
+    return {
+        "tempo": round(tempo, 2),
+        "energy": round(energy, 4),
+        "loudness": round(loudness, 2),
+        "danceability": round(pulse, 4),
+        "acousticness": round(float(np.clip(1 - centroid / 5000.0, 0, 1) * (1 - flatness)), 4),
+        "spectral_centroid": round(centroid, 1),
+        "spectral_rolloff": round(rolloff, 1),
+        "spectral_flatness": round(flatness, 4),
+        "zero_crossing_rate": round(zcr, 5),
+    }
+
+
+def analyze_file(path: str) -> Optional[Dict[str, float]]:
+    """Декодує та аналізує один файл (запускається у процесі-воркері)"""
+    try:
+        y, sr = load_audio(path)
+        return analyze_audio(y, sr)
+    except Exception as e:
+        print(f"⚠️ {os.path.basename(path)}: {e}")
+        return None
+
+
+def load_cache(path: str = AUDIO_CACHE_PATH) -> Dict[str, Any]:
+    """{"features": хеш -> характеристики, "files": шлях -> [розмір, mtime_ns, хеш]}"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            cache = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {"features": {}, "files": {}}
+    if "features" not in cache:  # старий формат: лише хеш -> характеристики
+        return {"features": cache, "files": {}}
+    return cache
+
+
+def save_cache(cache: Dict[str, Any], path: str = AUDIO_CACHE_PATH):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(cache, f)
+    os.replace(tmp, path)
+
+
+def cached_file_hash(path: str, files: Dict[str, list]) -> str:
+    """Хеш файлу з індексу files, якщо розмір і mtime не змінились; інакше файл хешується знову"""
+    st = os.stat(path)
+    key = os.path.abspath(path)
+    entry = files.get(key)
+    if entry is not None and entry[0] == st.st_size and entry[1] == st.st_mtime_ns:
+        return entry[2]
+    h = file_hash(path)
+    files[key] = [st.st_size, st.st_mtime_ns, h]
+    return h
+
+
+def extract_features(paths: Dict[str, str], max_workers: Optional[int] = None,
+                     cache_path: str = AUDIO_CACHE_PATH) -> Dict[str, Dict[str, float]]:
+    """
+    track_id -> характеристики для файлів paths; нові файли аналізуються паралельно, відомі беруться з кешу.
+    Вміст хешується лише для нових файлів або файлів зі зміненим розміром/mtime.
+    Невдалий аналіз не кешується: файл буде проаналізовано знову при наступному запуску.
+    """
+    cache = load_cache(cache_path)
+    features, files = cache["features"], cache["files"]
+    indexed = dict(files)
+    hashes = {t_id: cached_file_hash(path, files) for t_id, path in paths.items()}
+    hits = sum(1 for h in hashes.values() if features.get(h))
+    todo = sorted({h: paths[t_id] for t_id, h in hashes.items() if features.get(h) is None}.items())
+
+    if todo:
+        workers = max(1, min(len(todo), max_workers or os.cpu_count() or 1))
+        started = time.perf_counter()
+        with progress("local_audio", total=len(todo), unit="файлів") as p, \
+                ProcessPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(analyze_file, [path for _, path in todo], chunksize=max(1, len(todo) // (workers * 4)))
+            for (h, _), f in zip(todo, results):
+                if f:
+                    features[h] = f
+                p.update()
+        elapsed = time.perf_counter() - started
+        print(f"🎛️ Проаналізовано {len(todo)} аудіофайлів у {workers} процесах за {elapsed:.1f} с "
+              f"({len(todo) / max(elapsed, 1e-9):.1f} файлів/с)")
+    if todo or files != indexed:
+        # записи None від попередніх версій теж прибираються
+        save_cache({"features": {h: f for h, f in features.items() if f}, "files": files}, cache_path)
+
+    result = {t_id: features[h] for t_id, h in hashes.items() if features.get(h)}
+    failed = len(paths) - len(result)
+    print(f"🎛️ Локальні характеристики: {hits} з кешу, {len(result) - hits} нових"
+          + (f", не вдалося {failed} (повтор при наступному запуску)" if failed else ""))
+    return result
+
+
+def extract_local_features(track_ids: List[str], config) -> Dict[str, Dict[str, float]]:
+    """Постачальник "local": характеристики для track_ids, для яких є файл у LOCAL_AUDIO_DIR"""
+    root = config.get("LOCAL_AUDIO_DIR")
+    if not root or not os.path.isdir(root):
+        print("⚠️ LOCAL_AUDIO_DIR не задано або не існує - постачальник 'local' пропущено")
+        return {}
+    files = index_audio_files(root)
+    paths = {t_id: files[t_id] for t_id in track_ids if t_id in files}
+    if not paths:
+        return {}
+    return extract_features(paths, config.get("LOCAL_AUDIO_WORKERS"))
+
+
+def main():
+    """Основна функція"""
+    parser = argparse.ArgumentParser(description="SpotiSplit - Локальний аналіз аудіофайлів")
+    parser.add_argument("dir", type=str, help="Директорія з аудіофайлами (<track_id>.wav, ...)")
+    parser.add_argument("--workers", type=int, help="Кількість процесів (за замовчуванням: кількість ядер)")
+    args = parser.parse_args()
+
+    files = index_audio_files(args.dir)
+    if not files:
+        print(f"❌ У {args.dir} немає файлів {', '.join(supported_extensions())}")
+        sys.exit(1)
+    features = extract_features(files, args.workers)
+    for t_id, f in sorted(features.items())[:10]:
+        print(f"   • {t_id}: tempo {f['tempo']:.0f} BPM, energy {f['energy']:.2f}, loudness {f['loudness']:.1f} dB")
+    print(f"✅ Характеристики для {len(features)}/{len(files)} файлів (кеш: {AUDIO_CACHE_PATH})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+SpotiSplit - Локальний реєстр створених плейлістів
+Видалення працює за ID з реєстру, без перебору всіх плейлістів користувача
+"""
+
+import os
+import json
+import time
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional
+
+from progress import log_event, progress
+
+MANIFEST_PATH = ".spotisplit_manifest.json"
+
+_lock = threading.Lock()
+
+
+def load_manifest(path: str = MANIFEST_PATH) -> Dict[str, Dict[str, Any]]:
+    """{playlist_id: {"name", "run_id", "user_id", "created_at"}}"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def _save_manifest(manifest: Dict[str, Dict[str, Any]], path: str = MANIFEST_PATH):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, path)
+
+
+def record_playlist(playlist_id: str, name: str, run_id: Optional[str] = None, user_id: Optional[str] = None,
+                    path: str = MANIFEST_PATH):
+    """Додає створений плейліст до реєстру (user_id - власник, для кількох облікових записів)"""
+    with _lock:
+        manifest = load_manifest(path)
+        manifest[playlist_id] = {
+            "name": name,
+            "run_id": run_id,
+            "user_id": user_id,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        _save_manifest(manifest, path)
+
+
+def forget_playlists(playlist_ids: Iterable[str], path: str = MANIFEST_PATH):
+    """Прибирає плейлісти з реєстру"""
+    with _lock:
+        manifest = load_manifest(path)
+        for pl_id in playlist_ids:
+            manifest.pop(pl_id, None)
+        _save_manifest(manifest, path)
+
+
+def _list_user_playlists(sp, user_id: str, prefix: str) -> List[Dict[str, Any]]:
+    """Запасний варіант для плейлістів, створених до появи реєстру: перебір усіх плейлістів"""
+    playlists = []
+    results = sp.user_playlists(user_id, limit=50)
+    playlists.extend(results.get("items", []))
+    while results.get("next"):
+        results = sp.next(results)
+        playlists.extend(results.get("items", []))
+    return [{"id": pl["id"], "name": pl["name"]} for pl in playlists if prefix.lower() in pl["name"].lower()]
+
+
+def delete_spotisplit_playlists(sp, user_id: str, prefix: str = "SpotiSplit", assume_yes: bool = False,
+                                dry_run: bool = False, max_workers: int = 8, rate_limiter=None):
+    """
+    Видаляє плейлісти SpotiSplit користувача user_id з реєстру (паралельно, з обмеженням частоти запитів).
+    Записи інших користувачів не чіпаються; записи без user_id (до його появи в реєстрі) вважаються своїми.
+    """
+    manifest = {pl_id: meta for pl_id, meta in load_manifest().items() if meta.get("user_id") in (None, user_id)}
+    if manifest:
+        print(f"🗑️ Пошук плейлістів з '{prefix}' в назві в реєстрі {MANIFEST_PATH}...")
+        spotisplit_playlists = [{"id": pl_id, "name": meta["name"]} for pl_id, meta in manifest.items()
+                                if prefix.lower() in meta["name"].lower()]
+    else:
+        print(f"🗑️ У реєстрі немає плейлістів {user_id}, пошук плейлістів з '{prefix}' в назві серед усіх плейлістів...")
+        spotisplit_playlists = _list_user_playlists(sp, user_id, prefix)
+
+    if not spotisplit_playlists:
+        print(f"✅ Плейлісти з '{prefix}' в назві не знайдено")
+        return
+
+    print(f"🔍 Знайдено {len(spotisplit_playlists)} плейлістів для видалення:")
+    for pl in spotisplit_playlists:
+        print(f"   • {pl['name']} (ID: {pl['id']})")
+
+    if dry_run:
+        print(f"🧪 Dry run: нічого не видалено ({len(spotisplit_playlists)} плейлістів)")
+        return
+
+    # Підтвердження видалення
+    if not assume_yes:
+        confirm = input(f"\n⚠️ Ви впевнені, що хочете видалити {len(spotisplit_playlists)} плейлістів? (yes/no): ")
+        if confirm.lower() not in ['yes', 'y', 'так', 'т']:
+            print("❌ Видалення скасовано")
+            return
+
+    def unfollow(pl):
+        if rate_limiter is not None:
+            rate_limiter.wait()
+        try:
+            sp.user_playlist_unfollow(user_id, pl["id"])
+            return pl, None
+        except Exception as e:
+            return pl, e
+
+    # Видаляємо плейлісти паралельно
+    started = time.perf_counter()
+    deleted = []
+    with progress("delete", total=len(spotisplit_playlists), unit="плейлістів") as p, \
+            ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        # повідомлення друкуються з головного потоку, над рядком прогресу
+        for pl, error in pool.map(unfollow, spotisplit_playlists):
+            if error is None:
+                deleted.append(pl["id"])
+                p.echo(f"🗑️ Видалено: {pl['name']}")
+                log_event("playlist_deleted", playlist_id=pl["id"], name=pl["name"])
+            else:
+                p.echo(f"❌ Помилка видалення '{pl['name']}': {error}")
+                log_event("playlist_delete_failed", playlist_id=pl["id"], name=pl["name"], error=str(error))
+            p.update(calls=1)
+    elapsed = time.perf_counter() - started
+    forget_playlists(deleted)
+
+    rate = len(deleted) / elapsed if elapsed > 0 else float("inf")
+    print(f"✅ Успішно видалено {len(deleted)}/{len(spotisplit_playlists)} плейлістів "
+          f"за {elapsed:.1f} с ({rate:.1f} плейлістів/с)")
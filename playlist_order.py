@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+SpotiSplit - Порядок треків у плейлістах
+Треки кожного кластера вишиковуються в плавний маршрут у просторі характеристик (темп, енергія,
+тональність за квінтовим колом): жадібний найближчий сусід + 2-opt з векторизованим пошуком
+"""
+
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Значення за замовчуванням для config.py (можна перевизначити там)
+ORDER_DEFAULTS = {
+    "PLAYLIST_ORDER": "smooth",  # "smooth" - плавні переходи, "added" - порядок додавання в Liked Songs
+}
+
+ORDER_STAGE = "order"
+TRANSITION_FEATURES = ["tempo", "energy", "danceability", "valence", "loudness", "acousticness"]
+KEY_WEIGHT = 1.0          # вага тональності (квінтове коло) відносно однієї характеристики
+TWO_OPT_FULL_MAX = 1000   # до цього розміру 2-opt перебирає всі пари ребер
+TWO_OPT_WINDOW = 128      # для більших кластерів - лише пари в межах вікна маршруту
+TWO_OPT_MAX_SWEEPS = 20
+TWO_OPT_MAX_EVALS = 1_000_000  # бюджет перевірених пар ребер на кластер (детермінований, на відміну від таймауту)
+
+
+def transition_matrix(df: pd.DataFrame, fallback_cols: Optional[List[str]] = None) -> np.ndarray:
+    """Стандартизовані характеристики переходів; тональність - точка на квінтовому колі"""
+    cols = [c for c in TRANSITION_FEATURES if c in df.columns and df[c].notna().any()]
+    if not cols and fallback_cols:
+        cols = [c for c in fallback_cols if c in df.columns]
+    X = df[cols].to_numpy(dtype=np.float64) if cols else np.zeros((len(df), 0))
+    X = np.where(np.isnan(X), np.nanmean(X, axis=0), X) if X.size else X
+    std = X.std(axis=0) if X.size else np.ones(0)
+    X = (X - X.mean(axis=0)) / np.where(std > 0, std, 1.0) if X.size else X
+
+    if "key" in df.columns and df["key"].notna().any():
+        key = df["key"].fillna(0).to_numpy(dtype=np.float64)
+        angle = 2 * np.pi * ((key * 7) % 12) / 12  # сусіди на квінтовому колі - гармонійні переходи
+        X = np.hstack([X, KEY_WEIGHT * np.column_stack([np.cos(angle), np.sin(angle)])])
+    return np.ascontiguousarray(X, dtype=np.float32)
+
+
+def path_length(X: np.ndarray, order: np.ndarray) -> float:
+    if len(order) < 2:
+        return 0.0
+    return float(np.linalg.norm(np.diff(X[order], axis=0), axis=1).sum())
+
+
+def nearest_neighbour_path(X: np.ndarray) -> np.ndarray:
+    """Жадібний маршрут: старт з найвіддаленішої від центру точки, далі завжди до найближчої невідвіданої"""
+    n = len(X)
+    sq = np.einsum("ij,ij->i", X, X)
+    current = int(np.argmax(np.einsum("ij,ij->i", X - X.mean(axis=0), X - X.mean(axis=0))))
+    visited = np.zeros(n, dtype=bool)
+    order = np.empty(n, dtype=np.int64)
+    for step in range(n):
+        order[step] = current
+        visited[current] = True
+        if step == n - 1:
+            break
+        d = sq - 2.0 * (X @ X[current])
+        d[visited] = np.inf
+        current = int(np.argmin(d))
+    return order
+
+
+def _norms(V: np.ndarray) -> np.ndarray:
+    return np.sqrt(np.einsum("ij,ij->i", V, V))
+
+
+def two_opt(X: np.ndarray, order: np.ndarray, window: int, max_sweeps: int = TWO_OPT_MAX_SWEEPS,
+            max_evals: int = TWO_OPT_MAX_EVALS) -> np.ndarray:
+    """
+    2-opt для відкритого маршруту: для кожного ребра (i, i+1) одразу рахуються виграші від розвороту
+    сегментів до всіх j у вікні, застосовується найкращий. Завершується, коли покращень немає
+    або вичерпано бюджет max_evals перевірених пар (але не менше одного проходу).
+    """
+    order = order.copy()
+    n = len(order)
+    max_sweeps = max(1, min(max_sweeps, max_evals // max(1, n * min(window, n))))
+    for _ in range(max_sweeps):
+        improved = False
+        for i in range(n - 2):
+            hi = min(n, i + 2 + window)
+            a, b = X[order[i]], X[order[i + 1]]
+            C = X[order[i + 2:hi]]        # кінці сегментів, що розвертаються (j)
+            D = X[order[i + 3:hi + 1]]    # їх наступники (j + 1); в останнього треку наступника немає
+            m = len(D)
+            gain = np.sqrt(np.dot(a - b, a - b)) - _norms(C - a)
+            gain[:m] += _norms(C[:m] - D) - _norms(D - b)
+            k = int(np.argmax(gain))
+            if gain[k] > 1e-9:
+                j = i + 2 + k
+                order[i + 1:j + 1] = order[i + 1:j + 1][::-1]
+                improved = True
+        if not improved:
+            break
+    return order
+
+
+def sequence_tracks(X: np.ndarray) -> np.ndarray:
+    """Порядок рядків X для плавного прослуховування"""
+    n = len(X)
+    if n < 3 or X.shape[1] == 0:
+        return np.arange(n)
+    order = nearest_neighbour_path(X)
+    window = n if n <= TWO_OPT_FULL_MAX else TWO_OPT_WINDOW
+    return two_opt(X, order, window)
+
+
+def sequence_clusters(df: pd.DataFrame, feature_cols: Optional[List[str]] = None) -> Dict[str, int]:
+    """{track_id: позиція в плейлісті свого кластера} для всіх кластеризованих треків"""
+    positions: Dict[str, int] = {}
+    started = time.perf_counter()
+    before = after = 0.0
+    for c in sorted(df["cluster"].unique()):
+        if c == -1:
+            continue
+        part = df[df["cluster"] == c]
+        X = transition_matrix(part, feature_cols)
+        order = sequence_tracks(X)
+        before += path_length(X, np.arange(len(part)))
+        after += path_length(X, order)
+        positions.update({str(t_id): pos for pos, t_id in enumerate(part["track_id"].to_numpy()[order])})
+    change = (after - before) / before if before > 0 else 0.0
+    print(f"🎚️ Порядок треків: сумарна довжина переходів {change:+.0%} відносно порядку додавання "
+          f"({time.perf_counter() - started:.2f} с)")
+    return positions
+
+
+def order_tracks(df: pd.DataFrame, config, feature_cols: Optional[List[str]] = None, checkpoint=None) -> pd.DataFrame:
+    """Етап "order": колонка playlist_position для PLAYLIST_ORDER="smooth" (позиції кешуються із запуском)"""
+    mode = config.get("PLAYLIST_ORDER", ORDER_DEFAULTS["PLAYLIST_ORDER"])
+    if mode != "smooth":
+        if mode != "added":
+            print(f"⚠️ Невідомий PLAYLIST_ORDER='{mode}', залишаю порядок додавання")
+        return df
+    from run_checkpoints import run_stage
+
+    positions = run_stage(checkpoint, ORDER_STAGE, lambda: sequence_clusters(df, feature_cols))
+    df["playlist_position"] = df["track_id"].map(positions)
+    return df
+
+
+def ordered_cluster_uris(df: pd.DataFrame, cluster) -> List[str]:
+    """URI треків кластера в порядку плейліста"""
+    part = df[df["cluster"] == cluster]
+    if "playlist_position" in part.columns:
+        part = part.sort_values("playlist_position", kind="stable")
+    return part["uri"].dropna().tolist()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+SpotiSplit - Джерело треків: Liked Songs або плейліст SOURCE_PLAYLIST_URL
+Для плейліста зберігається останній snapshot_id та його треки (.spotisplit_sources/<playlist_id>.json):
+спершу один запит sp.playlist(fields="snapshot_id,name"), і лише якщо snapshot змінився -
+повне посторінкове завантаження
+"""
+
+import os
+import re
+import json
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from progress import log_event, progress
+
+# Значення за замовчуванням для config.py (можна перевизначити там)
+SOURCE_DEFAULTS = {
+    "TRACK_SOURCE": "liked",  # "liked" - Liked Songs, "playlist" - SOURCE_PLAYLIST_URL
+}
+
+SOURCE_CACHE_DIR = ".spotisplit_sources"
+
+
+def extract_playlist_id(url_or_id: str) -> str:
+    """Витягує ID плейліста з URL або ID"""
+    m = re.search(r"playlist/([a-zA-Z0-9]+)", url_or_id)
+    if m:
+        return m.group(1)
+    return url_or_id.strip()
+
+
+def fetch_playlist_items(sp, playlist_id: str) -> List[Dict[str, Any]]:
+    """Повне посторінкове завантаження треків плейліста (без епізодів та локальних)"""
+    results = sp.playlist_items(playlist_id, additional_types=["track"], market=None)
+    items = results.get("items", [])
+    with progress("playlist_items", total=results.get("total")) as p:
+        p.update(len(items), calls=1)
+        while results.get("next"):
+            results = sp.next(results)
+            items.extend(results.get("items", []))
+            p.update(len(results.get("items", [])), calls=1)
+    return [it for it in items if it.get("track") and it["track"].get("id")]
+
+
+def _cache_path(playlist_id: str, cache_dir: str) -> str:
+    return os.path.join(cache_dir, f"{playlist_id}.json")
+
+
+def load_cached_source(playlist_id: str, cache_dir: str = SOURCE_CACHE_DIR) -> Optional[Dict[str, Any]]:
+    try:
+        with open(_cache_path(playlist_id, cache_dir), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_cached_source(playlist_id: str, entry: Dict[str, Any], cache_dir: str = SOURCE_CACHE_DIR):
+    os.makedirs(cache_dir, exist_ok=True)
+    path = _cache_path(playlist_id, cache_dir)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(entry, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def get_playlist_tracks(sp, playlist_id: str, fetch: Callable = fetch_playlist_items,
+                        cache_dir: str = SOURCE_CACHE_DIR) -> List[Dict[str, Any]]:
+    """
+    Треки плейліста з перевіркою snapshot_id: незмінений плейліст коштує один запит.
+    snapshot читається до сторінок, тож зміна під час завантаження лише змусить наступний запуск перечитати все.
+    """
+    meta = sp.playlist(playlist_id, fields="snapshot_id,name")
+    snapshot_id, name = meta.get("snapshot_id"), meta.get("name") or playlist_id
+    cached = load_cached_source(playlist_id, cache_dir)
+    if cached is not None and snapshot_id and cached.get("snapshot_id") == snapshot_id:
+        print(f"♻️ Плейліст '{name}' не змінився з {cached.get('fetched_at')}: {len(cached['items'])} треків з кешу")
+        log_event("source_cached", playlist_id=playlist_id, snapshot_id=snapshot_id, tracks=len(cached["items"]))
+        return cached["items"]
+    items = fetch(sp, playlist_id)
+    save_cached_source(playlist_id, {
+        "snapshot_id": snapshot_id,
+        "name": name,
+        "fetched_at": datetime.now().isoformat(timespec="seconds"),
+        "items": items,
+    }, cache_dir)
+    log_event("source_fetched", playlist_id=playlist_id, snapshot_id=snapshot_id, tracks=len(items),
+              changed=cached is not None)
+    return items
+
+
+def source_label(config) -> str:
+    """Назва джерела для плейлістів та логів: "Liked Songs" або назва плейліста-джерела"""
+    if config.get("TRACK_SOURCE", "liked") != "playlist":
+        return "Liked Songs"
+    playlist_id = extract_playlist_id(config["SOURCE_PLAYLIST_URL"])
+    cached = load_cached_source(playlist_id)
+    return (cached or {}).get("name") or playlist_id
+
+
+def load_source_items(sp, config, get_liked: Callable) -> List[Dict[str, Any]]:
+    """Треки джерела TRACK_SOURCE; get_liked - завантажувач Liked Songs скрипта"""
+    source = config.get("TRACK_SOURCE", "liked")
+    if source == "liked":
+        return get_liked(sp)
+    if source != "playlist":
+        raise ValueError(f"Невідоме TRACK_SOURCE '{source}' (доступні: liked, playlist)")
+    return get_playlist_tracks(sp, extract_playlist_id(config["SOURCE_PLAYLIST_URL"]))
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+SpotiSplit - Профілювання етапів запуску (--profile)
+Кожен етап (ingest, features, dataframe, clustering, writes) профілюється окремо: cProfile (.prof для
+snakeviz/pstats) або вибірковий профайлер (стеки всіх потоків кожні кілька мс, .folded для flamegraph.pl
+/ speedscope). --profile-memory додає tracemalloc: пік пам'яті та знімок на етап.
+Результати - у директорії запуску profile/, зведення топ-N гарячих точок друкується наприкінці
+"""
+
+import os
+import sys
+import time
+import pstats
+import cProfile
+import threading
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+PROFILE_MODES = ("cprofile", "sample")
+PROFILE_DIR = "profile"
+SAMPLE_INTERVAL = 0.005  # секунди між вибірками стеків
+PROFILE_TOP = 15
+
+
+class StackSampler:
+    """Вибірковий профайлер: потік-семплер періодично знімає стеки всіх інших потоків (sys._current_frames)"""
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _run(self):
+        own = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                if ident not in names:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                stack.append(names.get(ident, str(ident)))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="spotisplit-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def dump(self, path: str):
+        """Згорнуті стеки (формат flamegraph.pl / speedscope): "потік;f1;f2 N" """
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+    def hotspots(self, top: int) -> List[str]:
+        """Функції з найбільшою кількістю власних вибірок (верхівка стеку)"""
+        leaves = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        total = sum(leaves.values()) or 1
+        return [f"{count / total:6.1%}  {name}" for name, count in leaves.most_common(top)]
+
+
+class StageProfiler:
+    """Профілі етапів одного запуску; неактивний профайлер не додає накладних витрат"""
+
+    def __init__(self, mode: Optional[str] = None, memory: bool = False, out_dir: Optional[str] = None,
+                 top: int = PROFILE_TOP):
+        if mode is not None and mode not in PROFILE_MODES:
+            raise ValueError(f"Невідомий профайлер '{mode}' (доступні: {', '.join(PROFILE_MODES)})")
+        self.mode = mode
+        self.memory = memory
+        self.out_dir = out_dir
+        self.top = top
+        self.stages: Dict[str, Dict] = {}
+        self._active = False
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode is not None or self.memory
+
+    @contextmanager
+    def stage(self, name: str):
+        if not self.enabled or self._active:  # вкладені етапи входять у профіль зовнішнього
+            yield
+            return
+        self._active = True
+        os.makedirs(self.out_dir, exist_ok=True)
+        record = {"name": name}
+        profiler = cProfile.Profile() if self.mode == "cprofile" else None
+        sampler = StackSampler() if self.mode == "sample" else None
+        if self.memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            start_mem = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        if sampler is not None:
+            sampler.start()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            if sampler is not None:
+                sampler.stop()
+            record["seconds"] = time.perf_counter() - started
+            if profiler is not None:
+                path = os.path.join(self.out_dir, f"{name}.prof")
+                profiler.dump_stats(path)
+                record["file"] = path
+                record["hotspots"] = cprofile_hotspots(profiler, self.top)
+            if sampler is not None:
+                path = os.path.join(self.out_dir, f"{name}.folded")
+                sampler.dump(path)
+                record["file"] = path
+                record["hotspots"] = sampler.hotspots(self.top)
+                record["samples"] = sampler.samples
+            if self.memory:
+                current, peak = tracemalloc.get_traced_memory()
+                record["peak_mb"] = (peak - start_mem) / 2 ** 20
+                record["retained_mb"] = (current - start_mem) / 2 ** 20
+                snapshot = tracemalloc.take_snapshot()
+                snapshot.dump(os.path.join(self.out_dir, f"{name}.tracemalloc"))
+                record["allocations"] = [str(s) for s in snapshot.statistics("lineno")[:5]]
+            self.stages[name] = record
+            self._active = False
+
+    def report(self):
+        """Зведення по етапах: час, пам'ять, топ гарячих точок"""
+        if not self.stages:
+            return
+        mode = self.mode or "лише пам'ять"
+        lines = [f"🔬 Профіль ({mode}), файли: {self.out_dir}/"]
+        for record in self.stages.values():
+            head = f"\n▶ {record['name']}: {record['seconds']:.2f} с"
+            if "peak_mb" in record:
+                head += f", пік пам'яті +{record['peak_mb']:.1f} MB (утримано {record['retained_mb']:+.1f} MB)"
+            if "samples" in record:
+                head += f", {record['samples']} вибірок"
+            lines.append(head)
+            lines.extend(f"   {line}" for line in record.get("hotspots", []))
+        if self.memory:
+            worst = max(self.stages.values(), key=lambda r: r.get("peak_mb", 0))
+            lines.append(f"\n💾 Найбільший пік пам'яті: {worst['name']} (+{worst['peak_mb']:.1f} MB), "
+                         f"найбільші утримані алокації на кінець етапу:")
+            lines.extend(f"   {line}" for line in worst["allocations"])
+        text = "\n".join(lines)
+        print("\n" + text)
+        with open(os.path.join(self.out_dir, "summary.txt"), "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+
+def cprofile_hotspots(profiler: cProfile.Profile, top: int) -> List[str]:
+    """Топ функцій за власним часом (tottime) з cumtime для контексту"""
+    stats = pstats.Stats(profiler)
+    rows = sorted(stats.stats.items(), key=lambda kv: kv[1][2], reverse=True)[:top]
+    total = stats.total_tt or 1e-9
+    result = []
+    for (filename, line, func), (cc, nc, tt, ct, _) in rows:
+        where = f"{os.path.basename(filename)}:{line}" if line else filename
+        result.append(f"{tt / total:6.1%}  {tt:7.3f} с власних, {ct:7.3f} с сукупно, {nc:>7} викликів  {func} ({where})")
+    return result
+
+
+_profiler = StageProfiler()
+
+
+def enable_profiling(mode: Optional[str], memory: bool, out_dir: str, top: int = PROFILE_TOP) -> StageProfiler:
+    """Вмикає профілювання етапів для поточного процесу (з main за --profile / --profile-memory)"""
+    global _profiler
+    _profiler = StageProfiler(mode, memory, out_dir, top)
+    return _profiler
+
+
+def profile_stage(name: str):
+    """with profile_stage("clustering"): ... - нічого не робить, якщо профілювання вимкнено"""
+    return _profiler.stage(name)
+
+
+def report_profile():
+    _profiler.report()
+
+
+def add_profile_arguments(parser):
+    """Спільні аргументи --profile/--profile-memory/--profile-top для скриптів запуску"""
+    parser.add_argument("--profile", nargs="?", const="cprofile", choices=PROFILE_MODES,
+                        help="Профілювати етапи: cprofile (.prof) або sample (.folded для flamegraph)")
+    parser.add_argument("--profile-memory", action="store_true", help="tracemalloc: пік пам'яті та знімок на етап")
+    parser.add_argument("--profile-top", type=int, default=PROFILE_TOP,
+                        help=f"Скільки гарячих точок показувати на етап (за замовчуванням: {PROFILE_TOP})")
+
+
+def setup_profiling(args, checkpoint):
+    """Вмикає профілювання з аргументів командного рядка; файли - у profile/ директорії запуску"""
+    if args.profile or args.profile_memory:
+        enable_profiling(args.profile, args.profile_memory, checkpoint.path(PROFILE_DIR), args.profile_top)
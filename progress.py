@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+SpotiSplit - Прогрес етапів та журнал подій
+Рядок прогресу з пропускною здатністю (елементи/с, запити/с), ETA та оцінкою запитів, що лишились;
+оновлюється не частіше PROGRESS_INTERVAL, тож update() у гарячих циклах майже нічого не коштує.
+Події (етапи, прогрес, плейлісти) за бажанням пишуться у JSON-lines журнал LOG_JSONL
+"""
+
+import sys
+import json
+import time
+import threading
+from datetime import datetime
+from typing import Optional
+
+# Значення за замовчуванням для config.py (можна перевизначити там)
+PROGRESS_DEFAULTS = {
+    "PROGRESS": "auto",        # "auto" - рядок прогресу в терміналі, періодичні рядки при перенаправленні виводу; "off"
+    "PROGRESS_INTERVAL": 0.5,  # секунди між оновленнями рядка прогресу
+    "LOG_JSONL": None,         # шлях до JSON-lines журналу подій (None -> без журналу)
+}
+
+BATCH_LOG_INTERVAL = 10.0  # без терміналу (лог у файл/CI) рядок прогресу друкується не частіше
+
+_settings = {"mode": "auto", "interval": 0.5}
+_log_lock = threading.Lock()
+_log_file = None
+
+
+def configure_progress(config):
+    """Застосовує PROGRESS/PROGRESS_INTERVAL/LOG_JSONL з config (викликається з main)"""
+    global _log_file
+    _settings["mode"] = config.get("PROGRESS", PROGRESS_DEFAULTS["PROGRESS"])
+    _settings["interval"] = float(config.get("PROGRESS_INTERVAL", PROGRESS_DEFAULTS["PROGRESS_INTERVAL"]))
+    path = config.get("LOG_JSONL")
+    with _log_lock:
+        if _log_file is not None:
+            _log_file.close()
+        _log_file = open(path, "a", encoding="utf-8", buffering=1) if path else None
+
+
+def log_event(event: str, **fields):
+    """Один рядок JSON у журнал LOG_JSONL (нічого не робить, якщо журнал не налаштовано)"""
+    if _log_file is None:
+        return
+    record = {"ts": datetime.now().isoformat(timespec="milliseconds"), "event": event, **fields}
+    line = json.dumps(record, ensure_ascii=False, default=str)
+    with _log_lock:
+        if _log_file is not None:
+            _log_file.write(line + "\n")
+
+
+def _duration(seconds: float) -> str:
+    if seconds < 60:
+        return f"{seconds:.0f} с"
+    if seconds < 3600:
+        return f"{seconds // 60:.0f} хв {seconds % 60:02.0f} с"
+    return f"{seconds // 3600:.0f} год {seconds % 3600 // 60:02.0f} хв"
+
+
+class StageProgress:
+    """
+    Прогрес одного етапу: with progress("audio_features", total=n) as p: ... p.update(len(chunk), calls=1).
+    update() потокобезпечний; вивід та подія журналу - лише раз на PROGRESS_INTERVAL.
+    """
+
+    def __init__(self, stage: str, total: Optional[int] = None, unit: str = "треків"):
+        self.stage = stage
+        self.total = total
+        self.unit = unit
+        self.done = 0
+        self.calls = 0
+        self.started = time.monotonic()
+        self.tty = _settings["mode"] != "off" and sys.stderr.isatty()
+        self.enabled = _settings["mode"] != "off"
+        self.interval = _settings["interval"] if self.tty else max(_settings["interval"], BATCH_LOG_INTERVAL)
+        self._next = self.started + self.interval
+        self._lock = threading.Lock()
+        self._drawn = False
+
+    def __enter__(self) -> "StageProgress":
+        log_event("stage_start", stage=self.stage, total=self.total)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.monotonic() - self.started
+        if self._drawn:
+            self._clear()
+        if self.enabled and elapsed >= self.interval:
+            print(f"⏱️ {self.stage}: {self.done} {self.unit} за {_duration(elapsed)} "
+                  f"({self.done / max(elapsed, 1e-9):.1f} {self.unit}/с, {self.calls} запитів)")
+        log_event("stage_end", stage=self.stage, done=self.done, total=self.total, calls=self.calls,
+                  seconds=round(elapsed, 3), status="failed" if exc_type else "ok")
+        return False
+
+    def set_total(self, total: Optional[int]):
+        self.total = total
+
+    def update(self, n: int = 1, calls: int = 0):
+        with self._lock:
+            self.done += n
+            self.calls += calls
+        now = time.monotonic()
+        if now >= self._next:
+            self._next = now + self.interval
+            self._report(now)
+
+    def snapshot(self, now: Optional[float] = None) -> dict:
+        """Поточні лічильники, швидкості, ETA та оцінка запитів, що лишились"""
+        elapsed = max((now or time.monotonic()) - self.started, 1e-9)
+        rate = self.done / elapsed
+        remaining = (self.total - self.done) if self.total is not None else None
+        return {
+            "stage": self.stage, "done": self.done, "total": self.total, "calls": self.calls,
+            "rate": round(rate, 2), "calls_per_s": round(self.calls / elapsed, 2),
+            "eta_s": round(remaining / rate, 1) if remaining is not None and rate > 0 else None,
+            "calls_left": (round(remaining * self.calls / self.done) if remaining is not None and self.done else None),
+        }
+
+    def _format(self, s: dict) -> str:
+        if s["total"]:
+            head = f"{s['done']}/{s['total']} ({s['done'] / s['total']:.0%})"
+        else:
+            head = f"{s['done']}"
+        parts = [f"⏳ {self.stage}: {head} {self.unit}", f"{s['rate']:.1f} {self.unit}/с"]
+        if s["calls"]:
+            parts[-1] += f", {s['calls_per_s']:.1f} запитів/с"
+        if s["eta_s"] is not None:
+            parts.append(f"ETA {_duration(s['eta_s'])}")
+        if s["calls_left"] is not None and s["calls"]:
+            parts.append(f"~{s['calls_left']} запитів лишилось")
+        return " | ".join(parts)
+
+    def _report(self, now: float, log: bool = True):
+        s = self.snapshot(now)
+        if log:
+            log_event("progress", **s)
+        if not self.enabled:
+            return
+        line = self._format(s)
+        if self.tty:
+            sys.stderr.write("\r" + line + "\x1b[K")
+            sys.stderr.flush()
+            self._drawn = True
+        else:
+            print(line, flush=True)
+
+    def _clear(self):
+        sys.stderr.write("\r\x1b[K")
+        sys.stderr.flush()
+        self._drawn = False
+
+    def echo(self, message: str):
+        """Друкує рядок над рядком прогресу (не розриваючи його)"""
+        if self._drawn:
+            self._clear()
+        print(message)
+        if self.tty and self.done:
+            self._report(time.monotonic(), log=False)
+
+
+def progress(stage: str, total: Optional[int] = None, unit: str = "треків") -> StageProgress:
+    """Контекст-менеджер прогресу етапу"""
+    return StageProgress(stage, total, unit)
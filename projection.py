@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+SpotiSplit - Проєкції простору характеристик запуску
+PCA фітиться один раз на запуск (randomized SVD для великих n, IncrementalPCA для потокового читання),
+компоненти та 2D/3D координати зберігаються поруч з матрицею і використовуються графіками та дашбордом
+"""
+
+import time
+from typing import NamedTuple
+
+import numpy as np
+from sklearn.decomposition import PCA, IncrementalPCA
+
+PROJECTION_FILE = "projection.npz"
+
+# Значення за замовчуванням для config.py (можна перевизначити там)
+PROJECTION_DEFAULTS = {
+    "PROJECTION_SOLVER": "auto",  # "auto", "full", "randomized" або "incremental"
+}
+
+RANDOMIZED_MIN_ROWS = 10000   # з цього розміру "auto" обирає randomized SVD
+INCREMENTAL_BATCH_SIZE = 65536
+
+
+class Projection(NamedTuple):
+    coords: np.ndarray                    # (n_tracks, n_components) float32, рядки як у матриці характеристик
+    components: np.ndarray                # (n_components, n_features)
+    mean: np.ndarray                      # (n_features,)
+    explained_variance_ratio: np.ndarray  # частка дисперсії кожної компоненти
+    solver: str
+
+
+def resolve_solver(solver: str, n_rows: int) -> str:
+    """Конкретний метод для PROJECTION_SOLVER="auto" з урахуванням розміру матриці"""
+    if solver == "auto":
+        return "randomized" if n_rows >= RANDOMIZED_MIN_ROWS else "full"
+    if solver not in ("full", "randomized", "incremental"):
+        print(f"⚠️ Невідомий PROJECTION_SOLVER='{solver}', використовую auto")
+        return resolve_solver("auto", n_rows)
+    return solver
+
+
+def fit_projection(X, n_components: int = 3, solver: str = "auto", random_state: int = 42,
+                   batch_size: int = INCREMENTAL_BATCH_SIZE) -> Projection:
+    """Фітить PCA на X (можна memory-mapped) і проєктує всі рядки"""
+    n, d = X.shape
+    n_components = max(1, min(n_components, d, n))
+    solver = resolve_solver(solver, n)
+    if solver == "randomized" and n_components >= min(n, d):
+        solver = "full"
+
+    started = time.perf_counter()
+    if solver == "incremental":
+        pca = IncrementalPCA(n_components=n_components, batch_size=batch_size)
+        for start in range(0, n, batch_size):
+            block = np.asarray(X[start:start + batch_size], dtype=np.float32)
+            if len(block) >= n_components:
+                pca.partial_fit(block)
+        coords = np.empty((n, n_components), dtype=np.float32)
+        for start in range(0, n, batch_size):
+            coords[start:start + batch_size] = pca.transform(np.asarray(X[start:start + batch_size], dtype=np.float32))
+    else:
+        pca = PCA(n_components=n_components, svd_solver=solver, random_state=random_state)
+        coords = pca.fit_transform(np.asarray(X, dtype=np.float32)).astype(np.float32)
+
+    explained = np.asarray(pca.explained_variance_ratio_, dtype=np.float64)
+    print(f"🧭 PCA ({solver}): {n_components} компоненти пояснюють {explained.sum():.1%} дисперсії "
+          f"({time.perf_counter() - started:.2f} с)")
+    return Projection(coords, pca.components_.astype(np.float32), pca.mean_.astype(np.float32), explained, solver)
+
+
+def save_projection(checkpoint, projection: Projection):
+    np.savez(checkpoint.path(PROJECTION_FILE), coords=projection.coords, components=projection.components,
+             mean=projection.mean, explained_variance_ratio=projection.explained_variance_ratio,
+             solver=np.asarray(projection.solver))
+
+
+def load_projection(checkpoint) -> Projection:
+    data = np.load(checkpoint.path(PROJECTION_FILE))
+    return Projection(data["coords"], data["components"], data["mean"], data["explained_variance_ratio"],
+                      str(data["solver"]))
+
+
+def load_or_fit_projection(checkpoint, solver: str = "auto", random_state: int = 42) -> Projection:
+    """Бере збережену проєкцію запуску або фітить її з матриці характеристик (для старих запусків)"""
+    try:
+        return load_projection(checkpoint)
+    except FileNotFoundError:
+        from feature_store import load_feature_matrix
+
+        projection = fit_projection(load_feature_matrix(checkpoint).X, solver=solver, random_state=random_state)
+        save_projection(checkpoint, projection)
+        return projection
+
+
+def axis_labels(projection: Projection):
+    """Підписи осей: "PC1 (34%)" ..."""
+    return [f"PC{i + 1} ({r:.0%})" for i, r in enumerate(projection.explained_variance_ratio)]
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+SpotiSplit - Дати релізів
+release_date у Spotify має різну точність: '1999', '1999-05' або '1999-05-01'. Кожен унікальний рядок
+розбирається один раз (таблиця пам'яті спільна для всіх викликів процесу), результат - компактні
+int16 роки та int32 порядкові номери днів; вік рахується від часу запуску, а не від фіксованого року
+"""
+
+from datetime import date, datetime
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+MISSING_YEAR = -1
+DAYS_PER_YEAR = 365.2425
+
+# рядок дати -> (рік, порядковий номер дня початку періоду); недійсні дати -> (MISSING_YEAR, 0)
+_parsed: Dict[str, Tuple[int, int]] = {}
+
+
+def parse_release_date(value: str) -> Tuple[int, int]:
+    """(рік, ordinal) для 'YYYY', 'YYYY-MM' або 'YYYY-MM-DD'; неповна дата - початок року/місяця"""
+    parts = value.strip().split("-")
+    try:
+        year = int(parts[0])
+        start = date(year, 1, 1).toordinal()
+    except ValueError:
+        return MISSING_YEAR, 0
+    try:
+        month = int(parts[1]) if len(parts) > 1 else 1
+        day = int(parts[2][:2]) if len(parts) > 2 else 1
+        return year, date(year, month, day).toordinal()
+    except ValueError:
+        return year, start  # рік коректний, місяць/день - ні
+
+
+def parse_release_dates(values: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Роки (int16, MISSING_YEAR для відсутніх/недійсних) та ordinals (int32) для серії release_date.
+    Розбираються лише унікальні значення, яких ще немає в таблиці пам'яті.
+    """
+    codes, uniques = pd.factorize(values)
+    years = np.full(len(uniques) + 1, MISSING_YEAR, dtype=np.int16)  # останній елемент - для codes == -1
+    ordinals = np.zeros(len(uniques) + 1, dtype=np.int32)
+    for i, value in enumerate(uniques):
+        if not isinstance(value, str):
+            continue
+        parsed = _parsed.get(value)
+        if parsed is None:
+            parsed = _parsed[value] = parse_release_date(value)
+        years[i], ordinals[i] = parsed
+    return years[codes], ordinals[codes]
+
+
+def release_ages(ordinals: np.ndarray, reference: Optional[datetime] = None) -> np.ndarray:
+    """Вік у роках на момент reference (за замовчуванням - зараз); відсутні дати (ordinal 0) -> 0"""
+    reference_day = (reference or datetime.now()).toordinal()
+    ages = (reference_day - ordinals.astype(np.float32)) / np.float32(DAYS_PER_YEAR)
+    return np.where(ordinals > 0, np.maximum(ages, 0), 0).astype(np.float32)
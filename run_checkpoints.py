@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+SpotiSplit - Чекпоінти запуску
+Зберігає результат кожного етапу (треки, features, кластери, прогрес запису плейлістів),
+щоб перерваний запуск можна було продовжити через --resume RUN_ID
+"""
+
+import os
+import json
+import time
+import pickle
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from progress import log_event
+
+RUNS_DIR = ".spotisplit_runs"
+RUN_ID_FORMAT = "%Y%m%d-%H%M%S"
+RUN_ID_FORMAT_EXAMPLE = "20250812-143000"
+MAX_RUNS_PER_SECOND = 100
+
+
+def _create_run_dir(root: str):
+    """
+    Атомарно створює директорію нового запуску: ID з секундами, а для кількох запусків за одну секунду -
+    суфікс -01, -02... (сортується за часом). Існуюча директорія ніколи не відкривається як новий запуск.
+    """
+    os.makedirs(root, exist_ok=True)
+    base = datetime.now().strftime(RUN_ID_FORMAT)
+    for n in range(MAX_RUNS_PER_SECOND):
+        run_id = base if n == 0 else f"{base}-{n:02d}"
+        path = os.path.join(root, run_id)
+        try:
+            os.mkdir(path)
+        except FileExistsError:
+            continue
+        return run_id, path
+    raise RuntimeError(f"Забагато запусків за секунду {base} у {root}/")
+
+
+class RunCheckpoint:
+    """Директорія запуску з атомарно записаними етапами"""
+
+    def __init__(self, run_id: Optional[str] = None, root: str = RUNS_DIR):
+        """Без run_id - новий запуск у власній (щойно створеній) директорії; з run_id - існуючий запуск"""
+        if run_id is None:
+            self.run_id, self.dir = _create_run_dir(root)
+        else:
+            self.run_id = run_id
+            self.dir = os.path.join(root, run_id)
+            os.makedirs(self.dir, exist_ok=True)
+
+    @classmethod
+    def resume(cls, run_id: str, root: str = RUNS_DIR) -> "RunCheckpoint":
+        """Відкриває існуючий запуск"""
+        if not os.path.isdir(os.path.join(root, run_id)):
+            raise FileNotFoundError(f"Запуск '{run_id}' не знайдено в {root}/")
+        return cls(run_id, root)
+
+    @property
+    def started_at(self) -> datetime:
+        """Час початку запуску з RUN_ID (YYYYmmdd-HHMMSS[-NN]; для ID іншого формату - поточний час)"""
+        try:
+            return datetime.strptime(self.run_id[:len(RUN_ID_FORMAT_EXAMPLE)], RUN_ID_FORMAT)
+        except ValueError:
+            return datetime.now()
+
+    def path(self, name: str) -> str:
+        """Шлях до файлу всередині директорії запуску"""
+        return os.path.join(self.dir, name)
+
+    def _write_atomic(self, name: str, data: bytes):
+        tmp = self.path(name + ".tmp")
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, self.path(name))
+
+    # --- етапи ---
+
+    def has(self, stage: str) -> bool:
+        return os.path.exists(self.path(f"{stage}.json")) or os.path.exists(self.path(f"{stage}.pkl"))
+
+    def save_json(self, stage: str, obj: Any):
+        self._write_atomic(f"{stage}.json", json.dumps(obj, ensure_ascii=False).encode("utf-8"))
+
+    def load_json(self, stage: str, default: Any = None) -> Any:
+        try:
+            with open(self.path(f"{stage}.json"), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return default
+
+    def save_frame(self, stage: str, df):
+        self._write_atomic(f"{stage}.pkl", pickle.dumps(df, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def load_frame(self, stage: str):
+        with open(self.path(f"{stage}.pkl"), "rb") as f:
+            return pickle.load(f)
+
+    # --- прогрес запису плейлістів ---
+
+    def playlist_progress(self) -> Dict[str, Dict[str, Any]]:
+        """{cluster: {"playlist_id", "chunks_done", "done"}}"""
+        return self.load_json("playlists", {})
+
+    def update_playlist(self, cluster: int, playlist_id: str, chunks_done: int, done: bool = False):
+        progress = self.playlist_progress()
+        progress[str(cluster)] = {"playlist_id": playlist_id, "chunks_done": chunks_done, "done": done}
+        self.save_json("playlists", progress)
+
+
+def latest_run_id(root: str = RUNS_DIR) -> Optional[str]:
+    """ID останнього запуску (ID сортуються за часом створення)"""
+    try:
+        runs = sorted(d for d in os.listdir(root) if os.path.isdir(os.path.join(root, d)))
+    except FileNotFoundError:
+        return None
+    return runs[-1] if runs else None
+
+
+def run_stage(checkpoint: Optional[RunCheckpoint], stage: str, compute, frame: bool = False):
+    """Повертає збережений результат етапу або обчислює та зберігає його"""
+    if checkpoint is not None and checkpoint.has(stage):
+        print(f"♻️ Етап '{stage}' взято з чекпоінту")
+        log_event("stage_cached", stage=stage, run_id=checkpoint.run_id)
+        return checkpoint.load_frame(stage) if frame else checkpoint.load_json(stage)
+    started = time.perf_counter()
+    result = compute()
+    log_event("stage_computed", stage=stage, seconds=round(time.perf_counter() - started, 3),
+              run_id=checkpoint.run_id if checkpoint is not None else None)
+    if checkpoint is not None:
+        if frame:
+            checkpoint.save_frame(stage, result)
+        else:
+            checkpoint.save_json(stage, result)
+    return result
+
+
+def sync_run_meta(checkpoint: Optional[RunCheckpoint], config) -> Dict[str, Any]:
+    """Зберігає параметри запуску, а при --resume відновлює їх у config"""
+    if checkpoint is None:
+        return {}
+    run_meta = checkpoint.load_json("run")
+    if run_meta is None:
+        run_meta = {"N_CLUSTERS": int(config["N_CLUSTERS"]),
+                    "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M")}
+        checkpoint.save_json("run", run_meta)
+    config["N_CLUSTERS"] = run_meta["N_CLUSTERS"]
+    return run_meta
+
+
+def open_checkpoint(resume_id: Optional[str]) -> Optional[RunCheckpoint]:
+    """Створює новий запуск або відкриває існуючий для --resume"""
+    if not resume_id:
+        checkpoint = RunCheckpoint()
+        print(f"🆔 Запуск: {checkpoint.run_id}")
+        return checkpoint
+    try:
+        checkpoint = RunCheckpoint.resume(resume_id)
+    except FileNotFoundError as e:
+        print(f"❌ {e}")
+        return None
+    print(f"♻️ Продовжую запуск: {checkpoint.run_id}")
+    return checkpoint
+
+
+def print_resume_hint(checkpoint: Optional[RunCheckpoint], script: str):
+    """Підказка як продовжити перерваний запуск"""
+    if checkpoint is not None:
+        print(f"💡 Продовжити з місця зупинки: python {script} --resume {checkpoint.run_id}")
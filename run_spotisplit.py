@@ -6,7 +6,6 @@ SpotiSplit MVP - Скрипт для запуску без Jupyter notebook
 
 import os
 import sys
-import re
 import time
 import argparse
 from datetime import datetime
@@ -16,17 +15,38 @@ try:
     import pandas as pd
     import numpy as np
     import matplotlib.pyplot as plt
-    import spotipy
-    from spotipy.oauth2 import SpotifyOAuth
-    from sklearn.preprocessing import StandardScaler
-    from sklearn.cluster import KMeans
     from sklearn.metrics import silhouette_score
-    from sklearn.decomposition import PCA
+    from spotify_transport import TRANSPORT_DEFAULTS, batched, create_spotify_client, create_rate_limiter, print_connection_stats
+    from playlist_manifest import delete_spotisplit_playlists, record_playlist
+    from similarity_index import save_index
+    from clustering import CLUSTERING_DEFAULTS, fit_clusters
+    from cluster_stats import STATS_STAGE, compute_cluster_stats
+    from projection import PROJECTION_DEFAULTS, fit_projection, save_projection
+    from playlist_order import ORDER_DEFAULTS, order_tracks, ordered_cluster_uris
+    from feature_providers import (FEATURE_PROVIDER_DEFAULTS, METADATA_FEATURE_COLUMNS, collect_features,
+                                   metadata_only, resolve_feature_space)
+    from local_audio_features import LOCAL_AUDIO_DEFAULTS
+    from artist_enrichment import GENRE_DEFAULTS, enrich_with_genres, feature_weights
+    from feature_pipeline import PIPELINE_DEFAULTS, FeaturePipeline, fit_or_load_pipeline, pipeline_columns
+    from progress import PROGRESS_DEFAULTS, configure_progress, log_event, progress as track_progress
+    from write_plan import build_write_plan, print_plan, save_plan, apply_saved_plan
+    from profiling import add_profile_arguments, setup_profiling, profile_stage, report_profile
+    from run_checkpoints import open_checkpoint, run_stage, sync_run_meta, print_resume_hint
+    from spotisplit_daemon import DAEMON_DEFAULTS
+    from track_cleaning import CLEANING_DEFAULTS, clean_tracks, cleaning_columns, playlist_tracks
+    from spotify_auth import AUTH_DEFAULTS, create_auth_manager
+    from playlist_source import SOURCE_DEFAULTS, load_source_items, source_label
 except ImportError as e:
     print(f"❌ Помилка імпорту: {e}")
     print("📦 Встановіть залежності: pip install -r requirements.txt")
     sys.exit(1)
 
+# Необов'язкові параметри config.py та їх значення за замовчуванням
+OPTIONAL_DEFAULTS = {**TRANSPORT_DEFAULTS, **CLUSTERING_DEFAULTS, **PROJECTION_DEFAULTS,
+                     **FEATURE_PROVIDER_DEFAULTS, **LOCAL_AUDIO_DEFAULTS, **GENRE_DEFAULTS,
+                     **ORDER_DEFAULTS, **PIPELINE_DEFAULTS, **PROGRESS_DEFAULTS, **DAEMON_DEFAULTS,
+                     **SOURCE_DEFAULTS, **CLEANING_DEFAULTS, **AUTH_DEFAULTS}
+
 def load_config():
     """Завантажує конфігурацію з config.py або використовує значення за замовчуванням"""
     try:
@@ -41,7 +61,8 @@ def load_config():
             "N_CLUSTERS": config.N_CLUSTERS,
             "MAKE_PUBLIC": config.MAKE_PUBLIC,
             "PLAYLIST_NAME_PREFIX": config.PLAYLIST_NAME_PREFIX,
-            "RANDOM_STATE": config.RANDOM_STATE
+            "RANDOM_STATE": config.RANDOM_STATE,
+            **{key: getattr(config, key, value) for key, value in OPTIONAL_DEFAULTS.items()},
         }
     except ImportError:
         print("⚠️ Файл config.py не знайдено. Використовую значення за замовчуванням.")
@@ -54,59 +75,24 @@ def load_config():
             "N_CLUSTERS": 5,
             "MAKE_PUBLIC": False,
             "PLAYLIST_NAME_PREFIX": "SpotiSplit",
-            "RANDOM_STATE": 42
+            "RANDOM_STATE": 42,
+            **OPTIONAL_DEFAULTS,
         }
 
-def extract_playlist_id(url_or_id: str) -> str:
-    """Витягує ID плейліста з URL або ID"""
-    m = re.search(r"playlist/([a-zA-Z0-9]+)", url_or_id)
-    if m:
-        return m.group(1)
-    return url_or_id.strip()
-
-def get_all_playlist_tracks(sp, playlist_id: str) -> List[Dict[str, Any]]:
-    """Отримує всі треки з плейліста"""
-    results = sp.playlist_items(playlist_id, additional_types=["track"], market=None)
-    items = results.get("items", [])
-    while results.get("next"):
-        results = sp.next(results)
-        items.extend(results.get("items", []))
-    # Фільтруємо треки (без episodes/local)
-    items = [it for it in items if it.get("track") and it["track"].get("id")]
-    return items
-
 def get_all_liked_tracks(sp) -> List[Dict[str, Any]]:
     """Отримує всі Liked Songs"""
     results = sp.current_user_saved_tracks(limit=50)
     items = results.get("items", [])
-    while results.get("next"):
-        results = sp.next(results)
-        items.extend(results.get("items", []))
+    with track_progress("liked_songs", total=results.get("total")) as p:
+        p.update(len(items), calls=1)
+        while results.get("next"):
+            results = sp.next(results)
+            items.extend(results.get("items", []))
+            p.update(len(results.get("items", [])), calls=1)
     # Фільтруємо треки (без episodes/local)
     items = [it for it in items if it.get("track") and it["track"].get("id")]
     return items
 
-def batched(iterable, n=100):
-    """Розбиває ітерабельний об'єкт на батчі"""
-    batch = []
-    for x in iterable:
-        batch.append(x)
-        if len(batch) == n:
-            yield batch
-            batch = []
-    if batch:
-        yield batch
-
-def fetch_audio_features(sp, track_ids: List[str]) -> Dict[str, Dict[str, Any]]:
-    """Отримує audio features для треків"""
-    feats = {}
-    for chunk in batched(track_ids, 100):
-        af = sp.audio_features(chunk)
-        for t_id, f in zip(chunk, af):
-            if f:
-                feats[t_id] = f
-    return feats
-
 def track_row(item, features_map):
     """Створює рядок даних для треку"""
     t = item["track"]
@@ -116,7 +102,9 @@ def track_row(item, features_map):
         "track_id": t_id,
         "track_name": t["name"],
         "artist": ", ".join([a["name"] for a in t["artists"]]),
+        "artist_ids": ",".join(a["id"] for a in t["artists"] if a.get("id")),
         "album": t["album"]["name"] if t.get("album") else None,
+        "album_type": t["album"].get("album_type") if t.get("album") else None,
         "added_at": item.get("added_at"),
         "duration_ms": t.get("duration_ms"),
         "popularity": t.get("popularity"),
@@ -142,10 +130,16 @@ def create_playlist(sp, user_id: str, name: str, description: str = "", public:
     pl = sp.user_playlist_create(user=user_id, name=name, public=public, description=description)
     return pl["id"]
 
-def add_tracks_to_playlist(sp, playlist_id: str, uris: List[str]):
-    """Додає треки до плейліста"""
-    for chunk in batched(uris, 100):
+def add_tracks_to_playlist(sp, playlist_id: str, uris: List[str], start_chunk: int = 0, on_chunk=None, tracker=None):
+    """Додає треки до плейліста, починаючи з батчу start_chunk; on_chunk(n) викликається після кожного батчу"""
+    for i, chunk in enumerate(batched(uris, 100)):
+        if i < start_chunk:
+            continue
         sp.playlist_add_items(playlist_id, chunk)
+        if on_chunk is not None:
+            on_chunk(i + 1)
+        if tracker is not None:
+            tracker.update(len(chunk), calls=1)
 
 # Constants
 SPOTIFY_SCOPES = [
@@ -160,47 +154,9 @@ FEATURE_COLUMNS = [
     "danceability", "energy", "acousticness", "tempo"
 ]
 
-def delete_spotisplit_playlists(sp, user_id: str, prefix: str = "SpotiSplit"):
-    """Видаляє всі плейлісти з 'SpotiSplit' в назві"""
-    print(f"🗑️ Пошук плейлістів з '{prefix}' в назві...")
-    
-    # Отримуємо всі плейлісти користувача
-    playlists = []
-    results = sp.user_playlists(user_id, limit=50)
-    playlists.extend(results.get("items", []))
-    
-    while results.get("next"):
-        results = sp.next(results)
-        playlists.extend(results.get("items", []))
-    
-    # Фільтруємо плейлісти з SpotiSplit в назві
-    spotisplit_playlists = [pl for pl in playlists if prefix.lower() in pl["name"].lower()]
-    
-    if not spotisplit_playlists:
-        print(f"✅ Плейлісти з '{prefix}' в назві не знайдено")
-        return
-    
-    print(f"🔍 Знайдено {len(spotisplit_playlists)} плейлістів для видалення:")
-    for pl in spotisplit_playlists:
-        print(f"   • {pl['name']} (ID: {pl['id']})")
-    
-    # Підтвердження видалення
-    confirm = input(f"\n⚠️ Ви впевнені, що хочете видалити {len(spotisplit_playlists)} плейлістів? (yes/no): ")
-    if confirm.lower() not in ['yes', 'y', 'так', 'т']:
-        print("❌ Видалення скасовано")
-        return
-    
-    # Видаляємо плейлісти
-    deleted_count = 0
-    for pl in spotisplit_playlists:
-        try:
-            sp.user_playlist_unfollow(user_id, pl["id"])
-            print(f"🗑️ Видалено: {pl['name']}")
-            deleted_count += 1
-        except Exception as e:
-            print(f"❌ Помилка видалення '{pl['name']}': {e}")
-    
-    print(f"✅ Успішно видалено {deleted_count}/{len(spotisplit_playlists)} плейлістів")
+def script_name(config):
+    """Скрипт для --resume: версія без audio features - лише ланцюжок ("metadata",)"""
+    return "run_spotisplit_no_audio.py" if metadata_only(config) else "run_spotisplit.py"
 
 def authenticate_spotify(config):
     """Spotify authentication logic"""
@@ -223,8 +179,8 @@ def authenticate_spotify(config):
     os.environ["SPOTIPY_REDIRECT_URI"] = config["REDIRECT_URI"]
 
     try:
-        auth_manager = SpotifyOAuth(scope=" ".join(scopes), show_dialog=True, cache_path=".cache-spotisplit", open_browser=True)
-        sp = spotipy.Spotify(auth_manager=auth_manager)
+        auth_manager = create_auth_manager(config, scopes)
+        sp = create_spotify_client(auth_manager, config)
         
         me = sp.me()
         user_id = me["id"]
@@ -235,43 +191,32 @@ def authenticate_spotify(config):
         print(f"❌ Помилка авторизації: {e}")
         return None, None
 
-def load_and_cluster_tracks(sp, config):
+def load_and_cluster_tracks(sp, config, checkpoint=None):
     """Load tracks and perform clustering"""
     try:
         # 1) Завантажуємо треки та audio features
         print("\n📥 Завантаження треків...")
         
-        # Використовуємо Liked Songs замість плейліста
-        print("🎧 Джерело: Liked Songs")
-        items = get_all_liked_tracks(sp)
-        track_ids = [it["track"]["id"] for it in items]
-        features_map = fetch_audio_features(sp, track_ids)
+        with profile_stage("ingest"):
+            items = run_stage(checkpoint, "items", lambda: load_source_items(sp, config, get_all_liked_tracks))
+        print(f"🎧 Джерело: {source_label(config)}")  # назва плейліста-джерела вже в кеші
+        with profile_stage("features"):
+            features_map, sources = collect_features(sp, items, config, checkpoint)
 
-        df = pd.DataFrame([track_row(it, features_map) for it in items])
-        print(f"✅ Отримано {len(df)} треків з features.")
+        with profile_stage("dataframe"):
+            df = pd.DataFrame([track_row(it, features_map) for it in items])
+            print(f"✅ Отримано {len(df)} треків, з features: {len(features_map)}.")
+            df, feature_cols = resolve_feature_space(df, items, pipeline_columns(config, FEATURE_COLUMNS), sources, config,
+                                                     checkpoint.started_at if checkpoint is not None else None)
+            if config["GENRE_FEATURES"]:
+                df, feature_cols = enrich_with_genres(sp, df, items, feature_cols, config, checkpoint)
 
         # 2) Кластеризація
-        print("\n🔍 Кластеризація...")
-        X = df[FEATURE_COLUMNS].dropna().copy()
-        valid_idx = X.index
-        
-        if len(X) < config["N_CLUSTERS"]:
-            print(f"⚠️ Треків з валідними features менше, ніж N_CLUSTERS={config['N_CLUSTERS']}")
-            config["N_CLUSTERS"] = max(1, len(X))
-
-        scaler = StandardScaler()
-        X_scaled = scaler.fit_transform(X)
-
-        kmeans = KMeans(n_clusters=int(config["N_CLUSTERS"]), random_state=config["RANDOM_STATE"], n_init=10)
-        labels = kmeans.fit_predict(X_scaled)
-
-        df["cluster"] = -1
-        df.loc[valid_idx, "cluster"] = labels
-
-        sil = None
-        if int(config["N_CLUSTERS"]) > 1 and len(np.unique(labels)) > 1:
-            sil = silhouette_score(X_scaled, labels)
-        print(f"✅ Кластерів: {config['N_CLUSTERS']} | Silhouette: {sil:.3f}" if sil is not None else f"✅ Кластерів: {config['N_CLUSTERS']}")
+        with profile_stage("clustering"):
+            df = run_stage(checkpoint, "labels", lambda: cluster_tracks(df, config, checkpoint, feature_cols), frame=True)
+            sync_run_meta(checkpoint, config)
+            run_stage(checkpoint, STATS_STAGE, lambda: compute_cluster_stats(df), frame=True)
+            df = order_tracks(df, config, feature_cols, checkpoint)
         
         return df
         
@@ -279,33 +224,137 @@ def load_and_cluster_tracks(sp, config):
         print(f"❌ Помилка завантаження/кластеризації: {e}")
         import traceback
         traceback.print_exc()
+        print_resume_hint(checkpoint, script_name(config))
         return None
 
-def create_playlists_from_clusters(sp, df, config, user_id):
+def cluster_tracks(df, config, checkpoint=None, feature_cols=FEATURE_COLUMNS):
+    """Кластеризує треки за feature_cols (за замовчуванням FEATURE_COLUMNS), додає колонку cluster"""
+    print("\n🔍 Кластеризація...")
+    X = df[feature_cols].dropna()
+    valid_idx = X.index
+    
+    if len(X) < config["N_CLUSTERS"]:
+        print(f"⚠️ Треків з валідними features менше, ніж N_CLUSTERS={config['N_CLUSTERS']}")
+        config["N_CLUSTERS"] = max(1, len(X))
+
+    pipeline = FeaturePipeline.for_columns(feature_cols, config, feature_weights(feature_cols, config))
+    pipeline = fit_or_load_pipeline(pipeline, X, checkpoint, refit=config["FEATURE_PIPELINE_REFIT"])
+    X_scaled = pipeline.transform(X)
+
+    # Дублікати та викиди не зсувають центроїди; дублікати підтверджуються відстанню audio features
+    # (метадані різних релізів тієї самої пісні різняться - там лише назва, виконавець і тривалість)
+    metadata_space = METADATA_FEATURE_COLUMNS[0] in feature_cols
+    cleaning = clean_tracks(df.loc[valid_idx], X_scaled, config, dedup_X=None if metadata_space else X_scaled)
+    track_ids = df.loc[valid_idx, "track_id"].to_numpy()
+    labels, centers = fit_clusters(X_scaled, config, track_ids, checkpoint, cleaning)
+
+    df["cluster"] = -1
+    df.loc[valid_idx, "cluster"] = labels
+    df = cleaning_columns(df, cleaning, valid_idx)
+
+    if checkpoint is not None:
+        save_index(checkpoint, X_scaled, df.loc[valid_idx, "track_id"], pipeline.output_columns,
+                   centers, labels)
+        save_projection(checkpoint, fit_projection(X_scaled, solver=config["PROJECTION_SOLVER"],
+                                                   random_state=config["RANDOM_STATE"]))
+
+    sil = None
+    if int(config["N_CLUSTERS"]) > 1 and len(np.unique(labels)) > 1:
+        sil = silhouette_score(X_scaled, labels)
+    print(f"✅ Кластерів: {config['N_CLUSTERS']} | Silhouette: {sil:.3f}" if sil is not None else f"✅ Кластерів: {config['N_CLUSTERS']}")
+    return df
+
+def playlist_naming(config, run_meta):
+    """Базова назва та опис плейлістів запуску"""
+    timestamp = run_meta.get("timestamp") or datetime.now().strftime("%Y-%m-%d %H:%M")
+    source = source_label(config)
+    if metadata_only(config):
+        return (f"{config['PLAYLIST_NAME_PREFIX']}: {source} (No Audio)",
+                f"Створено SpotiSplit {timestamp}. Джерело: {source} (без audio features)")
+    return (f"{config['PLAYLIST_NAME_PREFIX']}: {source}",
+            f"Створено SpotiSplit {timestamp}. Джерело: {source}")
+
+def print_metadata_report(stats):
+    """Аналіз кластерів за метаданими (версія без audio features)"""
+    print("\n📊 Аналіз кластерів...")
+    print("=" * 80)
+    for c in stats.clusters:
+        n = stats.counts[c]
+        mean, std = stats.means.loc[c], stats.stds.loc[c]
+        print(f"\n🎯 Кластер {c}: {n} треків")
+        print("-" * 40)
+        print(f"📈 Популярність: {mean['popularity']:.1f} ± {std['popularity']:.1f}")
+        print(f"⏱️  Тривалість: {mean['duration_minutes']:.1f} хв ± {std['duration_minutes']:.1f}")
+        print(f"📅 Вік треків: {mean['age_years']:.1f} років ± {std['age_years']:.1f}")
+        explicit_count = int(round(mean['explicit'] * n))
+        print(f"🔞 Явний контент: {explicit_count}/{n} ({explicit_count / n * 100:.1f}%)")
+        local_count = int(round(mean['is_local'] * n))
+        print(f"🏠 Локальні треки: {local_count}/{n} ({local_count / n * 100:.1f}%)")
+        print(f"🌍 Середнє ринкове покриття: {mean['available_markets']:.0f} ринків")
+        album_types = stats.modes.get('album_type')
+        if album_types is not None and c in album_types.index:
+            main_type, main_count = album_types.loc[c, 'value'], album_types.loc[c, 'count']
+        else:
+            main_type, main_count = "unknown", 0
+        print(f"💿 Основний тип: {main_type} ({main_count}/{n})")
+        print("🎵 Топ треки:")
+        for track in stats.top_tracks.loc[[c]].itertuples(index=False):
+            print(f"   • {track.track_name} - {track.artist} (популярність: {track.popularity:.0f})")
+
+def create_playlists_from_clusters(sp, df, config, user_id, checkpoint=None):
     """Create playlists from clustering results"""
     try:
+        if metadata_only(config):
+            print_metadata_report(run_stage(checkpoint, STATS_STAGE, lambda: compute_cluster_stats(df), frame=True))
+
         # 3) Створення плейлістів
         print("\n📦 Створення плейлістів...")
         created = {}
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M")
-        base_name = f"{config['PLAYLIST_NAME_PREFIX']}: Liked Songs"
-
-        for c in sorted(df["cluster"].unique()):
-            if c == -1:
-                continue
-            name = f"{base_name} · Cluster {int(c)} / {int(config['N_CLUSTERS'])}"
-            desc = f"Створено SpotiSplit {timestamp}. Джерело: Liked Songs"
-            pl_id = create_playlist(sp, user_id, name=name, description=desc, public=config["MAKE_PUBLIC"])
-            created[int(c)] = pl_id
-            cluster_uris = df.loc[df["cluster"] == c, "uri"].dropna().tolist()
-            add_tracks_to_playlist(sp, pl_id, cluster_uris)
-            print(f"📦 {name}: додано {len(cluster_uris)} треків")
-
-        total_assigned = (df["cluster"] != -1).sum()
-        print(f"\n🎉 Готово! Розкладено {total_assigned}/{len(df)} треків у {len(created)} плейлістів.")
+        run_meta = sync_run_meta(checkpoint, config)
+        progress = checkpoint.playlist_progress() if checkpoint is not None else {}
+        base_name, desc = playlist_naming(config, run_meta)
+        rows = playlist_tracks(df, config)  # дублікати лишаються лише в CSV
+        clusters = [c for c in sorted(rows["cluster"].unique()) if c != -1]
+        sizes = rows["cluster"].value_counts()
+        pending = sum(max(0, int(sizes[c]) - 100 * progress.get(str(int(c)), {}).get("chunks_done", 0))
+                      for c in clusters if not progress.get(str(int(c)), {}).get("done"))
+
+        with track_progress("playlists", total=pending) as tracker:
+            for c in clusters:
+                name = f"{base_name} · Cluster {int(c)} / {int(config['N_CLUSTERS'])}"
+                state = progress.get(str(int(c)), {})
+                if state.get("done"):
+                    created[int(c)] = state["playlist_id"]
+                    tracker.echo(f"♻️ {name}: вже створено")
+                    continue
+                if state.get("playlist_id"):
+                    # Плейліст створено в перерваному запуску - дописуємо з останнього батчу
+                    pl_id = state["playlist_id"]
+                else:
+                    pl_id = create_playlist(sp, user_id, name=name, description=desc, public=config["MAKE_PUBLIC"])
+                    tracker.update(0, calls=1)
+                    record_playlist(pl_id, name, checkpoint.run_id if checkpoint is not None else None, user_id)
+                    if checkpoint is not None:
+                        checkpoint.update_playlist(int(c), pl_id, 0)
+                created[int(c)] = pl_id
+                cluster_uris = ordered_cluster_uris(rows, c)
+                on_chunk = None
+                if checkpoint is not None:
+                    on_chunk = lambda done, c=int(c), pl_id=pl_id: checkpoint.update_playlist(c, pl_id, done)
+                add_tracks_to_playlist(sp, pl_id, cluster_uris, start_chunk=state.get("chunks_done", 0),
+                                       on_chunk=on_chunk, tracker=tracker)
+                if checkpoint is not None:
+                    checkpoint.update_playlist(int(c), pl_id, (len(cluster_uris) + 99) // 100, done=True)
+                tracker.echo(f"📦 {name}: додано {len(cluster_uris)} треків")
+                log_event("playlist_written", cluster=int(c), playlist_id=pl_id, name=name, tracks=len(cluster_uris))
+
+        total_assigned = (rows["cluster"] != -1).sum()
+        skipped = len(df) - len(rows)
+        print(f"\n🎉 Готово! Розкладено {total_assigned}/{len(df)} треків у {len(created)} плейлістів"
+              + (f" (дублікатів пропущено: {skipped})." if skipped else "."))
 
         # 4) Експорт результатів
-        out_csv = "spotisplit_clusters.csv"
+        out_csv = "spotisplit_clusters_no_audio.csv" if metadata_only(config) else "spotisplit_clusters.csv"
         df.to_csv(out_csv, index=False)
         print(f"💾 Збережено результати: {out_csv}")
         
@@ -313,19 +362,33 @@ def create_playlists_from_clusters(sp, df, config, user_id):
         print(f"❌ Помилка створення плейлістів: {e}")
         import traceback
         traceback.print_exc()
+        print_resume_hint(checkpoint, script_name(config))
 
-def main():
-    """Основна функція"""
+def main(overrides=None, description="SpotiSplit MVP - Кластеризація Spotify плейлістів"):
+    """Основна функція; overrides - значення config, які задає скрипт-обгортка (run_spotisplit_no_audio.py)"""
     # Парсимо аргументи командного рядка
-    parser = argparse.ArgumentParser(description="SpotiSplit MVP - Кластеризація Spotify плейлістів")
+    parser = argparse.ArgumentParser(description=description)
     parser.add_argument("--delete", action="store_true", help="Видалити всі плейлісти з 'SpotiSplit' в назві")
     parser.add_argument("--prefix", type=str, default="SpotiSplit", help="Префікс для пошуку плейлістів (за замовчуванням: SpotiSplit)")
+    parser.add_argument("--yes", action="store_true", help="Не питати підтвердження (для скриптів)")
+    parser.add_argument("--dry-run", action="store_true", help="Показати, що буде видалено, нічого не видаляючи")
+    parser.add_argument("--resume", type=str, metavar="RUN_ID", help="Продовжити перерваний запуск, пропускаючи завершені етапи")
+    parser.add_argument("--plan", action="store_true", help="Порахувати все до запису та зберегти план, нічого не змінюючи в Spotify")
+    parser.add_argument("--apply", type=str, metavar="RUN_ID", help="Виконати збережений план запуску RUN_ID")
+    add_profile_arguments(parser)
+    parser.add_argument("--refit-features", action="store_true", help="Навчити конвеєр характеристик заново замість збереженого")
     args = parser.parse_args()
     
     print("🎵 SpotiSplit MVP - Запуск...")
     
     # Завантажуємо конфігурацію
     config = load_config()
+    config.update(overrides or {})
+    if metadata_only(config):
+        print("🎧 Версія без audio features: кластеризація за метаданими треків")
+    configure_progress(config)
+    if args.refit_features:
+        config["FEATURE_PIPELINE_REFIT"] = True
     
     # Аутентифікація Spotify
     sp, user_id = authenticate_spotify(config)
@@ -334,16 +397,39 @@ def main():
     
     # Якщо передано --delete, видаляємо плейлісти та виходимо
     if args.delete:
-        delete_spotisplit_playlists(sp, user_id, args.prefix)
+        delete_spotisplit_playlists(sp, user_id, args.prefix, assume_yes=args.yes, dry_run=args.dry_run,
+                                    max_workers=config["MAX_WORKERS"], rate_limiter=create_rate_limiter(config))
+        return
+    
+    if args.apply:
+        apply_saved_plan(sp, user_id, config, args.apply)
+        print_connection_stats(sp)
+        return
+    
+    checkpoint = open_checkpoint(args.resume)
+    if checkpoint is None:
         return
+    setup_profiling(args, checkpoint)
     
     # Завантаження та кластеризація треків
-    df = load_and_cluster_tracks(sp, config)
+    df = load_and_cluster_tracks(sp, config, checkpoint)
     if df is None:
+        report_profile()
+        return
+    
+    if args.plan:
+        base_name, desc = playlist_naming(config, sync_run_meta(checkpoint, config))
+        plan = build_write_plan(df, config, checkpoint, base_name, desc)
+        print_plan(plan)
+        save_plan(checkpoint, plan)
+        report_profile()
         return
     
     # Створення плейлістів з кластерів
-    create_playlists_from_clusters(sp, df, config, user_id)
+    with profile_stage("writes"):
+        create_playlists_from_clusters(sp, df, config, user_id, checkpoint)
+    print_connection_stats(sp)
+    report_profile()
 
 if __name__ == "__main__":
     main()
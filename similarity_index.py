@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+SpotiSplit - Пошук схожих треків у просторі характеристик кластеризації
+Використання: python3 similarity_index.py TRACK_ID [--top 10] [--run RUN_ID] [--create-playlist]
+"""
+
+import re
+import sys
+import argparse
+from typing import List, Optional, Tuple
+
+try:
+    import numpy as np
+    from run_checkpoints import RunCheckpoint, latest_run_id
+    from feature_store import save_feature_matrix, load_feature_matrix
+    from feature_pipeline import load_run_pipeline
+except ImportError as e:
+    print(f"❌ Помилка імпорту: {e}")
+    print("📦 Встановіть залежності: pip install -r requirements.txt")
+    sys.exit(1)
+
+CLUSTERS_FILE = "clusters.npz"
+
+
+def save_index(checkpoint, X_scaled, track_ids, columns, centroids=None, labels=None):
+    """Зберігає масштабовану матрицю характеристик, центроїди та мітки разом із запуском"""
+    save_feature_matrix(checkpoint, X_scaled, track_ids, columns)
+    np.savez(
+        checkpoint.path(CLUSTERS_FILE),
+        centroids=np.asarray(centroids if centroids is not None else np.empty((0, len(columns))), dtype=np.float32),
+        labels=np.asarray(labels if labels is not None else [], dtype=np.int32),
+    )
+
+
+class SimilarityIndex:
+    """Точний пошук найближчих сусідів: одне матрично-векторне множення (BLAS) на запит"""
+
+    def __init__(self, X, track_ids, columns=None, centroids=None, labels=None, pipeline=None):
+        self.X = np.ascontiguousarray(X, dtype=np.float32)
+        self.pipeline = pipeline
+        self.track_ids = np.asarray(track_ids)
+        self.columns = list(columns) if columns is not None else []
+        self.centroids = centroids
+        self.labels = labels
+        self.sq_norms = np.einsum("ij,ij->i", self.X, self.X)
+        self.row_of = {t_id: i for i, t_id in enumerate(self.track_ids)}
+
+    @classmethod
+    def load(cls, checkpoint) -> "SimilarityIndex":
+        """Індекс поверх memory-mapped матриці запуску"""
+        matrix = load_feature_matrix(checkpoint)
+        try:
+            clusters = np.load(checkpoint.path(CLUSTERS_FILE))
+            centroids, labels = clusters["centroids"], clusters["labels"]
+        except FileNotFoundError:
+            centroids, labels = None, None
+        return cls(matrix.X, matrix.track_ids, matrix.columns, centroids, labels, load_run_pipeline(checkpoint))
+
+    def query_vector(self, q, top_n: int = 10, exclude: Optional[int] = None) -> List[Tuple[str, float]]:
+        """top_n найближчих треків до вектора q (евклідова відстань)"""
+        q = np.asarray(q, dtype=np.float32)
+        d2 = self.sq_norms - 2.0 * (self.X @ q) + float(q @ q)
+        if exclude is not None:
+            d2[exclude] = np.inf
+        k = min(top_n, len(d2) - (exclude is not None))
+        if k <= 0:
+            return []
+        top = np.argpartition(d2, k - 1)[:k]
+        top = top[np.argsort(d2[top])]
+        return [(str(self.track_ids[i]), float(np.sqrt(max(d2[i], 0.0)))) for i in top]
+
+    def similar_to(self, track_id: str, top_n: int = 10) -> List[Tuple[str, float]]:
+        """top_n найближчих треків до треку track_id (без нього самого)"""
+        if track_id not in self.row_of:
+            raise KeyError(f"Трек {track_id} відсутній в індексі")
+        row = self.row_of[track_id]
+        return self.query_vector(self.X[row], top_n, exclude=row)
+
+    def similar_to_features(self, features, top_n: int = 10) -> List[Tuple[str, float]]:
+        """top_n найближчих треків до сирих характеристик (трек поза бібліотекою), тим самим конвеєром, що й запуск"""
+        if self.pipeline is None:
+            raise ValueError("Запуск не містить навченого конвеєра характеристик")
+        return self.query_vector(self.pipeline.transform_row(features), top_n)
+
+
+def extract_track_id(url_or_id: str) -> str:
+    """Витягує ID треку з URL, URI або ID"""
+    m = re.search(r"track[/:]([a-zA-Z0-9]+)", url_or_id)
+    if m:
+        return m.group(1)
+    return url_or_id.strip()
+
+
+def main():
+    """Основна функція"""
+    parser = argparse.ArgumentParser(description="SpotiSplit - Схожі треки без повторної кластеризації")
+    parser.add_argument("track", type=str, help="ID, URI або URL треку")
+    parser.add_argument("--top", type=int, default=10, help="Кількість схожих треків (за замовчуванням: 10)")
+    parser.add_argument("--run", type=str, metavar="RUN_ID", help="Запуск, з якого брати індекс (за замовчуванням: останній)")
+    parser.add_argument("--create-playlist", action="store_true", help="Створити плейліст з треку та схожих на нього")
+    args = parser.parse_args()
+
+    run_id = args.run or latest_run_id()
+    if run_id is None:
+        print("❌ Збережених запусків не знайдено. Спочатку запустіть run_spotisplit.py")
+        return
+    checkpoint = RunCheckpoint.resume(run_id)
+    try:
+        index = SimilarityIndex.load(checkpoint)
+    except FileNotFoundError:
+        print(f"❌ Запуск {run_id} не містить індексу характеристик")
+        return
+
+    seed_id = extract_track_id(args.track)
+    try:
+        neighbours = index.similar_to(seed_id, args.top)
+    except KeyError as e:
+        print(f"❌ {e.args[0]}")
+        return
+
+    df = checkpoint.load_frame("labels") if checkpoint.has("labels") else None
+    info = df.set_index("track_id") if df is not None else None
+
+    def describe(t_id):
+        if info is None or t_id not in info.index:
+            return t_id
+        row = info.loc[t_id]
+        return f"{row['track_name']} - {row['artist']}"
+
+    print(f"🎯 {describe(seed_id)}")
+    print(f"🔎 Топ-{len(neighbours)} схожих треків ({', '.join(index.columns)}):")
+    for t_id, dist in neighbours:
+        print(f"   • {describe(t_id)} (відстань: {dist:.3f})")
+
+    if args.create_playlist:
+        from run_spotisplit import load_config, authenticate_spotify, create_playlist, add_tracks_to_playlist
+        from playlist_manifest import record_playlist
+
+        config = load_config()
+        sp, user_id = authenticate_spotify(config)
+        if sp is None:
+            return
+        uris = [f"spotify:track:{t_id}" for t_id in [seed_id] + [t_id for t_id, _ in neighbours]]
+        name = f"{config['PLAYLIST_NAME_PREFIX']}: Like {describe(seed_id)}"
+        pl_id = create_playlist(sp, user_id, name=name, description="Створено SpotiSplit за схожістю треків",
+                                public=config["MAKE_PUBLIC"])
+        record_playlist(pl_id, name, run_id, user_id)
+        add_tracks_to_playlist(sp, pl_id, uris)
+        print(f"📦 {name}: додано {len(uris)} треків")
+
+
+if __name__ == "__main__":
+    main()
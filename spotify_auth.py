@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+SpotiSplit - Спільне сховище токенів Spotify
+Усі точки входу (скрипти, сервіс, пошук схожих, дерево кластерів) беруть токен з .spotisplit_tokens/<user>.json.
+Фоновий потік оновлює токен до закінчення терміну дії, тож запити не чекають на refresh. Без збереженого
+токена та без терміналу запуск одразу завершується з підказкою замість очікування OAuth-діалогу.
+Авторизація наперед: python spotify_auth.py --login [--headless] [--user NAME]
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import threading
+from typing import Any, Dict, List, Optional
+
+from spotipy.cache_handler import CacheHandler
+from spotipy.oauth2 import SpotifyOAuth
+
+# Значення за замовчуванням для config.py (можна перевизначити там)
+AUTH_DEFAULTS = {
+    "AUTH_FLOW": "auto",          # "auto", "browser", "headless" (URL у консолі) або "cached" (лише збережений токен)
+    "SPOTIFY_USER": None,         # ім'я токена у сховищі (None -> SPOTISPLIT_USER або "default")
+    "TOKEN_REFRESH_MARGIN": 300,  # секунди до закінчення дії, коли токен оновлюється у фоні
+}
+
+TOKEN_DIR = ".spotisplit_tokens"
+AUTH_FLOWS = ("auto", "browser", "headless", "cached")
+LEGACY_CACHES = (".cache-spotisplit", ".cache-spotisplit-no-audio")
+REFRESH_TOKEN_ENV = "SPOTISPLIT_REFRESH_TOKEN"  # засів сховища для контейнерів/CI
+REFRESH_RETRY_SECONDS = 30
+
+
+class TokenStore(CacheHandler):
+    """
+    Токен одного користувача у файлі сховища: атомарний запис (процеси бачать лише цілий файл) та
+    кеш у пам'яті, який перечитується лише при зміні файлу (spotipy читає токен перед кожним запитом)
+    """
+
+    def __init__(self, user: Optional[str] = None, root: str = TOKEN_DIR):
+        self.user = user or os.environ.get("SPOTISPLIT_USER") or "default"
+        self.root = root
+        self.path = os.path.join(root, f"{self.user}.json")
+        self._lock = threading.Lock()
+        self._token: Optional[Dict[str, Any]] = None
+        self._mtime: Optional[float] = None
+
+    def get_cached_token(self) -> Optional[Dict[str, Any]]:
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            return None
+        with self._lock:
+            if mtime != self._mtime:
+                try:
+                    with open(self.path, "r", encoding="utf-8") as f:
+                        self._token = json.load(f)
+                except (OSError, ValueError):
+                    return None
+                self._mtime = mtime
+            return self._token
+
+    def save_token_to_cache(self, token_info: Dict[str, Any]):
+        os.makedirs(self.root, exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(token_info, f)
+        os.chmod(tmp, 0o600)
+        with self._lock:
+            os.replace(tmp, self.path)
+            self._token = dict(token_info)
+            self._mtime = os.stat(self.path).st_mtime
+
+    def seed(self, scope: str):
+        """Перший запуск: переносить токен зі старих .cache-spotisplit* або з SPOTISPLIT_REFRESH_TOKEN"""
+        if os.path.exists(self.path):
+            return
+        refresh_token = os.environ.get(REFRESH_TOKEN_ENV)
+        if refresh_token:
+            self.save_token_to_cache({"access_token": "", "token_type": "Bearer", "expires_at": 0,
+                                      "refresh_token": refresh_token, "scope": scope})
+            print(f"🔑 Токен '{self.user}' засіяно з {REFRESH_TOKEN_ENV}")
+            return
+        if self.user != "default":
+            return
+        for legacy in LEGACY_CACHES:
+            if os.path.exists(legacy):
+                os.makedirs(self.root, exist_ok=True)
+                shutil.copyfile(legacy, self.path)
+                os.chmod(self.path, 0o600)
+                print(f"🔑 Токен перенесено з {legacy} у {self.path}")
+                return
+
+
+def list_users(root: str = TOKEN_DIR) -> List[str]:
+    try:
+        return sorted(name[:-5] for name in os.listdir(root) if name.endswith(".json"))
+    except OSError:
+        return []
+
+
+class SharedTokenOAuth(SpotifyOAuth):
+    """SpotifyOAuth з оновленням під замком: фоновий потік і запити не оновлюють токен двічі"""
+
+    def __init__(self, *args, refresh_margin: float = AUTH_DEFAULTS["TOKEN_REFRESH_MARGIN"], **kwargs):
+        super().__init__(*args, **kwargs)
+        self.refresh_margin = refresh_margin
+        self._refresh_lock = threading.Lock()
+
+    def refresh_access_token(self, refresh_token):
+        with self._refresh_lock:
+            token = self.cache_handler.get_cached_token()
+            if token and float(token.get("expires_at", 0)) - time.time() > self.refresh_margin:
+                return token  # вже оновлено іншим потоком або процесом
+            return super().refresh_access_token(refresh_token)
+
+
+class TokenRefresher:
+    """Фоновий потік: оновлює токен за TOKEN_REFRESH_MARGIN секунд до закінчення дії"""
+
+    def __init__(self, auth_manager: SpotifyOAuth, margin: float):
+        self.auth_manager = auth_manager
+        self.margin = margin
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="spotisplit-token-refresh", daemon=True)
+
+    def start(self) -> "TokenRefresher":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _delay(self) -> float:
+        token = self.auth_manager.cache_handler.get_cached_token()
+        if not token or not token.get("refresh_token"):
+            return REFRESH_RETRY_SECONDS
+        return float(token.get("expires_at", 0)) - time.time() - self.margin
+
+    def _run(self):
+        while not self._stop.is_set():
+            delay = self._delay()
+            if delay > 0:
+                self._stop.wait(delay)
+                continue
+            token = self.auth_manager.cache_handler.get_cached_token()
+            try:
+                self.auth_manager.refresh_access_token(token["refresh_token"])
+            except Exception as e:
+                print(f"⚠️ Не вдалося оновити токен Spotify: {e}")
+                self._stop.wait(REFRESH_RETRY_SECONDS)
+
+
+_refreshers: Dict[str, TokenRefresher] = {}
+
+
+def resolve_flow(config) -> str:
+    """"auto": браузер, якщо є термінал, інакше лише збережений токен (без очікування на введення)"""
+    flow = config.get("AUTH_FLOW", "auto")
+    if flow not in AUTH_FLOWS:
+        raise ValueError(f"Невідомий AUTH_FLOW '{flow}' (доступні: {', '.join(AUTH_FLOWS)})")
+    if flow == "auto":
+        flow = "browser" if sys.stdin.isatty() else "cached"
+    return flow
+
+
+def create_auth_manager(config, scopes: List[str], flow: Optional[str] = None) -> SpotifyOAuth:
+    """
+    SpotifyOAuth над спільним сховищем токенів з фоновим оновленням.
+    У режимі "cached" без збереженого токена або з токеном без потрібних scopes (spotipy тоді пішов би
+    в OAuth-діалог) - RuntimeError з підказкою, як авторизуватись.
+    """
+    scope = " ".join(scopes)
+    store = TokenStore(config.get("SPOTIFY_USER"))
+    store.seed(scope)
+    flow = flow or resolve_flow(config)
+    if flow == "cached":
+        token = store.get_cached_token()
+        missing = set(scopes) - set((token or {}).get("scope", "").split())
+        if token is None or missing:
+            reason = (f"немає збереженого токена '{store.user}' у {TOKEN_DIR}/" if token is None else
+                      f"токен '{store.user}' не має дозволів {', '.join(sorted(missing))}")
+            raise RuntimeError(f"{reason}. Авторизуйтесь: python spotify_auth.py --login --headless "
+                               f"--user {store.user} або задайте {REFRESH_TOKEN_ENV}")
+    margin = float(config["TOKEN_REFRESH_MARGIN"])
+    auth_manager = SharedTokenOAuth(
+        client_id=config["CLIENT_ID"],
+        client_secret=config["CLIENT_SECRET"],
+        redirect_uri=config["REDIRECT_URI"],
+        scope=scope,
+        cache_handler=store,
+        open_browser=flow == "browser",
+        show_dialog=False,
+        refresh_margin=margin,
+    )
+    if store.path not in _refreshers:
+        _refreshers[store.path] = TokenRefresher(auth_manager, margin).start()
+    return auth_manager
+
+
+def main():
+    """Авторизація наперед (для запусків без терміналу) та перелік збережених токенів"""
+    from run_spotisplit import load_config, SPOTIFY_SCOPES
+
+    parser = argparse.ArgumentParser(description="SpotiSplit - Сховище токенів Spotify")
+    parser.add_argument("--login", action="store_true", help="Авторизуватись і зберегти токен")
+    parser.add_argument("--headless", action="store_true",
+                        help="Без браузера: відкрити URL на будь-якому пристрої та вставити адресу переадресації")
+    parser.add_argument("--user", type=str, help="Ім'я токена у сховищі (кілька облікових записів)")
+    parser.add_argument("--list", action="store_true", help="Показати збережені токени")
+    args = parser.parse_args()
+
+    if args.list or not args.login:
+        for user in list_users():
+            token = TokenStore(user).get_cached_token() or {}
+            left = float(token.get("expires_at", 0)) - time.time()
+            print(f"🔑 {user}: {'дійсний ще ' + str(int(left // 60)) + ' хв' if left > 0 else 'буде оновлено при запуску'}")
+        if not list_users():
+            print(f"📭 У {TOKEN_DIR}/ немає токенів. Авторизуйтесь: python spotify_auth.py --login")
+        return
+
+    config = load_config()
+    if args.user:
+        config["SPOTIFY_USER"] = args.user
+    auth_manager = create_auth_manager(config, SPOTIFY_SCOPES + ["playlist-modify-public"],
+                                       flow="headless" if args.headless else "browser")
+    auth_manager.get_access_token(as_dict=False)
+    user = auth_manager.cache_handler.user
+    print(f"✅ Токен '{user}' збережено в {auth_manager.cache_handler.path}")
+
+
+if __name__ == "__main__":
+    main()
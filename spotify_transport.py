@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+SpotiSplit - HTTP транспорт для Spotify API
+Пул з'єднань під кількість воркерів, keep-alive, gzip, таймаути та статистика повторного використання з'єднань
+"""
+
+import time
+import threading
+from typing import Dict, Any, Optional
+
+import requests
+import urllib3
+import spotipy
+
+# Значення за замовчуванням для config.py (можна перевизначити там)
+TRANSPORT_DEFAULTS = {
+    "MAX_WORKERS": 8,             # паралельні воркери для завантаження/запису
+    "HTTP_POOL_SIZE": None,       # None -> дорівнює MAX_WORKERS
+    "HTTP_CONNECT_TIMEOUT": 3.05, # секунди на встановлення з'єднання
+    "HTTP_READ_TIMEOUT": 15,      # секунди на відповідь
+    "HTTP_RETRIES": 3,
+    "HTTP_BACKOFF_FACTOR": 0.3,
+    "MAX_REQUESTS_PER_SECOND": 10, # спільний ліміт для паралельних воркерів (0/None -> без ліміту)
+}
+
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+def batched(iterable, n=100):
+    """Розбиває ітерабельний об'єкт на батчі (ліміти ID/URI в одному запиті до API)"""
+    batch = []
+    for x in iterable:
+        batch.append(x)
+        if len(batch) == n:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class RateLimiter:
+    """Потокобезпечний token bucket: не більше rate запитів за секунду (з невеликим запасом burst)"""
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        self.rate = float(rate)
+        self.capacity = float(burst or max(1, int(rate)))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """Блокує потік, поки не з'явиться вільний токен"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+
+
+def create_rate_limiter(config) -> Optional[RateLimiter]:
+    """RateLimiter з config (MAX_REQUESTS_PER_SECOND), None якщо обмеження вимкнено"""
+    rate = config.get("MAX_REQUESTS_PER_SECOND")
+    return RateLimiter(rate) if rate else None
+
+
+def pool_size_for(config) -> int:
+    """Розмір пулу з'єднань: не менший за кількість паралельних воркерів"""
+    workers = int(config.get("MAX_WORKERS") or 1)
+    return max(workers, int(config.get("HTTP_POOL_SIZE") or workers))
+
+
+def build_session(pool_size: int = 8, retries: int = 3, backoff_factor: float = 0.3) -> requests.Session:
+    """Створює requests.Session з пулом keep-alive з'єднань та повторами"""
+    session = requests.Session()
+    retry = urllib3.Retry(
+        total=retries,
+        connect=None,
+        read=False,
+        allowed_methods=frozenset(["GET", "POST", "PUT", "DELETE"]),
+        status=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUS_CODES,
+        respect_retry_after_header=True,
+    )
+    # pool_block=True: воркери чекають на вільне з'єднання замість відкривати
+    # одноразові (кожне нове з'єднання - це ще один TLS handshake)
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=2, pool_maxsize=pool_size, max_retries=retry, pool_block=True
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"Accept-Encoding": "gzip, deflate", "Connection": "keep-alive"})
+    return session
+
+
+def create_spotify_client(auth_manager, config) -> spotipy.Spotify:
+    """Створює spotipy.Spotify з налаштованим транспортом (повтори - лише Retry адаптера сесії)"""
+    session = build_session(
+        pool_size=pool_size_for(config),
+        retries=int(config["HTTP_RETRIES"]),
+        backoff_factor=float(config["HTTP_BACKOFF_FACTOR"]),
+    )
+    # retries/backoff_factor spotipy застосовує лише до власної сесії, тож тут їх не передаємо
+    return spotipy.Spotify(
+        auth_manager=auth_manager,
+        requests_session=session,
+        requests_timeout=(float(config["HTTP_CONNECT_TIMEOUT"]), float(config["HTTP_READ_TIMEOUT"])),
+    )
+
+
+def connection_stats(sp) -> Dict[str, Any]:
+    """Збирає статистику пулів urllib3: скільки запитів обслужено та скільки з'єднань відкрито"""
+    session = getattr(sp, "_session", None)
+    stats = {"requests": 0, "connections": 0, "hosts": {}}
+    if not isinstance(session, requests.Session):
+        return stats
+
+    seen = set()
+    for adapter in session.adapters.values():
+        if id(adapter) in seen or not hasattr(adapter, "poolmanager"):
+            continue
+        seen.add(id(adapter))
+        pools = adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            host = f"{pool.scheme}://{pool.host}"
+            host_stats = stats["hosts"].setdefault(host, {"requests": 0, "connections": 0})
+            host_stats["requests"] += pool.num_requests
+            host_stats["connections"] += pool.num_connections
+            stats["requests"] += pool.num_requests
+            stats["connections"] += pool.num_connections
+
+    reused = max(0, stats["requests"] - stats["connections"])
+    stats["reuse_ratio"] = reused / stats["requests"] if stats["requests"] else 0.0
+    return stats
+
+
+def print_connection_stats(sp):
+    """Виводить статистику повторного використання з'єднань"""
+    stats = connection_stats(sp)
+    if not stats["requests"]:
+        return
+    print(f"\n🔌 HTTP: {stats['requests']} запитів через {stats['connections']} з'єднань "
+          f"(повторне використання: {stats['reuse_ratio']:.0%})")
+    for host, host_stats in stats["hosts"].items():
+        print(f"   • {host}: {host_stats['requests']} запитів / {host_stats['connections']} з'єднань")
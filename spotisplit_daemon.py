@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""
+SpotiSplit - Режим сервісу з чергою завдань
+Довготривалий процес тримає теплими сесію Spotify, список Liked Songs та їх характеристики:
+планові оновлення догружають лише нові треки (без змін - один запит), а локальний HTTP API
+дозволяє поставити оновлення чи розкладання в чергу та опитувати їх стан. POST-запити приймаються
+лише з токеном інсталяції (.spotisplit_daemon_token) у заголовку X-SpotiSplit-Token та з
+Content-Type: application/json - веб-сторінка в браузері не може поставити запис плейлістів у чергу
+Використання: python3 spotisplit_daemon.py [--port 8766] [--refresh-minutes 60]
+"""
+
+import os
+import sys
+import hmac
+import json
+import time
+import queue
+import secrets
+import argparse
+import itertools
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    from run_checkpoints import RunCheckpoint, latest_run_id
+    from progress import log_event
+    from feature_providers import (FEATURE_PROVIDER_DEFAULTS, FEATURE_PROVIDERS, collect_features,
+                                   provider_stage)
+except ImportError as e:
+    print(f"❌ Помилка імпорту: {e}")
+    print("📦 Встановіть залежності: pip install -r requirements.txt")
+    sys.exit(1)
+
+# Значення за замовчуванням для config.py (можна перевизначити там)
+DAEMON_DEFAULTS = {
+    "DAEMON_HOST": "127.0.0.1",
+    "DAEMON_PORT": 8766,
+    "DAEMON_REFRESH_MINUTES": 60,  # інтервал планового оновлення (0/None -> лише за запитом API)
+}
+
+JOB_KINDS = ("refresh", "split")  # refresh - оновити бібліотеку та кластери, split - ще й записати плейлісти
+JOB_HISTORY = 100
+SAVED_TRACKS_PAGE = 50
+LIBRARY_STAGE = "library"  # маркер інкрементальних оновлень (head, total) поряд з items запуску
+TOKEN_PATH = ".spotisplit_daemon_token"
+TOKEN_HEADER = "X-SpotiSplit-Token"
+
+
+def load_or_create_token(path: str = TOKEN_PATH) -> str:
+    """Токен API цієї інсталяції: створюється один раз (права 0600) і читається при наступних запусках"""
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        with open(path, encoding="utf-8") as f:
+            return f.read().strip()
+    token = secrets.token_urlsafe(32)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(token + "\n")
+    return token
+
+
+def item_key(item) -> Tuple[Optional[str], Optional[str]]:
+    """Ключ запису Liked Songs (added_at + URI: працює і для локальних треків без ID)"""
+    return item.get("added_at"), (item.get("track") or {}).get("uri")
+
+
+def is_track(item) -> bool:
+    return bool(item.get("track") and item["track"].get("id"))
+
+
+class LibraryState:
+    """Теплий стан бібліотеки: треки (новіші першими), їх характеристики та маркер для інкрементальних оновлень"""
+
+    def __init__(self):
+        self.items: List[Dict[str, Any]] = []
+        self.features_map: Dict[str, Dict[str, Any]] = {}
+        self.sources: Dict[str, str] = {}
+        self.head: Optional[Tuple] = None  # ключ найновішого запису на момент останнього отримання
+        self.total: Optional[int] = None   # total Liked Songs (разом з епізодами/локальними) на той момент
+
+    def seed_from_run(self, checkpoint, config) -> bool:
+        """Бере треки та характеристики з попереднього запуску: після рестарту сервісу features не запитуються знову"""
+        items = checkpoint.load_json("items")
+        if not items:
+            return False
+        self.items = items
+        marker = checkpoint.load_json(LIBRARY_STAGE) or {}
+        if marker.get("head") is not None:
+            self.head, self.total = tuple(marker["head"]), marker.get("total")
+        for name in config.get("FEATURE_PROVIDERS", FEATURE_PROVIDER_DEFAULTS["FEATURE_PROVIDERS"]):
+            if name not in FEATURE_PROVIDERS:
+                continue
+            for t_id, f in (checkpoint.load_json(provider_stage(name)) or {}).items():
+                if f and t_id not in self.features_map:
+                    self.features_map[t_id] = f
+                    self.sources[t_id] = name
+        return True
+
+    def fetch_changes(self, sp) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        Догружає сторінки Liked Songs до першого вже відомого запису. Повертає (нові треки, чи змінилась бібліотека).
+        Якщо записи видалено або маркер не знайдено - повне перечитування (нові = невідомі за track_id).
+        """
+        page = sp.current_user_saved_tracks(limit=SAVED_TRACKS_PAGE)
+        total = page.get("total")
+        head = item_key(page["items"][0]) if page.get("items") else None
+        if self.head is not None and head == self.head and total == self.total:
+            return [], False
+
+        fresh_raw: List[Dict[str, Any]] = []
+        found_marker = False
+        while self.head is not None:
+            for item in page.get("items", []):
+                if item_key(item) == self.head:
+                    found_marker = True
+                    break
+                fresh_raw.append(item)
+            if found_marker or not page.get("next"):
+                break
+            page = sp.next(page)
+
+        if found_marker and total == self.total + len(fresh_raw):
+            new_items = [it for it in fresh_raw if is_track(it)]
+            self.items = new_items + self.items
+        else:
+            from run_spotisplit import get_all_liked_tracks
+
+            known = {it["track"]["id"] for it in self.items}
+            self.items = get_all_liked_tracks(sp)
+            new_items = [it for it in self.items if it["track"]["id"] not in known]
+            current = {it["track"]["id"] for it in self.items}
+            self.features_map = {t_id: f for t_id, f in self.features_map.items() if t_id in current}
+            self.sources = {t_id: s for t_id, s in self.sources.items() if t_id in current}
+        self.head, self.total = head, total
+        return new_items, True
+
+    def complete_features(self, sp, new_items, config):
+        """Ланцюжок постачальників лише для нових треків"""
+        if not new_items:
+            return
+        features_map, sources = collect_features(sp, new_items, config)
+        self.features_map.update(features_map)
+        self.sources.update(sources)
+
+    def write_stages(self, checkpoint, config):
+        """Заповнює етапи нового запуску теплим станом: load_and_cluster_tracks бере їх замість запитів до API"""
+        checkpoint.save_json("items", self.items)
+        checkpoint.save_json(LIBRARY_STAGE, {"head": self.head, "total": self.total})
+        current = {it["track"]["id"] for it in self.items}
+        for name in config.get("FEATURE_PROVIDERS", FEATURE_PROVIDER_DEFAULTS["FEATURE_PROVIDERS"]):
+            if name not in FEATURE_PROVIDERS:
+                continue
+            checkpoint.save_json(provider_stage(name), {t_id: f for t_id, f in self.features_map.items()
+                                                       if self.sources.get(t_id) == name and t_id in current})
+
+
+class SpotiSplitService:
+    """Черга завдань з одним воркером: завдання виконуються послідовно над спільною теплою сесією"""
+
+    def __init__(self, sp, user_id: str, config):
+        self.sp = sp
+        self.user_id = user_id
+        self.config = config
+        self.library = LibraryState()
+        self.checkpoint: Optional[RunCheckpoint] = None
+        self.df = None
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self.queue: "queue.Queue[Optional[str]]" = queue.Queue()
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.ids = itertools.count(1)
+        self.started_at = datetime.now().isoformat(timespec="seconds")
+        self.next_refresh: Optional[float] = None
+
+        run_id = latest_run_id()
+        if run_id is not None and self.library.seed_from_run(RunCheckpoint.resume(run_id), config):
+            print(f"♻️ Теплий старт із запуску {run_id}: {len(self.library.items)} треків, "
+                  f"з характеристиками {len(self.library.features_map)}")
+
+    # --- черга ---
+
+    def submit(self, kind: str) -> Dict[str, Any]:
+        """Ставить завдання в чергу; однакове завдання, що ще чекає, не дублюється"""
+        if kind not in JOB_KINDS:
+            raise ValueError(f"Невідомий тип завдання '{kind}' (доступні: {', '.join(JOB_KINDS)})")
+        with self.lock:
+            for job in self.jobs.values():
+                if job["kind"] == kind and job["status"] == "queued":
+                    return dict(job)
+            job_id = str(next(self.ids))
+            job = {"id": job_id, "kind": kind, "status": "queued",
+                   "created_at": datetime.now().isoformat(timespec="seconds")}
+            self.jobs[job_id] = job
+            for old_id in list(self.jobs)[:-JOB_HISTORY]:
+                if self.jobs[old_id]["status"] in ("done", "failed"):
+                    del self.jobs[old_id]
+        self.queue.put(job_id)
+        return dict(job)
+
+    def job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def job_list(self) -> List[Dict[str, Any]]:
+        with self.lock:
+            return [dict(job) for job in self.jobs.values()]
+
+    def _update(self, job_id: str, **fields):
+        with self.lock:
+            self.jobs[job_id].update(fields)
+
+    def worker(self):
+        while True:
+            job_id = self.queue.get()
+            if job_id is None:
+                return
+            kind = self.jobs[job_id]["kind"]
+            self._update(job_id, status="running", started_at=datetime.now().isoformat(timespec="seconds"))
+            started = time.perf_counter()
+            print(f"\n⚙️ Завдання #{job_id}: {kind}")
+            try:
+                result = self.refresh(write_playlists=kind == "split")
+            except Exception as e:
+                import traceback
+                traceback.print_exc()
+                self._update(job_id, status="failed", error=str(e), seconds=round(time.perf_counter() - started, 3))
+                log_event("job", **self.job(job_id))
+                print(f"❌ Завдання #{job_id} завершилось помилкою: {e}")
+                continue
+            self._update(job_id, status="done", result=result, seconds=round(time.perf_counter() - started, 3),
+                         finished_at=datetime.now().isoformat(timespec="seconds"))
+            log_event("job", **self.job(job_id))
+            print(f"✅ Завдання #{job_id}: {kind} за {time.perf_counter() - started:.3f} с")
+
+    def scheduler(self, interval_minutes: float):
+        """Плановий refresh кожні interval_minutes хвилин (перший - одразу після старту)"""
+        while not self.stop_event.is_set():
+            self.submit("refresh")
+            self.next_refresh = time.time() + interval_minutes * 60
+            self.stop_event.wait(interval_minutes * 60)
+
+    def start(self):
+        threading.Thread(target=self.worker, name="spotisplit-worker", daemon=True).start()
+        minutes = self.config.get("DAEMON_REFRESH_MINUTES")
+        if minutes:
+            threading.Thread(target=self.scheduler, args=(float(minutes),), name="spotisplit-scheduler",
+                             daemon=True).start()
+
+    def stop(self):
+        self.stop_event.set()
+        self.queue.put(None)
+
+    # --- завдання ---
+
+    def refresh(self, write_playlists: bool = False) -> Dict[str, Any]:
+        """Догружає зміни бібліотеки; кластеризує заново лише якщо вони є, за потреби записує плейлісти"""
+        from run_spotisplit import load_and_cluster_tracks, create_playlists_from_clusters
+
+        new_items, changed = self.library.fetch_changes(self.sp)
+        if changed or self.checkpoint is None:
+            self.library.complete_features(self.sp, new_items, self.config)
+            checkpoint = RunCheckpoint()
+            self.library.write_stages(checkpoint, self.config)
+            print(f"🆔 Запуск: {checkpoint.run_id} ({len(new_items)} нових треків)")
+            df = load_and_cluster_tracks(self.sp, dict(self.config), checkpoint)
+            if df is None:
+                raise RuntimeError(f"Кластеризація запуску {checkpoint.run_id} не вдалась")
+            self.checkpoint, self.df = checkpoint, df
+        else:
+            print(f"♻️ Бібліотека без змін ({len(self.library.items)} треків), запуск {self.checkpoint.run_id}")
+
+        if write_playlists:
+            create_playlists_from_clusters(self.sp, self.df, dict(self.config), self.user_id, self.checkpoint)
+        counts = self.df[self.df["cluster"] != -1]["cluster"].value_counts().sort_index()
+        return {
+            "run_id": self.checkpoint.run_id,
+            "changed": changed,
+            "new_tracks": len(new_items),
+            "tracks": len(self.df),
+            "clusters": {str(int(c)): int(n) for c, n in counts.items()},
+            "playlists": len(self.checkpoint.playlist_progress()),
+        }
+
+    def status(self) -> Dict[str, Any]:
+        with self.lock:
+            pending = sum(job["status"] in ("queued", "running") for job in self.jobs.values())
+        return {
+            "user_id": self.user_id,
+            "started_at": self.started_at,
+            "run_id": self.checkpoint.run_id if self.checkpoint is not None else None,
+            "tracks": len(self.library.items),
+            "tracks_with_features": len(self.library.features_map),
+            "pending_jobs": pending,
+            "next_refresh": (datetime.fromtimestamp(self.next_refresh).isoformat(timespec="seconds")
+                             if self.next_refresh else None),
+        }
+
+
+class DaemonHandler(BaseHTTPRequestHandler):
+    """
+    GET  /api/status           - стан сервісу
+    GET  /api/jobs[/ID]        - завдання (останні JOB_HISTORY) або одне завдання
+    POST /api/refresh|split    - поставити завдання в чергу (202 + завдання); потрібні заголовки
+                                 X-SpotiSplit-Token та Content-Type: application/json
+    """
+
+    service: SpotiSplitService = None
+    token: str = None
+
+    def _send_json(self, body, status: int = 200):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0].rstrip("/")
+        if path == "/api/status":
+            self._send_json(self.service.status())
+        elif path == "/api/jobs":
+            self._send_json(self.service.job_list())
+        elif path.startswith("/api/jobs/"):
+            job = self.service.job(path.rsplit("/", 1)[1])
+            self._send_json(job if job else {"error": "job not found"}, 200 if job else 404)
+        else:
+            self._send_json({"error": "not found"}, 404)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        kind = self.path.split("?", 1)[0].rstrip("/").rsplit("/", 1)[-1]
+        if not self.path.startswith("/api/") or kind not in JOB_KINDS:
+            self._send_json({"error": "not found"}, 404)
+            return
+        # Токен у власному заголовку та JSON Content-Type: міжсайтовий "простий" запит з браузера
+        # не може мати ні того, ні іншого без CORS preflight, який сервіс не дозволяє
+        if not hmac.compare_digest(self.headers.get(TOKEN_HEADER, ""), self.token or ""):
+            self._send_json({"error": f"missing or invalid {TOKEN_HEADER}"}, 403)
+            return
+        content_type = (self.headers.get("Content-Type") or "").split(";", 1)[0].strip().lower()
+        if content_type != "application/json":
+            self._send_json({"error": "Content-Type must be application/json"}, 415)
+            return
+        self._send_json(self.service.submit(kind), 202)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    """Основна функція"""
+    from run_spotisplit import load_config, authenticate_spotify
+    from progress import configure_progress
+
+    parser = argparse.ArgumentParser(description="SpotiSplit - Сервіс з чергою завдань та плановими оновленнями")
+    parser.add_argument("--host", type=str, help="Адреса API (за замовчуванням: DAEMON_HOST з config.py)")
+    parser.add_argument("--port", type=int, help="Порт API (за замовчуванням: DAEMON_PORT з config.py)")
+    parser.add_argument("--refresh-minutes", type=float,
+                        help="Інтервал планових оновлень (0 - лише за запитом; за замовчуванням: DAEMON_REFRESH_MINUTES)")
+    args = parser.parse_args()
+
+    config = load_config()
+    for key, value in (("DAEMON_HOST", args.host), ("DAEMON_PORT", args.port),
+                       ("DAEMON_REFRESH_MINUTES", args.refresh_minutes)):
+        if value is not None:
+            config[key] = value
+    if config.get("TRACK_SOURCE", "liked") != "liked":
+        print("⚠️ Режим сервісу стежить лише за Liked Songs: TRACK_SOURCE ігнорується")
+        config["TRACK_SOURCE"] = "liked"
+    configure_progress(config)
+
+    sp, user_id = authenticate_spotify(config)
+    if sp is None:
+        return
+
+    service = SpotiSplitService(sp, user_id, config)
+    handler = type("ServiceHandler", (DaemonHandler,), {"service": service, "token": load_or_create_token()})
+    server = ThreadingHTTPServer((config["DAEMON_HOST"], int(config["DAEMON_PORT"])), handler)
+    service.start()
+    url = f"http://{config['DAEMON_HOST']}:{config['DAEMON_PORT']}"
+    print(f"🛰️ SpotiSplit сервіс: {url}/api/status (Ctrl+C для зупинки)")
+    print(f"💡 Розкласти зараз: curl -X POST -H 'Content-Type: application/json' "
+          f"-H \"{TOKEN_HEADER}: $(cat {TOKEN_PATH})\" {url}/api/split")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Сервіс зупинено")
+    finally:
+        service.stop()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
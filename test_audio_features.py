@@ -6,6 +6,7 @@ Test script to debug Spotify audio features access
 import os
 import spotipy
 from spotipy.oauth2 import SpotifyOAuth
+from spotify_auth import TokenStore
 
 # Set environment variables
 os.environ["SPOTIPY_CLIENT_ID"] = "b7b8c75ab68d4397be30272f2e678090"
@@ -27,7 +28,7 @@ print("Testing with scopes:", " ".join(SCOPES))
 auth_manager = SpotifyOAuth(
     scope=" ".join(SCOPES), 
     show_dialog=True, 
-    cache_path=".cache-spotisplit",
+    cache_handler=TokenStore(),
     open_browser=True
 )
 
@@ -0,0 +1,88 @@
+import numpy as np
+
+from clustering import CLUSTERING_DEFAULTS, fit_clusters, kmeans_restarts, resolve_size_limits
+from hierarchical_clustering import ClusterTree
+from run_checkpoints import RunCheckpoint
+from track_cleaning import TrackCleaning
+
+
+def make_config(**overrides):
+    config = {**CLUSTERING_DEFAULTS, "N_CLUSTERS": 4, "RANDOM_STATE": 0, "KMEANS_N_INIT": 3, **overrides}
+    return config
+
+
+def blobs(n_per_cluster=50, k=4, seed=0):
+    rng = np.random.RandomState(seed)
+    centers = rng.uniform(-10, 10, size=(k, 3))
+    return np.vstack([c + rng.normal(size=(n_per_cluster, 3)) for c in centers]).astype(np.float32)
+
+
+def test_balanced_limits_hold_with_outliers_and_duplicates():
+    X = blobs()
+    n_fit = len(X)
+    # 40 дублікатів треків одного кластера та 20 викидів біля нього ж - без перевірки місткості
+    # усі вони потрапили б в один кластер
+    duplicates = X[:40] + 0.01
+    outliers = X[0] + np.random.RandomState(1).normal(scale=0.5, size=(20, 3)).astype(np.float32) * 30
+    X_all = np.vstack([X, duplicates, outliers]).astype(np.float32)
+    canonical = np.arange(len(X_all))
+    canonical[n_fit:n_fit + 40] = np.arange(40)
+    is_outlier = np.zeros(len(X_all), dtype=bool)
+    is_outlier[n_fit + 40:] = True
+    cleaning = TrackCleaning(canonical, is_outlier)
+
+    config = make_config(CLUSTERING_MODE="balanced", MAX_PLAYLIST_SIZE=70)
+    labels, _ = fit_clusters(X_all, config, cleaning=cleaning)
+
+    min_size, max_size = resolve_size_limits(len(X_all), 4, config)
+    counts = np.bincount(labels, minlength=4)
+    assert counts.sum() == len(X_all)
+    assert counts.max() <= max_size
+    assert counts.min() >= min_size
+
+
+def test_excluded_rows_follow_originals_without_limits():
+    X = blobs()
+    X_all = np.vstack([X, X[:5]]).astype(np.float32)
+    canonical = np.arange(len(X_all))
+    canonical[len(X):] = np.arange(5)
+    cleaning = TrackCleaning(canonical, np.zeros(len(X_all), dtype=bool))
+
+    labels, _ = fit_clusters(X_all, make_config(), cleaning=cleaning)
+
+    assert np.array_equal(labels[len(X):], labels[:5])
+
+
+def test_saved_tree_cut_keeps_outliers_and_duplicates(tmp_path):
+    X = blobs()
+    X_all = np.vstack([X, X[:5] + 0.01, [[40.0, 40.0, 40.0]]]).astype(np.float32)
+    track_ids = np.array([f"t{i}" for i in range(len(X_all))])
+    canonical = np.arange(len(X_all))
+    canonical[len(X):len(X) + 5] = np.arange(5)
+    is_outlier = np.zeros(len(X_all), dtype=bool)
+    is_outlier[-1] = True
+    checkpoint = RunCheckpoint(root=str(tmp_path))
+
+    labels, _ = fit_clusters(X_all, make_config(CLUSTERING_MODE="hierarchical"), track_ids, checkpoint,
+                             TrackCleaning(canonical, is_outlier))
+
+    tree = ClusterTree.load(checkpoint)
+    assert list(tree.track_ids) == list(track_ids)
+    assert np.array_equal(tree.cut(4), labels)
+    for k in (2, 6):
+        cut = tree.cut(k)
+        assert len(cut) == len(X_all)
+        assert np.array_equal(cut[len(X):len(X) + 5], cut[:5])
+
+
+def test_early_stop_skips_remaining_restarts():
+    X = blobs()
+    n_init, jobs = 40, 2
+    labels, _, _, report = kmeans_restarts(X, 4, 0, n_init=n_init, jobs=jobs, early_stop=2)
+    serial_labels, _, _, serial = kmeans_restarts(X, 4, 0, n_init=n_init, jobs=1, early_stop=2)
+
+    assert report["restarts"] == serial["restarts"] < n_init
+    # у процеси потрапляє не більше jobs рестартів понад розглянуті
+    assert report["submitted"] <= report["restarts"] + jobs - 1
+    assert serial["submitted"] == serial["restarts"]
+    assert np.array_equal(labels, serial_labels)
@@ -0,0 +1,61 @@
+import json
+import os
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from spotisplit_daemon import TOKEN_HEADER, DaemonHandler, load_or_create_token
+
+
+class FakeService:
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, kind):
+        self.submitted.append(kind)
+        return {"id": str(len(self.submitted)), "kind": kind, "status": "queued"}
+
+
+@pytest.fixture
+def daemon():
+    service = FakeService()
+    handler = type("ServiceHandler", (DaemonHandler,), {"service": service, "token": "secret"})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}", service
+    server.shutdown()
+    server.server_close()
+
+
+def post(url, headers):
+    request = urllib.request.Request(url, data=b"{}", headers=headers, method="POST")
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as e:
+        return e.code, json.load(e)
+
+
+def test_post_requires_token_and_json(daemon):
+    url, service = daemon
+    # міжсайтова форма: без токена, text/plain
+    assert post(f"{url}/api/split", {"Content-Type": "text/plain"})[0] == 403
+    assert post(f"{url}/api/split", {"Content-Type": "application/json", TOKEN_HEADER: "wrong"})[0] == 403
+    assert post(f"{url}/api/split", {"Content-Type": "text/plain", TOKEN_HEADER: "secret"})[0] == 415
+    assert service.submitted == []
+
+    status, job = post(f"{url}/api/split", {"Content-Type": "application/json; charset=utf-8", TOKEN_HEADER: "secret"})
+    assert status == 202 and job["kind"] == "split"
+    assert service.submitted == ["split"]
+
+
+def test_token_is_created_once(tmp_path):
+    path = str(tmp_path / "token")
+    token = load_or_create_token(path)
+    assert len(token) >= 32
+    assert load_or_create_token(path) == token
+    assert os.stat(path).st_mode & 0o777 == 0o600
@@ -0,0 +1,42 @@
+import numpy as np
+from scipy.io import wavfile
+
+import local_audio_features
+from local_audio_features import extract_features
+
+
+def write_tracks(root, n=3, sr=8000):
+    rng = np.random.RandomState(0)
+    paths = {}
+    for i in range(n):
+        path = root / f"track{i}.wav"
+        wavfile.write(path, sr, (rng.uniform(-1, 1, sr * 2) * 20000).astype(np.int16))
+        paths[f"track{i}"] = str(path)
+    broken = root / "broken.wav"
+    broken.write_bytes(b"not a wav file")
+    paths["broken"] = str(broken)
+    return paths
+
+
+def test_unchanged_files_are_not_hashed_again(tmp_path, monkeypatch, capsys):
+    paths = write_tracks(tmp_path)
+    cache_path = str(tmp_path / "cache.json")
+    hashed = []
+    file_hash = local_audio_features.file_hash
+    monkeypatch.setattr(local_audio_features, "file_hash", lambda path: hashed.append(path) or file_hash(path))
+
+    first = extract_features(paths, max_workers=1, cache_path=cache_path)
+    assert sorted(first) == ["track0", "track1", "track2"]
+    assert len(hashed) == 4
+    assert "0 з кешу, 3 нових, не вдалося 1" in capsys.readouterr().out
+
+    hashed.clear()
+    second = extract_features(paths, max_workers=1, cache_path=cache_path)
+    assert second == first
+    assert hashed == []
+    # невдалий файл не рахується як влучання в кеш
+    assert "3 з кешу, 0 нових, не вдалося 1" in capsys.readouterr().out
+
+    wavfile.write(paths["track0"], 8000, np.zeros(8000, dtype=np.int16))
+    extract_features(paths, max_workers=1, cache_path=cache_path)
+    assert hashed == [paths["track0"]]
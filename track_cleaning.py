@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+SpotiSplit - Дублікати та викиди перед кластеризацією
+Та сама пісня з різних релізів (сингл, альбом, збірка) знаходиться блокуванням за хешем нормалізованої
+назви та основного виконавця, далі - за тривалістю та відстанню характеристик; порівнюються лише треки
+одного блоку, без O(n²). Викиди (40-хвилинні треки, spoken word) визначаються robust z-score відстані
+до медіанного треку або IsolationForest. Центроїди навчаються лише на чистих рядках; дублікати потім
+отримують кластер свого оригіналу, викиди - найближчого центроїда; у плейлісти дублікати не пишуться
+"""
+
+from typing import NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import pairwise_distances_argmin
+
+# Значення за замовчуванням для config.py (можна перевизначити там)
+CLEANING_DEFAULTS = {
+    "DEDUP_TRACKS": True,             # шукати дублікати: вони не впливають на центроїди
+    "SKIP_DUPLICATES": True,          # True -> у плейліст пишеться лише оригінал, False -> і дублікати
+    "DEDUP_DURATION_TOLERANCE": 3.0,  # секунди різниці тривалості для того самого запису
+    "OUTLIER_METHOD": "zscore",       # "zscore" (медіана/MAD), "isolation" (IsolationForest) або None
+    "OUTLIER_THRESHOLD": 3.5,         # поріг robust z-score
+    "OUTLIER_FRACTION": 0.01,         # очікувана частка викидів для IsolationForest
+}
+
+DEDUP_FEATURE_DISTANCE = 0.5  # макс. RMS-різниця масштабованих характеристик між дублікатами
+ALBUM_TYPE_RANK = {"album": 0, "single": 1, "compilation": 2}  # якому релізу віддається перевага
+
+_BRACKETS = r"\s*[\(\[][^\)\]]*[\)\]]"  # (feat. X), [Remastered], (Radio Edit)
+_SUFFIX = r"\s+-\s+.*$"                 # " - Remastered 2011", " - Single Version"
+
+
+class TrackCleaning(NamedTuple):
+    canonical: np.ndarray  # позиція оригіналу для кожного рядка (сам рядок, якщо не дублікат)
+    outliers: np.ndarray   # bool, викид
+
+    @property
+    def duplicates(self) -> np.ndarray:
+        return self.canonical != np.arange(len(self.canonical))
+
+    @property
+    def fit_mask(self) -> np.ndarray:
+        """Рядки, на яких навчається кластеризація"""
+        return ~(self.duplicates | self.outliers)
+
+
+def normalized_titles(df: pd.DataFrame) -> pd.Series:
+    """Назва без дужок, суфіксів версій, регістру та пунктуації"""
+    return (df["track_name"].fillna("").str.lower()
+            .str.replace(_BRACKETS, "", regex=True)
+            .str.replace(_SUFFIX, "", regex=True)
+            .str.replace(r"[\W_]+", "", regex=True))
+
+
+def primary_artists(df: pd.DataFrame) -> pd.Series:
+    """ID першого виконавця (або ім'я, якщо ID немає)"""
+    names = df["artist"].fillna("").str.split(",").str[0].str.strip().str.lower()
+    if "artist_ids" not in df:
+        return names
+    ids = df["artist_ids"].fillna("").str.split(",").str[0]
+    return ids.where(ids != "", names)
+
+
+def find_duplicates(df: pd.DataFrame, X: Optional[np.ndarray] = None, duration_tolerance: float = 3.0,
+                    max_distance: float = DEDUP_FEATURE_DISTANCE) -> np.ndarray:
+    """
+    Позиція оригіналу для кожного рядка df. Блок - хеш (назва, виконавець); у блоці, відсортованому за
+    тривалістю, сусіди ближче duration_tolerance секунд утворюють групу. Оригінал групи - альбомна
+    версія, далі найпопулярніша. Якщо передано X, дублікат ще й має бути ближче max_distance до оригіналу.
+    """
+    n = len(df)
+    canonical = np.arange(n)
+    if n < 2:
+        return canonical
+    titles = normalized_titles(df)
+    keys = pd.util.hash_pandas_object(pd.DataFrame({"title": titles, "artist": primary_artists(df)}),
+                                      index=False).to_numpy()
+    seconds = pd.to_numeric(df["duration_ms"], errors="coerce").to_numpy(dtype=float) / 1000.0
+    valid = (titles.to_numpy() != "") & np.isfinite(seconds)
+
+    order = np.lexsort((seconds, keys))
+    order = order[valid[order]]
+    if len(order) < 2:
+        return canonical
+    k, s = keys[order], seconds[order]
+    starts = np.r_[True, (k[1:] != k[:-1]) | (np.diff(s) > duration_tolerance)]
+    group = np.cumsum(starts) - 1
+    sizes = np.bincount(group)
+    in_group = sizes[group] > 1
+    if not in_group.any():
+        return canonical
+    rows, group = order[in_group], group[in_group]
+
+    album_rank = df["album_type"].map(ALBUM_TYPE_RANK).fillna(len(ALBUM_TYPE_RANK)).to_numpy() \
+        if "album_type" in df else np.zeros(n)
+    popularity = pd.to_numeric(df["popularity"], errors="coerce").fillna(0).to_numpy() \
+        if "popularity" in df else np.zeros(n)
+    best = np.lexsort((rows, -popularity[rows], album_rank[rows], group))
+    rows, group = rows[best], group[best]
+    first = np.r_[True, group[1:] != group[:-1]]
+    canonical[rows] = rows[first][np.cumsum(first) - 1]
+
+    if X is not None:
+        dup = np.flatnonzero(canonical != np.arange(n))
+        diff = np.asarray(X[dup], dtype=float) - np.asarray(X[canonical[dup]], dtype=float)
+        rms = np.sqrt(np.mean(diff ** 2, axis=1))
+        canonical[dup[rms > max_distance]] = dup[rms > max_distance]
+    return canonical
+
+
+def robust_zscores(X: np.ndarray) -> np.ndarray:
+    """Robust z-score (медіана/MAD) евклідової відстані кожного рядка до покоординатної медіани"""
+    X = np.asarray(X, dtype=float)
+    distance = np.linalg.norm(X - np.median(X, axis=0), axis=1)
+    center = np.median(distance)
+    mad = np.median(np.abs(distance - center))
+    if mad == 0:
+        mad = np.mean(np.abs(distance - center)) / 0.7979  # MeanAD -> MAD для нормального розподілу
+    if mad == 0:
+        return np.zeros(len(X))
+    return 0.6745 * (distance - center) / mad
+
+
+def find_outliers(X: np.ndarray, config) -> np.ndarray:
+    """bool-маска викидів згідно з OUTLIER_METHOD"""
+    method = config.get("OUTLIER_METHOD")
+    if not method or len(X) < 10:
+        return np.zeros(len(X), dtype=bool)
+    if method == "zscore":
+        return robust_zscores(X) > float(config["OUTLIER_THRESHOLD"])
+    if method == "isolation":
+        from sklearn.ensemble import IsolationForest
+
+        forest = IsolationForest(contamination=config["OUTLIER_FRACTION"], random_state=config["RANDOM_STATE"])
+        return forest.fit_predict(X) == -1
+    raise ValueError(f"Невідомий OUTLIER_METHOD '{method}' (доступні: zscore, isolation)")
+
+
+def clean_tracks(df: pd.DataFrame, X: np.ndarray, config, dedup_X: Optional[np.ndarray] = None) -> TrackCleaning:
+    """
+    Дублікати та викиди для рядків df (X - масштабовані характеристики тих самих рядків).
+    dedup_X - простір для підтвердження дублікатів (None -> лише назва, виконавець і тривалість).
+    """
+    if config.get("DEDUP_TRACKS"):
+        canonical = find_duplicates(df, dedup_X, float(config["DEDUP_DURATION_TOLERANCE"]))
+    else:
+        canonical = np.arange(len(df))
+    unique = canonical == np.arange(len(df))
+    outliers = np.zeros(len(df), dtype=bool)
+    outliers[unique] = find_outliers(X[unique], config)
+    cleaning = TrackCleaning(canonical, outliers)
+    if cleaning.fit_mask.sum() < int(config["N_CLUSTERS"]):
+        print("⚠️ Після очищення треків менше, ніж N_CLUSTERS: кластеризую всі")
+        return TrackCleaning(np.arange(len(df)), np.zeros(len(df), dtype=bool))
+    if cleaning.duplicates.any() or outliers.any():
+        print(f"🧹 Дублікатів: {int(cleaning.duplicates.sum())}, викидів: {int(outliers.sum())} | "
+              f"кластеризація на {int(cleaning.fit_mask.sum())} з {len(df)} треків")
+    return cleaning
+
+
+def assign_excluded(X: np.ndarray, cleaning: TrackCleaning, fit_labels: np.ndarray, centers: np.ndarray,
+                    size_limits: Optional[Tuple[int, int]] = None) -> np.ndarray:
+    """
+    Мітки всіх рядків: викиди - до найближчого центроїда, дублікати - кластер оригіналу.
+    size_limits (min, max) - межі розміру кластера для всіх рядків (збалансований режим): виключені
+    рядки розподіляються balanced_assign у вільне місце, дублікат іде до оригіналу, поки там є місце.
+    """
+    labels = np.empty(len(X), dtype=int)
+    fit_mask = cleaning.fit_mask
+    labels[fit_mask] = fit_labels
+    rest = np.flatnonzero(~fit_mask)
+    if size_limits is not None and len(rest):
+        from clustering import balanced_assign, squared_distances
+
+        counts = np.bincount(fit_labels, minlength=len(centers))
+        D = squared_distances(X[rest], centers)
+        original = cleaning.canonical[rest]
+        dup = original != rest
+        if dup.any():
+            # кластер оригіналу (або, якщо оригінал сам викид, - його найближчий центроїд) найдешевший
+            preferred = squared_distances(X[original[dup]], centers).argmin(axis=1)
+            in_fit = fit_mask[original[dup]]
+            preferred[in_fit] = labels[original[dup][in_fit]]
+            D[np.flatnonzero(dup), preferred] = -1.0
+        min_size, max_size = size_limits
+        labels[rest] = balanced_assign(D, np.maximum(min_size - counts, 0), max_size - counts)
+        return labels
+    if len(rest):
+        labels[rest] = pairwise_distances_argmin(np.asarray(X[rest], dtype=float), np.asarray(centers, dtype=float))
+    dup = np.flatnonzero(cleaning.duplicates)
+    labels[dup] = labels[cleaning.canonical[dup]]
+    return labels
+
+
+def cleaning_columns(df: pd.DataFrame, cleaning: TrackCleaning, index=None) -> pd.DataFrame:
+    """Колонки duplicate_of (track_id оригіналу) та outlier для рядків index (за замовчуванням - усіх)"""
+    index = df.index if index is None else index
+    track_ids = df.loc[index, "track_id"].to_numpy()
+    df["duplicate_of"] = None
+    df["outlier"] = False
+    dup = cleaning.duplicates
+    df.loc[index[dup], "duplicate_of"] = track_ids[cleaning.canonical[dup]]
+    df.loc[index, "outlier"] = cleaning.outliers
+    return df
+
+
+def playlist_tracks(df: pd.DataFrame, config) -> pd.DataFrame:
+    """Рядки для запису в плейлісти: без дублікатів (duplicate_of), якщо SKIP_DUPLICATES"""
+    if not config.get("SKIP_DUPLICATES", CLEANING_DEFAULTS["SKIP_DUPLICATES"]) or "duplicate_of" not in df:
+        return df
+    return df[df["duplicate_of"].isna()]
@@ -8,16 +8,56 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
+import os
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
 from itertools import combinations
 import warnings
 warnings.filterwarnings('ignore')
 
+from cluster_stats import STATS_STAGE, compute_cluster_stats
+from projection import load_or_fit_projection, axis_labels
+
 # Налаштування для кращої візуалізації
 plt.style.use('default')
 sns.set_palette("husl")
 plt.rcParams['figure.figsize'] = (12, 8)
 plt.rcParams['font.size'] = 10
 
+# Налаштування рендерингу (перевизначаються через --batch / --dpi)
+RENDER_DPI = 300
+SHOW_PLOTS = True
+MAX_SCATTER_POINTS = 5000  # вище цього порогу scatter-панелі малюють відтворювану випадкову вибірку точок
+
+def save_figure(path, label):
+    """Зберігає поточну фігуру; в інтерактивному режимі показує її, в пакетному - закриває"""
+    plt.savefig(path, dpi=RENDER_DPI, bbox_inches='tight')
+    print(f"💾 Збережено {label}: {path}")
+    if SHOW_PLOTS:
+        plt.show()
+    else:
+        plt.close('all')
+
+def cluster_colors(df):
+    """Кластери, код кластера для кожного рядка та палітра - обчислюються один раз на графік"""
+    clusters = np.sort(df['cluster'].unique())
+    codes = np.searchsorted(clusters, df['cluster'].to_numpy())
+    palette = plt.cm.tab20(np.linspace(0, 1, len(clusters)))
+    return clusters, codes, palette
+
+def sample_rows(n, limit=MAX_SCATTER_POINTS, seed=0):
+    """Індекси рядків для scatter: всі, або відтворювана випадкова вибірка з limit рядків"""
+    if n <= limit:
+        return np.arange(n)
+    return np.sort(np.random.default_rng(seed).choice(n, limit, replace=False))
+
+def cluster_legend_handles(clusters, palette):
+    """Елементи легенди для кластерів (scatter малюється одним викликом, тому легенда окремо)"""
+    from matplotlib.lines import Line2D
+    return [Line2D([], [], marker='o', linestyle='', color=palette[i], label=f'Cluster {c}')
+            for i, c in enumerate(clusters)]
+
 def load_cluster_data(csv_file="spotisplit_clusters_no_audio.csv"):
     """Завантажує дані кластерів з CSV файлу"""
     try:
@@ -30,30 +70,50 @@ def load_cluster_data(csv_file="spotisplit_clusters_no_audio.csv"):
         print("💡 Спочатку запустіть run_spotisplit_no_audio.py")
         return None
 
-def create_feature_pairs_plot(df, max_features=8):
+def load_run_features(run_id=None):
+    """Завантажує масштабовану матрицю характеристик запуску (memory-map, без копіювання) та мітки кластерів"""
+    from run_checkpoints import RunCheckpoint, latest_run_id
+    from feature_store import load_feature_matrix, feature_frame
+    from similarity_index import CLUSTERS_FILE
+
+    run_id = run_id or latest_run_id()
+    if run_id is None:
+        print("❌ Збережених запусків не знайдено")
+        return None
+    try:
+        checkpoint = RunCheckpoint.resume(run_id)
+        matrix = load_feature_matrix(checkpoint)
+        labels = np.load(checkpoint.path(CLUSTERS_FILE))["labels"]
+    except FileNotFoundError as e:
+        print(f"❌ {e}")
+        return None
+    df = feature_frame(matrix).reset_index(drop=True)
+    df["cluster"] = labels
+    df.attrs["run_id"] = run_id
+    print(f"✅ Запуск {run_id}: {len(df)} треків × {len(matrix.columns)} характеристик (memory-map)")
+    print(f"🎯 Кількість кластерів: {df['cluster'].nunique()}")
+    return df
+
+def load_run_stats(run_id, features):
+    """Статистики кластерів, закешовані запуском (None, якщо їх немає або вони не покривають характеристики)"""
+    from run_checkpoints import RunCheckpoint
+
+    checkpoint = RunCheckpoint.resume(run_id)
+    if not checkpoint.has(STATS_STAGE):
+        return None
+    stats = checkpoint.load_frame(STATS_STAGE)
+    if not set(features) <= set(stats.means.columns):
+        return None
+    # Z-score середніх та відношення дисперсій не змінюються від масштабування, тож підходять і для X_scaled
+    print(f"♻️ Статистики кластерів взято з запуску {run_id}")
+    return stats.subset(features)
+
+def create_feature_pairs_plot(df, max_features=8, stats=None):
     """Створює графік всіх пар характеристик з розбивкою по кластерах"""
     
-    # Вибір числових характеристик для візуалізації
-    numeric_features = df.select_dtypes(include=[np.number]).columns.tolist()
-    numeric_features = [f for f in numeric_features if f != 'cluster']
-    
-    # Обмежуємо кількість характеристик для кращої читабельності
-    if len(numeric_features) > max_features:
-        # Вибираємо найбільш інформативні характеристики
-        feature_importance = []
-        for feature in numeric_features:
-            # Розраховуємо варіацію між кластерами
-            between_cluster_var = df.groupby('cluster')[feature].var().mean()
-            within_cluster_var = df[feature].var()
-            if within_cluster_var > 0:
-                importance = between_cluster_var / within_cluster_var
-                feature_importance.append((feature, importance))
-        
-        # Сортуємо за важливістю та вибираємо топ
-        feature_importance.sort(key=lambda x: x[1], reverse=True)
-        selected_features = [f[0] for f in feature_importance[:max_features]]
-    else:
-        selected_features = numeric_features
+    # Вибираємо найбільш інформативні характеристики (ранжування зі спільних статистик кластерів)
+    stats = stats if stats is not None else compute_cluster_stats(df)
+    selected_features = stats.top_features(max_features)
     
     print(f"📊 Візуалізую {len(selected_features)} найважливіших характеристик:")
     for i, feature in enumerate(selected_features, 1):
@@ -77,8 +137,13 @@ def create_feature_pairs_plot(df, max_features=8):
     if cols == 1:
         axes = axes.reshape(-1, 1)
     
-    # Створюємо кольорову палітру для кластерів
-    colors = plt.cm.tab20(np.linspace(0, 1, df['cluster'].nunique()))
+    # Кольори та вибірка точок обчислюються один раз для всіх панелей
+    clusters, codes, palette = cluster_colors(df)
+    rows_idx = sample_rows(len(df))
+    point_colors = palette[codes[rows_idx]]
+    values = {f: df[f].to_numpy()[rows_idx] for f in selected_features}
+    if len(rows_idx) < len(df):
+        print(f"🔻 Scatter: вибірка {len(rows_idx)} з {len(df)} треків")
     
     for idx, (feature1, feature2) in enumerate(feature_pairs):
         row = idx // cols
@@ -91,12 +156,8 @@ def create_feature_pairs_plot(df, max_features=8):
         else:
             ax = axes[row, col]
         
-        # Створюємо scatter plot для кожної пари
-        for cluster_id in sorted(df['cluster'].unique()):
-            cluster_data = df[df['cluster'] == cluster_id]
-            ax.scatter(cluster_data[feature1], cluster_data[feature2], 
-                      c=[colors[cluster_id]], alpha=0.6, s=20, 
-                      label=f'Cluster {cluster_id}' if idx == 0 else "")
+        # Один scatter на панель з масивом кольорів
+        ax.scatter(values[feature1], values[feature2], c=point_colors, alpha=0.6, s=20, linewidths=0)
         
         ax.set_xlabel(feature1.replace('_', ' ').title())
         ax.set_ylabel(feature2.replace('_', ' ').title())
@@ -105,7 +166,8 @@ def create_feature_pairs_plot(df, max_features=8):
         
         # Додаємо легенду тільки для першого графіка
         if idx == 0:
-            ax.legend(bbox_to_anchor=(1.05, 1), loc='upper left', fontsize=8)
+            ax.legend(handles=cluster_legend_handles(clusters, palette),
+                      bbox_to_anchor=(1.05, 1), loc='upper left', fontsize=8)
     
     # Приховуємо порожні графіки
     for idx in range(n_pairs, rows * cols):
@@ -119,19 +181,14 @@ def create_feature_pairs_plot(df, max_features=8):
             axes[row, col].set_visible(False)
     
     plt.tight_layout()
-    plt.savefig('spotisplit_feature_pairs.png', dpi=300, bbox_inches='tight')
-    print(f"💾 Збережено графік: spotisplit_feature_pairs.png")
-    plt.show()
+    save_figure('spotisplit_feature_pairs.png', "графік")
 
-def create_cluster_summary_heatmap(df):
+def create_cluster_summary_heatmap(df, stats=None):
     """Створює теплову карту середніх значень характеристик по кластерах"""
     
-    # Вибір числових характеристик
-    numeric_features = df.select_dtypes(include=[np.number]).columns.tolist()
-    numeric_features = [f for f in numeric_features if f != 'cluster']
-    
-    # Розраховуємо середні значення по кластерах
-    cluster_means = df.groupby('cluster')[numeric_features].mean()
+    # Середні значення по кластерах зі спільних статистик
+    stats = stats if stats is not None else compute_cluster_stats(df)
+    cluster_means = stats.means
     
     # Нормалізуємо дані для кращої візуалізації
     cluster_means_normalized = (cluster_means - cluster_means.mean()) / cluster_means.std()
@@ -153,9 +210,7 @@ def create_cluster_summary_heatmap(df):
     plt.yticks(rotation=0)
     
     plt.tight_layout()
-    plt.savefig('spotisplit_cluster_heatmap.png', dpi=300, bbox_inches='tight')
-    print(f"💾 Збережено теплову карту: spotisplit_cluster_heatmap.png")
-    plt.show()
+    save_figure('spotisplit_cluster_heatmap.png', "теплову карту")
 
 def create_cluster_size_distribution(df):
     """Створює графік розподілу розмірів кластерів"""
@@ -186,28 +241,15 @@ def create_cluster_size_distribution(df):
     plt.legend()
     
     plt.tight_layout()
-    plt.savefig('spotisplit_cluster_sizes.png', dpi=300, bbox_inches='tight')
-    print(f"💾 Збережено графік розмірів: spotisplit_cluster_sizes.png")
-    plt.show()
+    save_figure('spotisplit_cluster_sizes.png', "графік розмірів")
 
-def create_feature_distributions(df, top_features=6):
+def create_feature_distributions(df, top_features=6, stats=None):
     """Створює розподіли основних характеристик по кластерах"""
     
-    # Вибір топ характеристик
-    numeric_features = df.select_dtypes(include=[np.number]).columns.tolist()
-    numeric_features = [f for f in numeric_features if f != 'cluster']
-    
-    # Розраховуємо важливість характеристик
-    feature_importance = []
-    for feature in numeric_features:
-        between_cluster_var = df.groupby('cluster')[feature].var().mean()
-        within_cluster_var = df[feature].var()
-        if within_cluster_var > 0:
-            importance = between_cluster_var / within_cluster_var
-            feature_importance.append((feature, importance))
-    
-    feature_importance.sort(key=lambda x: x[1], reverse=True)
-    top_features_list = [f[0] for f in feature_importance[:top_features]]
+    # Вибір топ характеристик зі спільних статистик кластерів
+    stats = stats if stats is not None else compute_cluster_stats(df)
+    top_features_list = stats.top_features(top_features)
+    top_features = len(top_features_list)
     
     print(f"📊 Візуалізую розподіли топ-{top_features} характеристик:")
     for i, feature in enumerate(top_features_list, 1):
@@ -226,7 +268,9 @@ def create_feature_distributions(df, top_features=6):
     if cols == 1:
         axes = axes.reshape(-1, 1)
     
-    colors = plt.cm.tab20(np.linspace(0, 1, df['cluster'].nunique()))
+    clusters, _, colors = cluster_colors(df)
+    # Індекси рядків кожного кластера - один groupby на весь графік
+    cluster_rows = list(df.groupby('cluster').indices.values())
     
     for idx, feature in enumerate(top_features_list):
         row = idx // cols
@@ -240,8 +284,8 @@ def create_feature_distributions(df, top_features=6):
             ax = axes[row, col]
         
         # Створюємо box plot для кожної характеристики
-        cluster_data = [df[df['cluster'] == cluster_id][feature].values 
-                       for cluster_id in sorted(df['cluster'].unique())]
+        values = df[feature].to_numpy()
+        cluster_data = [values[rows] for rows in cluster_rows]
         
         bp = ax.boxplot(cluster_data, patch_artist=True)
         
@@ -256,7 +300,7 @@ def create_feature_distributions(df, top_features=6):
         ax.grid(True, alpha=0.3)
         
         # Встановлюємо підписи осі X
-        ax.set_xticklabels([f'Cluster {i}' for i in sorted(df['cluster'].unique())])
+        ax.set_xticklabels([f'Cluster {i}' for i in clusters])
     
     # Приховуємо порожні графіки
     for idx in range(top_features, rows * cols):
@@ -270,42 +314,67 @@ def create_feature_distributions(df, top_features=6):
             axes[row, col].set_visible(False)
     
     plt.tight_layout()
-    plt.savefig('spotisplit_feature_distributions.png', dpi=300, bbox_inches='tight')
-    print(f"💾 Збережено розподіли: spotisplit_feature_distributions.png")
-    plt.show()
+    save_figure('spotisplit_feature_distributions.png', "розподіли")
 
-def create_3d_scatter_plot(df, feature1='popularity', feature2='duration_minutes', feature3='age_years'):
-    """Створює 3D scatter plot для трьох основних характеристик"""
+def create_3d_scatter_plot(df, feature1='popularity', feature2='duration_minutes', feature3='age_years', projection=None):
+    """Створює 3D scatter plot для трьох основних характеристик або збереженої PCA-проєкції запуску"""
     
     fig = plt.figure(figsize=(12, 10))
     ax = fig.add_subplot(111, projection='3d')
     
-    colors = plt.cm.tab20(np.linspace(0, 1, df['cluster'].nunique()))
-    
-    for cluster_id in sorted(df['cluster'].unique()):
-        cluster_data = df[df['cluster'] == cluster_id]
-        ax.scatter(cluster_data[feature1], cluster_data[feature2], cluster_data[feature3],
-                  c=[colors[cluster_id]], alpha=0.6, s=20, label=f'Cluster {cluster_id}')
-    
-    ax.set_xlabel(feature1.replace('_', ' ').title())
-    ax.set_ylabel(feature2.replace('_', ' ').title())
-    ax.set_zlabel(feature3.replace('_', ' ').title())
-    ax.set_title(f'SpotiSplit: 3D візуалізація кластерів\n{feature1} vs {feature2} vs {feature3}', 
+    clusters, codes, palette = cluster_colors(df)
+    rows_idx = sample_rows(len(df))
+    if projection is not None:
+        coords, labels = projection.coords, axis_labels(projection)
+        title = 'PCA-проєкція запуску'
+    else:
+        coords = df[[feature1, feature2, feature3]].to_numpy()
+        labels = [f.replace('_', ' ').title() for f in (feature1, feature2, feature3)]
+        title = f'{feature1} vs {feature2} vs {feature3}'
+    ax.scatter(coords[rows_idx, 0], coords[rows_idx, 1], coords[rows_idx, 2],
+               c=palette[codes[rows_idx]], alpha=0.6, s=20, linewidths=0)
+    
+    ax.set_xlabel(labels[0])
+    ax.set_ylabel(labels[1])
+    ax.set_zlabel(labels[2])
+    ax.set_title(f'SpotiSplit: 3D візуалізація кластерів\n{title}', 
                  fontsize=14, fontweight='bold')
     
-    ax.legend(bbox_to_anchor=(1.15, 1), loc='upper left')
+    ax.legend(handles=cluster_legend_handles(clusters, palette), bbox_to_anchor=(1.15, 1), loc='upper left')
     plt.tight_layout()
-    plt.savefig('spotisplit_3d_scatter.png', dpi=300, bbox_inches='tight')
-    print(f"💾 Збережено 3D графік: spotisplit_3d_scatter.png")
-    plt.show()
+    save_figure('spotisplit_3d_scatter.png', "3D графік")
+
+def render_figure(func, df, fargs, kwargs, dpi):
+    """Рендерить одну фігуру у процесі-воркері пакетного режиму"""
+    global RENDER_DPI, SHOW_PLOTS
+    plt.switch_backend("Agg")
+    RENDER_DPI, SHOW_PLOTS = dpi, False
+    func(df, *fargs, **kwargs)
 
 def main():
     """Основна функція"""
     print("🎵 SpotiSplit Cluster Visualization")
     print("=" * 50)
     
+    parser = argparse.ArgumentParser(description="SpotiSplit - Візуалізація кластерів")
+    parser.add_argument("--csv", type=str, default="spotisplit_clusters_no_audio.csv", help="CSV з результатами кластеризації")
+    parser.add_argument("--run", type=str, nargs="?", const="", metavar="RUN_ID",
+                        help="Читати матрицю характеристик запуску замість CSV (без RUN_ID - останній запуск)")
+    parser.add_argument("--batch", action="store_true", help="Пакетний рендеринг: Agg backend, без вікон, фігури паралельно")
+    parser.add_argument("--dpi", type=int, help="DPI збережених графіків (за замовчуванням: 300, у пакетному режимі 150)")
+    parser.add_argument("--workers", type=int, help="Кількість процесів для пакетного режиму (за замовчуванням: кількість ядер)")
+    args = parser.parse_args()
+    
+    global RENDER_DPI, SHOW_PLOTS
+    if args.batch:
+        plt.switch_backend("Agg")
+        SHOW_PLOTS = False
+        RENDER_DPI = 150
+    if args.dpi:
+        RENDER_DPI = args.dpi
+    
     # Завантажуємо дані
-    df = load_cluster_data()
+    df = load_run_features(args.run or None) if args.run is not None else load_cluster_data(args.csv)
     if df is None:
         return
     
@@ -316,28 +385,50 @@ def main():
     print(f"   Мінімальний розмір кластера: {df['cluster'].value_counts().min()}")
     print(f"   Максимальний розмір кластера: {df['cluster'].value_counts().max()}")
     
+    scatter_features = ['popularity', 'duration_minutes', 'age_years']
+    if not set(scatter_features) <= set(df.columns):
+        scatter_features = [c for c in df.columns if c != 'cluster'][:3]
+
+    # Статистики кластерів рахуються один раз (або беруться з запуску) і спільні для всіх графіків
+    features = [c for c in df.select_dtypes(include=[np.number]).columns if c != 'cluster']
+    stats = load_run_stats(df.attrs["run_id"], features) if "run_id" in df.attrs else None
+    if stats is None:
+        stats = compute_cluster_stats(df, features)
+
+    # Для запуску 3D-графік використовує збережену PCA-проєкцію (без повторного фіту)
+    projection = None
+    if "run_id" in df.attrs:
+        from run_checkpoints import RunCheckpoint
+        projection = load_or_fit_projection(RunCheckpoint.resume(df.attrs["run_id"]))
+        if projection.coords.shape[1] < 3:
+            projection = None
+
+    figures = [
+        ("1️⃣ Розподіл розмірів кластерів...", create_cluster_size_distribution, (), {}),
+        ("2️⃣ Теплова карта кластерів...", create_cluster_summary_heatmap, (), {"stats": stats}),
+        ("3️⃣ Розподіли характеристик...", create_feature_distributions, (), {"top_features": 9, "stats": stats}),
+        ("4️⃣ Пари характеристик...", create_feature_pairs_plot, (), {"max_features": 8, "stats": stats}),
+        ("5️⃣ 3D scatter plot...", create_3d_scatter_plot, tuple(scatter_features), {"projection": projection}),
+    ]
+    
     # Створюємо всі візуалізації
     print(f"\n🎨 Створення візуалізацій...")
-    
-    # 1. Розподіл розмірів кластерів
-    print("1️⃣ Розподіл розмірів кластерів...")
-    create_cluster_size_distribution(df)
-    
-    # 2. Теплова карта кластерів
-    print("2️⃣ Теплова карта кластерів...")
-    create_cluster_summary_heatmap(df)
-    
-    # 3. Розподіли характеристик
-    print("3️⃣ Розподіли характеристик...")
-    create_feature_distributions(df, top_features=9)
-    
-    # 4. Пари характеристик
-    print("4️⃣ Пари характеристик...")
-    create_feature_pairs_plot(df, max_features=8)
-    
-    # 5. 3D scatter plot
-    print("5️⃣ 3D scatter plot...")
-    create_3d_scatter_plot(df)
+    started = time.perf_counter()
+    if args.batch:
+        # Пакетний режим: Agg, без show(), кожна фігура в окремому процесі
+        workers = max(1, min(len(figures), args.workers or os.cpu_count() or 1))
+        print(f"⚙️ Пакетний режим: {workers} процесів, dpi={RENDER_DPI}")
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(render_figure, func, df, fargs, kwargs, RENDER_DPI)
+                       for _, func, fargs, kwargs in figures]
+            for (title, _, _, _), future in zip(figures, futures):
+                future.result()
+                print(f"✅ {title.rstrip('.')}")
+    else:
+        for title, func, fargs, kwargs in figures:
+            print(title)
+            func(df, *fargs, **kwargs)
+    print(f"⏱️ Рендеринг: {time.perf_counter() - started:.1f} с")
     
     print(f"\n🎉 Всі візуалізації створено та збережено!")
     print(f"📁 Файли збережено в поточній директорії:")
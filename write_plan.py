@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+SpotiSplit - План запису плейлістів (--plan / --apply)
+--plan проходить увесь конвеєр до запису і зберігає план: які плейлісти буде створено чи дописано,
+які URI додаються в кожен та точна кількість запитів до API. --apply RUN_ID виконує збережений план:
+плейлісти пишуться паралельно (батчі одного плейліста - послідовно, щоб зберегти порядок треків)
+"""
+
+import time
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from playlist_order import ordered_cluster_uris
+from playlist_manifest import record_playlist
+from track_cleaning import playlist_tracks
+from progress import progress, log_event
+
+PLAN_STAGE = "plan"
+ADD_BATCH_SIZE = 100  # максимум URI в одному запиті POST /playlists/{id}/tracks
+
+
+def build_write_plan(df, config, checkpoint, base_name: str, description: str, skip_unassigned: bool = True) -> Dict[str, Any]:
+    """
+    План запису для кластерів df: те саме, що зробив би create_playlists_from_clusters, без жодного запиту.
+    Для перерваних запусків враховує вже створені плейлісти та записані батчі (playlists.json).
+    """
+    done_state = checkpoint.playlist_progress() if checkpoint is not None else {}
+    df = playlist_tracks(df, config)
+    playlists: List[Dict[str, Any]] = []
+    for c in sorted(df["cluster"].unique()):
+        if skip_unassigned and c == -1:
+            continue
+        name = f"{base_name} · Cluster {int(c)} / {int(config['N_CLUSTERS'])}"
+        state = done_state.get(str(int(c)), {})
+        uris = ordered_cluster_uris(df, c)
+        start_chunk = 0 if not state.get("playlist_id") else int(state.get("chunks_done", 0))
+        n_chunks = (len(uris) + ADD_BATCH_SIZE - 1) // ADD_BATCH_SIZE
+        if state.get("done"):
+            action, start_chunk = "skip", n_chunks
+        elif state.get("playlist_id"):
+            action = "resume"
+        else:
+            action = "create"
+        add = uris[start_chunk * ADD_BATCH_SIZE:]
+        playlists.append({
+            "cluster": int(c),
+            "name": name,
+            "description": description,
+            "action": action,
+            "playlist_id": state.get("playlist_id"),
+            "uris": uris,
+            "start_chunk": start_chunk,
+            "existing": len(uris) - len(add),
+            "add": len(add),
+            "calls": int(action == "create") + (n_chunks - start_chunk),
+        })
+    creates = sum(p["action"] == "create" for p in playlists)
+    adds = sum(p["calls"] for p in playlists) - creates
+    return {
+        "run_id": checkpoint.run_id if checkpoint is not None else None,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "public": bool(config["MAKE_PUBLIC"]),
+        "playlists": playlists,
+        "tracks": sum(p["add"] for p in playlists),
+        "calls": {"create": creates, "add": adds, "total": creates + adds},
+    }
+
+
+def print_plan(plan: Dict[str, Any]):
+    """Зведення плану: дія, URI-диф та запити по кожному плейлісту"""
+    print(f"\n📝 План запису ({len(plan['playlists'])} плейлістів):")
+    for p in plan["playlists"]:
+        if p["action"] == "skip":
+            print(f"   = {p['name']}: вже записано ({len(p['uris'])} треків)")
+            continue
+        verb = "створити" if p["action"] == "create" else f"дописати {p['playlist_id']}"
+        print(f"   + {p['name']}: {verb}, +{p['add']} URI"
+              + (f" (вже є {p['existing']})" if p["existing"] else "") + f", {p['calls']} запитів")
+    calls = plan["calls"]
+    print(f"📊 Разом: {plan['tracks']} URI, {calls['total']} запитів до API "
+          f"({calls['create']} створень + {calls['add']} додавань)")
+
+
+def save_plan(checkpoint, plan: Dict[str, Any]):
+    checkpoint.save_json(PLAN_STAGE, plan)
+    log_event("plan_saved", run_id=checkpoint.run_id, playlists=len(plan["playlists"]), calls=plan["calls"]["total"])
+    print(f"💾 План збережено: {checkpoint.path(PLAN_STAGE + '.json')}")
+    print(f"💡 Виконати: --apply {checkpoint.run_id}")
+
+
+def load_plan(checkpoint) -> Optional[Dict[str, Any]]:
+    return checkpoint.load_json(PLAN_STAGE)
+
+
+def apply_plan(sp, user_id: str, plan: Dict[str, Any], checkpoint, max_workers: int = 8, rate_limiter=None) -> Dict[int, str]:
+    """
+    Виконує план: плейлісти паралельно (до max_workers), батчі кожного - по черзі, зі спільним лімітом запитів.
+    Прогрес пишеться в playlists.json, тож перерване виконання продовжується повторним --apply.
+    """
+    lock = threading.Lock()
+    state = checkpoint.playlist_progress()
+    created: Dict[int, str] = {}
+    pending = []
+    for p in plan["playlists"]:
+        current = state.get(str(p["cluster"]), {})
+        if current.get("done"):
+            created[p["cluster"]] = current["playlist_id"]
+        else:
+            pending.append(p)
+
+    def call(func, *args, **kwargs):
+        if rate_limiter is not None:
+            rate_limiter.wait()
+        return func(*args, **kwargs)
+
+    def update(cluster: int, pl_id: str, chunks_done: int, done: bool = False):
+        with lock:  # playlists.json читається і переписується цілим
+            checkpoint.update_playlist(cluster, pl_id, chunks_done, done=done)
+
+    def write(p, tracker) -> Optional[str]:
+        try:
+            return write_playlist(p, tracker)
+        except Exception as e:
+            tracker.echo(f"❌ {p['name']}: {e}")
+            log_event("playlist_failed", cluster=p["cluster"], name=p["name"], error=str(e))
+            return None
+
+    def write_playlist(p, tracker) -> str:
+        current = state.get(str(p["cluster"]), {})
+        pl_id = current.get("playlist_id")
+        start_chunk = int(current.get("chunks_done", 0)) if pl_id else 0
+        if pl_id is None:
+            pl = call(sp.user_playlist_create, user=user_id, name=p["name"], public=plan["public"],
+                      description=p["description"])
+            pl_id = pl["id"]
+            tracker.update(0, calls=1)
+            record_playlist(pl_id, p["name"], checkpoint.run_id, user_id)
+            update(p["cluster"], pl_id, 0)
+        uris = p["uris"]
+        n_chunks = (len(uris) + ADD_BATCH_SIZE - 1) // ADD_BATCH_SIZE
+        for i in range(start_chunk, n_chunks):
+            chunk = uris[i * ADD_BATCH_SIZE:(i + 1) * ADD_BATCH_SIZE]
+            call(sp.playlist_add_items, pl_id, chunk)
+            update(p["cluster"], pl_id, i + 1)
+            tracker.update(len(chunk), calls=1)
+        update(p["cluster"], pl_id, n_chunks, done=True)
+        tracker.echo(f"📦 {p['name']}: додано {len(uris) - start_chunk * ADD_BATCH_SIZE} треків")
+        log_event("playlist_written", cluster=p["cluster"], playlist_id=pl_id, name=p["name"], tracks=len(uris))
+        return pl_id
+
+    started = time.perf_counter()
+    total = sum(max(0, len(p["uris"]) - ADD_BATCH_SIZE * int(state.get(str(p["cluster"]), {}).get("chunks_done", 0)))
+                for p in pending)
+    workers = max(1, min(max_workers, len(pending) or 1))
+    with progress("apply", total=total) as tracker, ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(lambda p: write(p, tracker), pending))
+    failed = [p for p, pl_id in zip(pending, results) if pl_id is None]
+    created.update({p["cluster"]: pl_id for p, pl_id in zip(pending, results) if pl_id is not None})
+    elapsed = time.perf_counter() - started
+    skipped = len(plan["playlists"]) - len(pending)
+    if failed:
+        print(f"⚠️ Записано {len(pending) - len(failed)}/{len(pending)} плейлістів за {elapsed:.1f} с, "
+              f"з помилками: {len(failed)}")
+        print(f"💡 Продовжити з місця зупинки: --apply {checkpoint.run_id}")
+    else:
+        print(f"✅ План виконано: {len(pending)} плейлістів у {workers} потоках за {elapsed:.1f} с"
+              + (f", {skipped} вже були записані" if skipped else ""))
+    return created
+
+
+def apply_saved_plan(sp, user_id: str, config, run_id: str) -> Optional[Dict[int, str]]:
+    """--apply RUN_ID: завантажує план запуску та виконує його"""
+    from run_checkpoints import RunCheckpoint
+    from spotify_transport import create_rate_limiter
+
+    try:
+        checkpoint = RunCheckpoint.resume(run_id)
+    except FileNotFoundError as e:
+        print(f"❌ {e}")
+        return None
+    plan = load_plan(checkpoint)
+    if plan is None:
+        print(f"❌ Запуск {run_id} не містить плану. Спочатку: --plan")
+        return None
+    print(f"📝 План запуску {run_id} від {plan['created_at']}: {len(plan['playlists'])} плейлістів, "
+          f"{plan['tracks']} URI, {plan['calls']['total']} запитів")
+    return apply_plan(sp, user_id, plan, checkpoint, max_workers=config["MAX_WORKERS"],
+                      rate_limiter=create_rate_limiter(config))